@@ -1,7 +1,29 @@
 from django.contrib import admin
-from .models import Artist, HitSong # Importe seus modelos
+from .models import Artist, ChartEntry, Community, Genre, HitSong # Importe seus modelos
 
 # Register your models here.
 # Registre os modelos
 admin.site.register(Artist)
-admin.site.register(HitSong)
\ No newline at end of file
+admin.site.register(HitSong)
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    list_display = ('name', 'super_genre')
+    list_filter = ('super_genre',)
+    search_fields = ('name',)
+
+
+@admin.register(ChartEntry)
+class ChartEntryAdmin(admin.ModelAdmin):
+    list_display = ('song', 'market', 'week_start', 'position', 'streams')
+    list_filter = ('market',)
+    raw_id_fields = ('song',)
+
+
+@admin.register(Community)
+class CommunityAdmin(admin.ModelAdmin):
+    list_display = ('level', 'label', 'parent', 'size', 'dominant_genre', 'dominant_share', 'intra_weight', 'inter_weight')
+    list_filter = ('level',)
+    search_fields = ('dominant_genre',)
+    raw_id_fields = ('parent',)
@@ -0,0 +1,186 @@
+# ars_network/api.py
+#
+# Infraestrutura da API JSON somente-leitura: seleção de campos, paginação por
+# chave (keyset), ETag/Last-Modified ligados à última AnalysisRun e cache das
+# respostas serializadas no framework de cache do Django.
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from ars_network.graph import cached_collaboration_graph, links_fingerprint, load_song_artist_links
+from ars_network.models import AnalysisRun
+
+CACHE_PREFIX = "ars_api"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class ApiError(Exception):
+    """Erro de requisição: vira uma resposta JSON {"error": ...} com o status dado (não é cacheada)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def latest_run(request):
+    """Última AnalysisRun (uma consulta por requisição, memorizada no request)."""
+    if not hasattr(request, '_analysis_run'):
+        request._analysis_run = AnalysisRun.objects.order_by('-pk').first()
+    return request._analysis_run
+
+
+def run_summary(run):
+    if run is None:
+        return None
+    return {'id': run.pk, 'kind': run.kind, 'finished_at': run.finished_at.isoformat()}
+
+
+def _etag(request):
+    run = latest_run(request)
+    key = f"{run.pk if run else 0}:{request.get_full_path()}"
+    return quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def _last_modified(request):
+    run = latest_run(request)
+    return int(run.finished_at.timestamp()) if run else None
+
+
+def cached_json_view(view):
+    """Transforma uma função que retorna um dict em um endpoint GET JSON com cache.
+
+    Requisições condicionais (If-None-Match / If-Modified-Since) respondem 304 sem
+    executar a view; as demais buscam o JSON já serializado no cache, com chave
+    (última rodada, caminho completo da URL). ETag e Last-Modified só acompanham
+    as respostas de sucesso; os erros não levam validadores nem são cacheados.
+    """
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag, last_modified = _etag(request), _last_modified(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = _cached_content(view, request, *args, **kwargs)
+        # Validadores só no 200 e no 304 que o confirma (nunca nas respostas de erro)
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if last_modified:
+                response.headers['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return wrapper
+
+
+def _cached_content(view, request, *args, **kwargs):
+    """JSON da view (do cache, se já serializado) ou a resposta de erro da ApiError."""
+    run = latest_run(request)
+    path_hash = hashlib.sha1(request.get_full_path().encode('utf-8')).hexdigest()
+    key = f"{CACHE_PREFIX}:{run.pk if run else 0}:{path_hash}"
+
+    content = cache.get(key)
+    if content is None:
+        try:
+            payload = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+        payload['run'] = run_summary(run)
+        content = json.dumps(payload, ensure_ascii=False)
+        cache.set(key, content, settings.API_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type='application/json')
+
+
+def selected_fields(request, allowed, default):
+    """Campos pedidos em ?fields=a,b (validados contra `allowed`); a chave primária vem sempre."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise ApiError(f"Campos desconhecidos: {', '.join(unknown)}. Permitidos: {', '.join(allowed)}.")
+    return list(dict.fromkeys([allowed[0], *fields]))
+
+
+def int_param(request, name, default, minimum=1, maximum=None):
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(f"'{name}' deve ser um inteiro.")
+    if value < minimum or (maximum is not None and value > maximum):
+        if maximum is None:
+            raise ApiError(f"'{name}' deve ser maior ou igual a {minimum}.")
+        raise ApiError(f"'{name}' deve estar entre {minimum} e {maximum}.")
+    return value
+
+
+def keyset_page(request, queryset, key_field, fields):
+    """Uma página ordenada por `key_field`: ?after=<última chave>&limit=N.
+
+    Diferente de OFFSET, o custo não cresce com a profundidade da página: a
+    consulta usa o índice da chave (WHERE key > after ORDER BY key LIMIT N).
+    """
+    limit = int_param(request, 'limit', DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+    after = request.GET.get('after')
+    if after:
+        # Converte para o tipo da chave (ex.: inteiro para 'id') antes de filtrar
+        try:
+            after = queryset.model._meta.get_field(key_field).to_python(after)
+        except ValidationError:
+            raise ApiError(f"'after' inválido para a chave '{key_field}': {after!r}.")
+        queryset = queryset.filter(**{f"{key_field}__gt": after})
+
+    # Uma linha extra indica se existe próxima página
+    rows = list(queryset.order_by(key_field).values(*fields)[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_url = None
+    if has_next:
+        params = request.GET.copy()
+        params['after'] = rows[-1][key_field]
+        next_url = f"{request.path}?{params.urlencode()}"
+    return {'results': rows, 'next': next_url}
+
+
+# ----------------------------------------------------
+# Grafo de colaboração para as consultas de vizinhança
+# ----------------------------------------------------
+
+# Impressões digitais de snapshot já conferidas contra o banco: {fingerprint: id da AnalysisRun}
+_VERIFIED_SNAPSHOTS = {}
+
+
+def collaboration_graph(request):
+    """Snapshot CSR do grafo (data/cache), relido só quando o arquivo muda.
+
+    O snapshot é conferido contra a tabela música-artista uma vez por AnalysisRun
+    (toda carga de dados registra uma): depois de uma reimportação as PKs das
+    HitSongs mudam, e um snapshot antigo devolveria músicas em comum inválidas.
+    """
+    graph = cached_collaboration_graph()
+    if graph is None:
+        raise ApiError("Grafo de colaboração ainda não calculado. Rode o comando analyze_network.", status=503)
+
+    run = latest_run(request)
+    run_id = run.pk if run is not None else None
+    if _VERIFIED_SNAPSHOTS.get(graph.fingerprint, object()) != run_id:
+        if links_fingerprint(load_song_artist_links()) != graph.fingerprint:
+            raise ApiError(
+                "Grafo de colaboração desatualizado em relação aos dados importados. Rode o comando analyze_network.",
+                status=503,
+            )
+        _VERIFIED_SNAPSHOTS[graph.fingerprint] = run_id
+    return graph
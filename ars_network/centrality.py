@@ -0,0 +1,352 @@
+# ars_network/centrality.py
+#
+# Centralidade de Intermediação (Brandes) em paralelo: os nós de origem são divididos
+# entre processos, cada processo acumula as dependências parciais das suas origens e
+# o processo principal soma e normaliza o resultado. Inclui também o modo aproximado
+# por amostragem de pivôs (Brandes & Pich), com limites de erro por nó, e a
+# atualização incremental após uma carga parcial de dados.
+
+import math
+import multiprocessing
+import os
+from collections import namedtuple
+from heapq import heappop, heappush
+from itertools import count
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from ars_network.graph import CACHE_DIR
+
+# Grafo do processo trabalhador (enviado uma única vez pelo initializer do Pool)
+_WORKER_GRAPH = None
+_WORKER_WEIGHT = None
+_WORKER_INDEX = None
+
+
+def _init_worker(G, weight):
+    global _WORKER_GRAPH, _WORKER_WEIGHT, _WORKER_INDEX
+    _WORKER_GRAPH = G
+    _WORKER_WEIGHT = weight
+    _WORKER_INDEX = {node: i for i, node in enumerate(G)}
+
+
+def single_source_dependencies(G, source, weight='weight'):
+    """Dependências δ_s(v) de Brandes para uma origem (caminhos mínimos ponderados).
+
+    Retorna {v: δ_s(v)} só para os nós alcançados (exceto a própria origem); somar
+    δ_s(v) sobre todas as origens dá a intermediação dirigida não normalizada.
+    """
+    # Dijkstra contando o número de caminhos mínimos (sigma) e os predecessores
+    S, P, sigma, dist = [], {source: []}, {source: 1.0}, {}
+    seen = {source: 0}
+    tie = count()
+    heap = [(0, next(tie), source, source)]
+    while heap:
+        d, _, pred, v = heappop(heap)
+        if v in dist:
+            continue
+        if v != source:
+            sigma[v] += sigma[pred]
+        S.append(v)
+        dist[v] = d
+        for w, edge_attr in G[v].items():
+            vw_dist = d + edge_attr.get(weight, 1)
+            if w not in dist and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heappush(heap, (vw_dist, next(tie), v, w))
+                sigma[w] = 0.0
+                P[w] = [v]
+            elif vw_dist == seen[w]:
+                sigma[w] += sigma[v]
+                P[w].append(v)
+
+    # Acumulação das dependências em ordem decrescente de distância
+    delta = dict.fromkeys(S, 0.0)
+    for w in reversed(S):
+        coeff = (1.0 + delta[w]) / sigma[w]
+        for v in P[w]:
+            delta[v] += sigma[v] * coeff
+    del delta[source]
+    return delta
+
+
+def _partial_betweenness(sources):
+    """Dependências acumuladas (soma dirigida, não normalizada) de um lote de origens."""
+    partial = {}
+    for source in sources:
+        for node, value in single_source_dependencies(_WORKER_GRAPH, source, _WORKER_WEIGHT).items():
+            partial[node] = partial.get(node, 0.0) + value
+    return partial
+
+
+def _chunks(nodes, num_chunks):
+    size = max(1, -(-len(nodes) // num_chunks))
+    return [nodes[i:i + size] for i in range(0, len(nodes), size)]
+
+
+def _rescale(betweenness, n, directed, normalized):
+    """Mesma escala do nx.betweenness_centrality sobre a soma dirigida das dependências."""
+    if normalized:
+        scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else None
+    else:
+        # Em grafos não direcionados cada par (s, t) foi contado duas vezes
+        scale = None if directed else 0.5
+    if scale is None:
+        return betweenness
+    return {node: value * scale for node, value in betweenness.items()}
+
+
+def betweenness_centrality(G, weight='weight', workers=1, normalized=True):
+    """Intermediação exata de Brandes, com as origens divididas entre `workers` processos.
+
+    Com workers <= 1 usa diretamente o nx.betweenness_centrality. O resultado paralelo
+    é igual ao serial a menos de erro de ponto flutuante (ordem das somas).
+    """
+    if workers <= 1 or G.number_of_nodes() < 3:
+        return nx.betweenness_centrality(G, weight=weight, normalized=normalized)
+
+    nodes = list(G)
+    # Mais lotes que processos para equilibrar a carga (origens têm custos diferentes)
+    chunks = _chunks(nodes, workers * 4)
+
+    betweenness = dict.fromkeys(nodes, 0.0)
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(G, weight)) as pool:
+        for partial in pool.imap_unordered(_partial_betweenness, chunks):
+            for node, value in partial.items():
+                betweenness[node] += value
+
+    return _rescale(betweenness, len(nodes), G.is_directed(), normalized)
+
+
+# ----------------------------------------------------
+# Modo aproximado (amostragem de pivôs)
+# ----------------------------------------------------
+
+ApproxBetweenness = namedtuple(
+    'ApproxBetweenness',
+    ['values', 'errors', 'num_samples', 'epsilon', 'confidence', 'exact', 'stability'],
+)
+
+
+def pivot_sample_size(n, epsilon, confidence):
+    """Nº de pivôs para erro absoluto <= epsilon em TODOS os nós com a confiança dada.
+
+    Mesmo limite reportado por approximate_betweenness(): Hoeffding (cada termo
+    δ_s(v)/(n-2) está em [0, 1]) com união sobre os n nós e metade de δ = 1 - confiança
+    (a outra metade fica com o limite de Bernstein), aplicado à estimativa já
+    multiplicada por n/(n-1): k = ln(4n/δ) · (n/(n-1))² / (2ε²).
+    """
+    delta = 1.0 - confidence
+    scale = n / (n - 1)
+    return math.ceil(math.log(4 * n / delta) * scale ** 2 / (2 * epsilon ** 2))
+
+
+def _pivot_statistics(task):
+    """Soma, soma dos quadrados e soma por grupo de δ_s(v)/(n-2) para um lote de pivôs."""
+    pivots, num_groups = task
+    n = len(_WORKER_INDEX)
+    total, total_sq = np.zeros(n), np.zeros(n)
+    group_sums = np.zeros((num_groups, n))
+    for pivot, group in pivots:
+        x = np.zeros(n)
+        deps = single_source_dependencies(_WORKER_GRAPH, pivot, _WORKER_WEIGHT)
+        x[[_WORKER_INDEX[v] for v in deps]] = list(deps.values())
+        x /= max(n - 2, 1)
+        total += x
+        total_sq += x * x
+        group_sums[group] += x
+    return total, total_sq, group_sums
+
+
+def _ranking_stability(nodes, estimate, group_means, top_n, rng, num_bootstrap):
+    """Estabilidade do top-N e do conjunto de pontes (percentil 90) por bootstrap dos grupos."""
+
+    def bridge_set(values):
+        # Mesmo limite da borda vermelha das visualizações
+        threshold = max(0.001, np.percentile(values, 90))
+        return set(np.flatnonzero(values >= threshold))
+
+    def jaccard(a, b):
+        return len(a & b) / len(a | b) if a | b else 1.0
+
+    top_n = min(top_n, len(nodes))
+    point_top = set(np.argsort(-estimate)[:top_n])
+    point_bridges = bridge_set(estimate)
+
+    top_freq = np.zeros(len(nodes))
+    bridge_freq = np.zeros(len(nodes))
+    top_jaccard, bridge_jaccard = [], []
+    num_groups = len(group_means)
+    for _ in range(num_bootstrap):
+        replicate = group_means[rng.integers(0, num_groups, num_groups)].mean(axis=0)
+        replicate_top = set(np.argsort(-replicate)[:top_n])
+        replicate_bridges = bridge_set(replicate)
+        top_freq[list(replicate_top)] += 1
+        bridge_freq[list(replicate_bridges)] += 1
+        top_jaccard.append(jaccard(point_top, replicate_top))
+        bridge_jaccard.append(jaccard(point_bridges, replicate_bridges))
+
+    return {
+        'top_n': top_n,
+        'top_n_jaccard_mean': float(np.mean(top_jaccard)),
+        'top_n_jaccard_min': float(np.min(top_jaccard)),
+        'bridge_jaccard_mean': float(np.mean(bridge_jaccard)),
+        'bridge_jaccard_min': float(np.min(bridge_jaccard)),
+        'top_n_frequency': dict(zip(nodes, top_freq / num_bootstrap)),
+        'bridge_frequency': dict(zip(nodes, bridge_freq / num_bootstrap)),
+        'unstable_top_n': [nodes[i] for i in sorted(point_top) if top_freq[i] / num_bootstrap < 0.9],
+    }
+
+
+def approximate_betweenness(G, epsilon=0.01, confidence=0.95, weight='weight', workers=1,
+                            seed=42, top_n=20, num_groups=20, num_bootstrap=200):
+    """Intermediação normalizada estimada a partir de k pivôs sorteados.
+
+    Estimador: b(v) ≈ n/(n-1) · média_s[δ_s(v)/(n-2)]. O erro por nó é o menor entre
+    o limite empírico de Bernstein (Maurer & Pontil, usa a variância amostral do nó)
+    e o de Hoeffding, ambos com correção de união sobre os n nós. Se k >= n, calcula
+    o valor exato.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    k = pivot_sample_size(n, epsilon, confidence) if n > 2 else n
+    if k >= n:
+        values = betweenness_centrality(G, weight=weight, workers=workers)
+        return ApproxBetweenness(values, dict.fromkeys(nodes, 0.0), n, epsilon, confidence, True, None)
+
+    rng = np.random.default_rng(seed)
+    pivots = [nodes[i] for i in rng.choice(n, size=k, replace=False)]
+    num_groups = min(num_groups, k)
+    tasks = [(chunk, num_groups) for chunk in _chunks(list(zip(pivots, np.arange(k) % num_groups)), max(workers, 1) * 4)]
+
+    total, total_sq, group_sums = np.zeros(n), np.zeros(n), np.zeros((num_groups, n))
+    if workers <= 1:
+        _init_worker(G, weight)
+        results = map(_pivot_statistics, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(G, weight))
+        results = pool.imap_unordered(_pivot_statistics, tasks)
+    try:
+        for chunk_total, chunk_sq, chunk_groups in results:
+            total += chunk_total
+            total_sq += chunk_sq
+            group_sums += chunk_groups
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    scale = n / (n - 1)
+    mean = total / k
+    variance = np.maximum(total_sq / k - mean ** 2, 0.0) * k / (k - 1)
+    # Metade da probabilidade de falha para cada limite: vale o menor dos dois
+    delta = 1.0 - confidence
+    log_term = math.log(8 * n / delta)
+    bernstein = np.sqrt(2 * variance * log_term / k) + 7 * log_term / (3 * (k - 1))
+    hoeffding = math.sqrt(math.log(4 * n / delta) / (2 * k))
+    bound = np.minimum(bernstein, hoeffding)
+    estimate = mean * scale
+
+    group_sizes = np.bincount(np.arange(k) % num_groups, minlength=num_groups)[:, None]
+    stability = _ranking_stability(nodes, estimate, group_sums / group_sizes * scale, top_n, rng, num_bootstrap)
+
+    return ApproxBetweenness(
+        values=dict(zip(nodes, estimate.tolist())),
+        errors=dict(zip(nodes, (bound * scale).tolist())),
+        num_samples=k,
+        epsilon=epsilon,
+        confidence=confidence,
+        exact=False,
+        stability=stability,
+    )
+
+
+# ----------------------------------------------------
+# Atualização incremental (só os componentes afetados)
+# ----------------------------------------------------
+
+STATE_PATH = CACHE_DIR / "betweenness_state.npz"
+
+BetweennessState = namedtuple('BetweennessState', ['artist_ids', 'adjacency', 'raw_betweenness'])
+IncrementalUpdate = namedtuple('IncrementalUpdate', ['raw_betweenness', 'changed_artists', 'recomputed_artists'])
+
+
+def normalize_betweenness(raw_betweenness, n):
+    """Converte a intermediação não normalizada (grafo não direcionado) na normalizada do NetworkX."""
+    if n <= 2:
+        return dict(raw_betweenness)
+    scale = 2.0 / ((n - 1) * (n - 2))
+    return {node: value * scale for node, value in raw_betweenness.items()}
+
+
+def save_betweenness_state(collab_graph, raw_betweenness, path=STATE_PATH):
+    """Guarda a adjacência analisada e a intermediação não normalizada de cada artista."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    adjacency = collab_graph.adjacency
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as fh:
+        np.savez(
+            fh,
+            artist_ids=collab_graph.artist_ids.astype(str),
+            adjacency_indptr=adjacency.indptr,
+            adjacency_indices=adjacency.indices,
+            adjacency_data=adjacency.data,
+            raw_betweenness=np.array([raw_betweenness.get(a, 0.0) for a in collab_graph.artist_ids]),
+        )
+    os.replace(tmp_path, path)
+
+
+def load_betweenness_state(path=STATE_PATH):
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        artist_ids = data['artist_ids'].astype(object)
+        adjacency = sp.csr_matrix(
+            (data['adjacency_data'], data['adjacency_indices'], data['adjacency_indptr']),
+            shape=(len(artist_ids), len(artist_ids)),
+        )
+        return BetweennessState(artist_ids, adjacency, data['raw_betweenness'])
+
+
+def _align(adjacency, artist_ids, union_ids):
+    """Reindexa a adjacência para a lista (ordenada) de todos os artistas."""
+    positions = np.searchsorted(union_ids, artist_ids.astype(str))
+    coo = adjacency.tocoo()
+    shape = (len(union_ids), len(union_ids))
+    return sp.csr_matrix((coo.data, (positions[coo.row], positions[coo.col])), shape=shape)
+
+
+def incremental_betweenness(collab_graph, state, weight='weight', workers=1):
+    """Recalcula a intermediação só nos componentes conexos tocados por arestas novas,
+    removidas ou com peso alterado desde o estado salvo.
+
+    A intermediação não normalizada é local a cada componente (não há caminhos entre
+    componentes), então os demais artistas mantêm o valor do estado anterior.
+    """
+    union_ids = np.union1d(state.artist_ids.astype(str), collab_graph.artist_ids.astype(str))
+    old = _align(state.adjacency, state.artist_ids, union_ids)
+    new = _align(collab_graph.adjacency, collab_graph.artist_ids, union_ids)
+    diff = (new - old).tocoo()
+    diff.eliminate_zeros()
+    changed_artists = union_ids[np.unique(np.concatenate([diff.row, diff.col]))].astype(object)
+
+    raw = dict(zip(state.artist_ids, state.raw_betweenness.tolist()))
+    labels, _ = collab_graph.connected_components()
+    index = collab_graph.index
+    changed_rows = [index[a] for a in changed_artists if a in index]
+    touched_components = np.setdiff1d(labels[changed_rows], [-1])
+    recompute_mask = np.isin(labels, touched_components)
+
+    if recompute_mask.any():
+        subgraph = collab_graph.to_networkx(recompute_mask)
+        raw.update(betweenness_centrality(subgraph, weight=weight, workers=workers, normalized=False))
+
+    current_nodes = collab_graph.artist_ids[collab_graph.node_mask]
+    return IncrementalUpdate(
+        raw_betweenness={a: raw.get(a, 0.0) for a in current_nodes},
+        changed_artists=changed_artists.tolist(),
+        recomputed_artists=collab_graph.artist_ids[recompute_mask].tolist(),
+    )
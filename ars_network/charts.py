@@ -0,0 +1,77 @@
+# ars_network/charts.py
+#
+# Séries temporais dos Charts semanais (ChartEntry): pontuação por posição e o
+# momento de cada hit (velocidade, média/desvio móveis e rótulo de tendência),
+# calculados para todas as músicas em uma única passada de groupby.
+
+import numpy as np
+import pandas as pd
+
+from ars_network.models import ChartEntry
+
+# Tamanho dos Charts semanais do Spotify (Top 200)
+CHART_SIZE = 200
+
+TREND_RISING = 'rising'
+TREND_FALLING = 'falling'
+TREND_STABLE = 'stable'
+
+
+def load_chart_entries(market):
+    """Posições semanais do mercado em uma única consulta, ordenadas por música e semana."""
+    rows = (
+        ChartEntry.objects.filter(market=market)
+        .order_by('song_id', 'week_start')
+        .values_list('song_id', 'week_start', 'position')
+    )
+    return pd.DataFrame(list(rows), columns=['song_id', 'week_start', 'position'])
+
+
+def chart_score(position):
+    """Posição no chart em escala 0-100 (1º lugar = 100), comparável à popularidade do Spotify."""
+    position = np.clip(np.asarray(position, dtype=float), 1, CHART_SIZE)
+    return 100.0 * (CHART_SIZE + 1 - position) / CHART_SIZE
+
+
+def chart_momentum(entries, window=4, threshold=1.0):
+    """Momento de cada música na última semana em que esteve no chart.
+
+    Para a janela móvel das últimas `window` semanas no chart de cada música:
+      - velocity: variação média da pontuação por semana (positiva = subindo);
+      - mean_popularity / std_popularity: média e desvio-padrão da pontuação;
+      - trend: 'rising' / 'falling' se |velocity| > `threshold`, senão 'stable'.
+
+    `entries` deve vir ordenado por (song_id, week_start), como em load_chart_entries().
+    Retorna um DataFrame indexado pela PK da música.
+    """
+    columns = ['velocity', 'mean_popularity', 'std_popularity', 'trend']
+    if entries.empty:
+        return pd.DataFrame(columns=columns)
+
+    songs = entries['song_id'].to_numpy()
+    first_of_song = np.r_[True, songs[1:] != songs[:-1]]
+    last_of_song = np.r_[songs[1:] != songs[:-1], True]
+
+    score = chart_score(entries['position'].to_numpy())
+    # Variação semana a semana; a primeira semana de cada música não tem anterior
+    delta = np.where(first_of_song, np.nan, np.diff(score, prepend=np.nan))
+    series = pd.DataFrame({'score': score, 'delta': delta})
+
+    # Uma única passada: média/desvio da pontuação e velocidade na mesma janela por música
+    rolled = (
+        series.groupby(songs, sort=False)
+        .rolling(window, min_periods=1)
+        .agg({'score': ['mean', 'std'], 'delta': 'mean'})
+    )
+    latest = rolled.to_numpy()[last_of_song]
+
+    velocity = np.nan_to_num(latest[:, 2])
+    trend = np.where(velocity > threshold, TREND_RISING,
+                     np.where(velocity < -threshold, TREND_FALLING, TREND_STABLE))
+    return pd.DataFrame({
+        'velocity': velocity,
+        'mean_popularity': latest[:, 0],
+        # Uma única semana no chart: sem dispersão
+        'std_popularity': np.nan_to_num(latest[:, 1]),
+        'trend': trend,
+    }, index=songs[last_of_song])
@@ -0,0 +1,539 @@
+# ars_network/communities.py
+#
+# Detecção de comunidades compartilhada por todos os comandos: o Louvain (ou o
+# Leiden, se leidenalg e igraph estiverem instalados) roda com várias seeds em
+# processos paralelos e as execuções são combinadas em uma partição de consenso.
+# O resultado fica em disco com chave (impressão digital do grafo, parâmetros),
+# então diagnose_communities e os visualize_* leem a mesma partição, com as
+# mesmas cores, sem recalcular.
+#
+# Consenso (Lancichinetti & Fortunato, 2012): cada aresta recebe a fração das
+# execuções em que as duas pontas ficaram na mesma comunidade; as arestas abaixo
+# do limiar são descartadas e o algoritmo roda de novo sobre esse grafo de
+# concordância até que todas as execuções concordem (ou acabem as rodadas).
+# As comunidades são renumeradas por tamanho (0 = a maior), então os IDs são
+# estáveis entre execuções com o mesmo grafo.
+#
+# Hierarquia: a partição de consenso é o nível 0; cada nível seguinte divide
+# cada comunidade do anterior rodando o algoritmo só no seu subgrafo (ex.: de
+# "sertanejo" para os sub-grupos dentro dele). Os níveis são aninhados (toda
+# comunidade tem um pai no nível acima) e ficam no mesmo arquivo em cache, então
+# trocar de granularidade (--level) não roda o algoritmo de novo.
+#
+# O perfil de cada comunidade (tamanho, tabela de gêneros, gênero dominante e
+# top-k, peso das arestas internas e externas) sai de uma única passada sobre
+# arrays e é gravado em Community (com o pai de cada comunidade),
+# CommunityMembership (artista x nível) e Artist.community (nível 0).
+
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import namedtuple
+
+import community.community_louvain as community_louvain
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.db import transaction
+
+from ars_network.genres import NO_GENRE
+from ars_network.graph import CACHE_DIR
+from ars_network.models import Artist, ArtistGenre, Community, CommunityMembership
+from ars_network.persistence import bulk_update_changed
+
+try:
+    import igraph
+    import leidenalg
+except ImportError:  # dependências opcionais do algoritmo 'leiden'
+    igraph = leidenalg = None
+
+COMMUNITY_DIR = CACHE_DIR / "communities"
+COMMUNITY_ALGORITHMS = ('louvain', 'leiden')
+
+DEFAULT_RUNS = 16
+DEFAULT_SEED = 42
+DEFAULT_RESOLUTION = 1.0
+# Fração mínima de execuções em que as duas pontas de uma aresta ficam juntas
+DEFAULT_CONSENSUS_THRESHOLD = 0.5
+MAX_CONSENSUS_ROUNDS = 10
+DEFAULT_TOP_GENRES = 3
+# Níveis da hierarquia (o 0 é a partição de consenso) e tamanho mínimo para dividir uma comunidade
+MAX_LEVELS = 4
+MIN_SPLIT_SIZE = 4
+
+CommunityResult = namedtuple('CommunityResult', [
+    'partition', 'modularity', 'run_modularities', 'num_communities', 'algorithm', 'runs', 'from_cache',
+    'level', 'hierarchy',
+])
+
+# Grafo do processo trabalhador (enviado uma única vez pelo initializer do Pool)
+_WORKER_GRAPH = None
+_WORKER_ALGORITHM = None
+_WORKER_RESOLUTION = None
+
+
+def leiden_available():
+    return leidenalg is not None
+
+
+def add_community_arguments(parser):
+    """Opções de detecção de comunidades comuns a diagnose_communities e visualize_*."""
+    parser.add_argument(
+        '--algorithm', choices=COMMUNITY_ALGORITHMS, default='louvain',
+        help="Algoritmo de comunidades: 'louvain' (padrão) ou 'leiden' (requer leidenalg e igraph)."
+    )
+    parser.add_argument(
+        '--community-runs', type=int, default=DEFAULT_RUNS,
+        help=f'Execuções (seeds) combinadas na partição de consenso (padrão: {DEFAULT_RUNS}).'
+    )
+    parser.add_argument(
+        '--community-workers', type=int, default=1,
+        help='Processos paralelos para as execuções do algoritmo (padrão: 1).'
+    )
+    parser.add_argument(
+        '--resolution', type=float, default=DEFAULT_RESOLUTION,
+        help=f'Parâmetro de resolução da modularidade (padrão: {DEFAULT_RESOLUTION}).'
+    )
+    parser.add_argument(
+        '--level', type=int, default=0,
+        help='Nível da hierarquia de comunidades: 0 = partição de consenso, 1+ = sub-comunidades (padrão: 0).'
+    )
+    parser.add_argument(
+        '--no-community-cache', action='store_true',
+        help='Recalcula a partição mesmo que exista uma em cache para esta versão do grafo.'
+    )
+
+
+def community_options(options):
+    """Converte as opções do comando nos argumentos de get_partition()."""
+    return {
+        'algorithm': options['algorithm'],
+        'runs': options['community_runs'],
+        'workers': options['community_workers'],
+        'resolution': options['resolution'],
+        'level': options['level'],
+        'use_cache': not options['no_community_cache'],
+    }
+
+
+def _init_worker(G, algorithm, resolution):
+    global _WORKER_GRAPH, _WORKER_ALGORITHM, _WORKER_RESOLUTION
+    _WORKER_GRAPH = G
+    _WORKER_ALGORITHM = algorithm
+    _WORKER_RESOLUTION = resolution
+
+
+def _detect(G, algorithm, resolution, seed):
+    """Rótulos de uma execução, na ordem de list(G)."""
+    if algorithm == 'leiden':
+        nodes = list(G)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = [(index[a], index[b]) for a, b in G.edges()]
+        weights = [w for _, _, w in G.edges(data='weight', default=1)]
+        graph = igraph.Graph(n=len(nodes), edges=edges, edge_attrs={'weight': weights})
+        found = leidenalg.find_partition(
+            graph, leidenalg.RBConfigurationVertexPartition, weights='weight',
+            resolution_parameter=resolution, seed=seed,
+        )
+        return np.asarray(found.membership, dtype=np.int64)
+    partition = community_louvain.best_partition(G, weight='weight', resolution=resolution, random_state=seed)
+    return np.fromiter((partition[node] for node in G), dtype=np.int64, count=G.number_of_nodes())
+
+
+def _run(seed):
+    return _detect(_WORKER_GRAPH, _WORKER_ALGORITHM, _WORKER_RESOLUTION, seed)
+
+
+def _split(task):
+    """Rótulos de uma comunidade dividida no próprio subgrafo, na ordem de `nodes`."""
+    nodes, seed = task
+    # Subgrafo montado na ordem de `nodes`: G.subgraph() percorre um set, cuja ordem
+    # muda entre processos (hash de strings) e tornaria o resultado não determinístico
+    members = set(nodes)
+    subgraph = nx.Graph()
+    subgraph.add_nodes_from(nodes)
+    subgraph.add_edges_from(
+        (node, neighbor, data) for node in nodes for neighbor, data in _WORKER_GRAPH[node].items() if neighbor in members
+    )
+    return _detect(subgraph, _WORKER_ALGORITHM, _WORKER_RESOLUTION, seed)
+
+
+def _run_all(G, algorithm, resolution, seeds, workers):
+    if workers <= 1 or len(seeds) <= 1:
+        return [_detect(G, algorithm, resolution, seed) for seed in seeds]
+    with multiprocessing.Pool(min(workers, len(seeds)), initializer=_init_worker,
+                              initargs=(G, algorithm, resolution)) as pool:
+        return pool.map(_run, seeds)
+
+
+def _canonical(labels):
+    """Renumera as comunidades por tamanho decrescente (empate: primeiro nó na ordem do grafo)."""
+    _, first, inverse, sizes = np.unique(labels, return_index=True, return_inverse=True, return_counts=True)
+    order = np.lexsort((first, -sizes))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank[inverse]
+
+
+def _agreement(runs, u, v):
+    """Fração das execuções em que as pontas de cada aresta ficaram na mesma comunidade."""
+    labels = np.vstack(runs)
+    return (labels[:, u] == labels[:, v]).mean(axis=0)
+
+
+def modularity(adjacency, labels, resolution=DEFAULT_RESOLUTION):
+    """Modularidade (com resolução) de uma partição sobre a adjacência simétrica CSR."""
+    two_m = adjacency.sum()
+    if two_m == 0:
+        return 0.0
+    coo = adjacency.tocoo()
+    intra = coo.data[labels[coo.row] == labels[coo.col]].sum()
+    community_degree = np.bincount(labels, weights=np.asarray(adjacency.sum(axis=1)).ravel())
+    return float(intra / two_m - resolution * ((community_degree / two_m) ** 2).sum())
+
+
+def consensus_partition(G, algorithm='louvain', runs=DEFAULT_RUNS, seed=DEFAULT_SEED,
+                        resolution=DEFAULT_RESOLUTION, threshold=DEFAULT_CONSENSUS_THRESHOLD, workers=1):
+    """Partição de consenso de `runs` execuções com seeds seed, seed+1, ...
+
+    Retorna (rótulos canônicos na ordem de list(G), modularidade do consenso no grafo
+    original, modularidade de cada execução inicial).
+    """
+    nodes = list(G)
+    seeds = list(range(seed, seed + max(runs, 1)))
+    labels = _run_all(G, algorithm, resolution, seeds, workers)
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+    run_modularities = [modularity(adjacency, run, resolution) for run in labels]
+
+    upper = sp.triu(adjacency, k=1).tocoo()
+    u, v = upper.row, upper.col
+    for _ in range(MAX_CONSENSUS_ROUNDS):
+        agreement = _agreement(labels, u, v)
+        if len(labels) == 1 or np.all((agreement == 0) | (agreement == 1)):
+            break
+        keep = agreement >= threshold
+        consensus = nx.Graph()
+        consensus.add_nodes_from(nodes)
+        consensus.add_weighted_edges_from(zip(
+            (nodes[i] for i in u[keep]), (nodes[j] for j in v[keep]), agreement[keep].tolist()
+        ))
+        # No grafo de concordância a resolução volta a 1: o limiar já fixou a escala
+        labels = _run_all(consensus, algorithm, 1.0, seeds, workers)
+    final = _canonical(labels[0])
+    return final, modularity(adjacency, final, resolution), run_modularities
+
+
+class CommunityHierarchy:
+    """Níveis aninhados de comunidades: `levels[k]` são os rótulos do nível k na ordem de `nodes`."""
+
+    def __init__(self, nodes, levels, modularities):
+        self.nodes = nodes
+        self.levels = levels
+        self.modularities = modularities
+
+    def __len__(self):
+        return len(self.levels)
+
+    def labels(self, level):
+        if not 0 <= level < len(self.levels):
+            raise ValueError(f"Nível {level} indisponível: a hierarquia tem os níveis 0 a {len(self.levels) - 1}.")
+        return self.levels[level]
+
+    def partition(self, level):
+        return dict(zip(self.nodes, self.labels(level).tolist()))
+
+    def num_communities(self, level):
+        labels = self.labels(level)
+        return int(labels.max()) + 1 if len(labels) else 0
+
+    def parents(self, level):
+        """Rótulo do pai (nível level-1) de cada comunidade do nível; None no nível 0."""
+        self.labels(level)
+        if level == 0:
+            return None
+        parents = np.empty(self.num_communities(level), dtype=np.int64)
+        parents[self.levels[level]] = self.levels[level - 1]
+        return parents
+
+
+def split_levels(G, base_labels, algorithm='louvain', seed=DEFAULT_SEED, resolution=DEFAULT_RESOLUTION,
+                 max_levels=MAX_LEVELS, min_size=MIN_SPLIT_SIZE, workers=1):
+    """Níveis [base, sub-comunidades, ...]: cada comunidade com `min_size` ou mais artistas é
+    dividida no próprio subgrafo. Para quando nenhuma comunidade se divide."""
+    nodes = np.array(list(G), dtype=object)
+    levels = [base_labels]
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(G, algorithm, resolution))
+    else:
+        _init_worker(G, algorithm, resolution)
+    try:
+        while len(levels) < max_levels:
+            current = levels[-1]
+            order = np.argsort(current, kind='stable')
+            groups = np.split(order, np.flatnonzero(np.diff(current[order])) + 1) if len(order) else []
+            splittable = [i for i, group in enumerate(groups) if len(group) >= min_size]
+            tasks = [(nodes[groups[i]].tolist(), seed) for i in splittable]
+            results = pool.map(_split, tasks) if pool is not None else list(map(_split, tasks))
+            local_labels = dict(zip(splittable, results))
+
+            # Sub-rótulos locais viram globais com um deslocamento por comunidade
+            raw = np.empty(len(current), dtype=np.int64)
+            offset = 0
+            for i, group in enumerate(groups):
+                local = np.unique(local_labels[i], return_inverse=True)[1] if i in local_labels else 0
+                raw[group] = offset + local
+                offset += int(np.max(local)) + 1
+            if offset == len(groups):
+                break
+            levels.append(_canonical(raw))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return levels
+
+
+def _params_key(algorithm, runs, seed, resolution, threshold):
+    params = json.dumps({
+        'algorithm': algorithm, 'runs': runs, 'seed': seed, 'resolution': resolution, 'threshold': threshold,
+        'max_levels': MAX_LEVELS, 'min_split_size': MIN_SPLIT_SIZE,
+    }, sort_keys=True)
+    return hashlib.sha1(params.encode('utf-8')).hexdigest()[:16]
+
+
+def _partition_path(params_key, fingerprint):
+    return COMMUNITY_DIR / f"{params_key}_{fingerprint[:16]}.npz"
+
+
+def _save(path, fingerprint, hierarchy, run_modularities):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as fh:
+        np.savez(
+            fh,
+            fingerprint=fingerprint,
+            nodes=np.array(hierarchy.nodes, dtype=str),
+            levels=np.vstack(hierarchy.levels),
+            modularities=np.asarray(hierarchy.modularities, dtype=np.float64),
+            run_modularities=np.asarray(run_modularities, dtype=np.float64),
+        )
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    with np.load(path, allow_pickle=False) as data:
+        hierarchy = CommunityHierarchy(
+            data['nodes'].astype(object).tolist(), list(data['levels']), data['modularities'].tolist(),
+        )
+        return str(data['fingerprint']), hierarchy, data['run_modularities'].tolist()
+
+
+def get_partition(G, fingerprint, algorithm='louvain', runs=DEFAULT_RUNS, seed=DEFAULT_SEED,
+                  resolution=DEFAULT_RESOLUTION, threshold=DEFAULT_CONSENSUS_THRESHOLD, workers=1, level=0,
+                  use_cache=True):
+    """Partição do nível `level` da hierarquia de comunidades, lida do cache quando possível.
+
+    Retorna CommunityResult (com a hierarquia completa em `.hierarchy`). Levanta
+    ValueError se o algoritmo pedido não estiver disponível ou o nível não existir.
+    """
+    if algorithm not in COMMUNITY_ALGORITHMS:
+        raise ValueError(f"Algoritmo de comunidades desconhecido: '{algorithm}'.")
+    if algorithm == 'leiden' and not leiden_available():
+        raise ValueError("O algoritmo 'leiden' requer os pacotes leidenalg e igraph (pip install leidenalg).")
+
+    path = _partition_path(_params_key(algorithm, runs, seed, resolution, threshold), fingerprint)
+    hierarchy = None
+    from_cache = False
+    if use_cache and path.exists():
+        cached_fingerprint, cached, run_modularities = _load(path)
+        if cached_fingerprint == fingerprint and set(cached.nodes) == set(G):
+            hierarchy, from_cache = cached, True
+
+    if hierarchy is None:
+        nodes = list(G)
+        labels, modularity_value, run_modularities = consensus_partition(
+            G, algorithm=algorithm, runs=runs, seed=seed, resolution=resolution, threshold=threshold, workers=workers,
+        )
+        levels = split_levels(G, labels, algorithm=algorithm, seed=seed, resolution=resolution, workers=workers)
+        adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+        modularities = [modularity_value] + [modularity(adjacency, labels, resolution) for labels in levels[1:]]
+        hierarchy = CommunityHierarchy(nodes, levels, modularities)
+        _save(path, fingerprint, hierarchy, run_modularities)
+
+    return CommunityResult(
+        hierarchy.partition(level), hierarchy.modularities[level], run_modularities,
+        hierarchy.num_communities(level), algorithm, runs, from_cache, level, hierarchy,
+    )
+
+
+def write_partition_summary(stdout, result):
+    """Resumo da partição (origem, número de comunidades e modularidade) no stdout do comando."""
+    source = "cache" if result.from_cache else f"consenso de {result.runs} execuções"
+    line = (f"Comunidades ({result.algorithm}, {source}, nível {result.level} de 0-{len(result.hierarchy) - 1}): "
+            f"{result.num_communities} | Modularidade: {result.modularity:.4f}")
+    if result.level == 0 and result.run_modularities:
+        line += (f" (execuções: média {np.mean(result.run_modularities):.4f}, "
+                 f"melhor {np.max(result.run_modularities):.4f})")
+    stdout.write(line)
+
+
+# ----------------------------------------------------
+# Perfil das comunidades (uma passada vetorizada) e persistência
+# ----------------------------------------------------
+
+def community_labels(collab_graph, partition):
+    """Rótulo de cada linha de `collab_graph.artist_ids` (-1 para artistas fora da partição)."""
+    return np.fromiter(
+        (partition.get(artist_id, -1) for artist_id in collab_graph.artist_ids),
+        dtype=np.int64, count=len(collab_graph.artist_ids),
+    )
+
+
+def genre_links():
+    """Ligações (artist_id, genre) de todos os artistas, em uma única consulta."""
+    return pd.DataFrame(list(ArtistGenre.objects.values_list('artist_id', 'genre__name')), columns=['artist_id', 'genre'])
+
+
+def profile_communities(collab_graph, partition, top_k=DEFAULT_TOP_GENRES, links=None):
+    """Perfil de cada comunidade em um DataFrame indexado pelo rótulo.
+
+    Colunas: size, dominant_genre, dominant_share, top_genres, genre_counts,
+    intra_weight e inter_weight. Cada artista conta uma vez por gênero; empates
+    na frequência são desfeitos pela ordem alfabética do gênero. `links` (ver
+    genre_links()) evita repetir a consulta ao perfilar vários níveis.
+    """
+    labels = community_labels(collab_graph, partition)
+    num_communities = int(labels.max()) + 1 if len(labels) else 0
+    members = labels >= 0
+    sizes = np.bincount(labels[members], minlength=num_communities)
+
+    # Pesos: arestas internas contam para a comunidade; as que cruzam, para as duas pontas
+    upper = sp.triu(collab_graph.adjacency, k=1, format='coo')
+    lu, lv, weights = labels[upper.row], labels[upper.col], upper.data.astype(np.float64)
+    valid = (lu >= 0) & (lv >= 0)
+    same, cross = valid & (lu == lv), valid & (lu != lv)
+    intra = np.bincount(lu[same], weights=weights[same], minlength=num_communities)
+    inter = (np.bincount(lu[cross], weights=weights[cross], minlength=num_communities)
+             + np.bincount(lv[cross], weights=weights[cross], minlength=num_communities))
+
+    # Tabela comunidade x gênero a partir das ligações ArtistGenre (sem reprocessar texto)
+    if links is None:
+        links = genre_links()
+    rows = links['artist_id'].map(collab_graph.index)
+    links = links[rows.notna()].assign(community=labels[rows.dropna().to_numpy(dtype=np.int64)])
+    counts = (
+        links[links['community'] >= 0].groupby(['community', 'genre']).size().rename('count').reset_index()
+        .sort_values(['community', 'count', 'genre'], ascending=[True, False, True])
+    )
+    by_community = counts.groupby('community', sort=False)
+    dominant = by_community.first()
+    top_genres = by_community.head(top_k).groupby('community')['genre'].agg(list)
+    genre_counts = {
+        community_id: dict(zip(group['genre'], group['count'].astype(int).tolist()))
+        for community_id, group in by_community
+    }
+
+    index = pd.RangeIndex(num_communities, name='label')
+    profile = pd.DataFrame({
+        'size': sizes,
+        'dominant_genre': dominant['genre'].reindex(index).fillna(NO_GENRE),
+        'intra_weight': intra,
+        'inter_weight': inter,
+    }, index=index)
+    dominant_count = dominant['count'].reindex(index).fillna(0).to_numpy(dtype=np.float64)
+    profile['dominant_share'] = np.divide(dominant_count, sizes, out=np.zeros(num_communities), where=sizes > 0)
+    profile['top_genres'] = [top_genres.get(label, []) for label in index]
+    profile['genre_counts'] = [genre_counts.get(label, {}) for label in index]
+    return profile
+
+
+def profile_hierarchy(collab_graph, hierarchy, top_k=DEFAULT_TOP_GENRES):
+    """Perfil de todos os níveis da hierarquia ([DataFrame do nível 0, do nível 1, ...])."""
+    links = genre_links()
+    return [
+        profile_communities(collab_graph, hierarchy.partition(level), top_k=top_k, links=links)
+        for level in range(len(hierarchy))
+    ]
+
+
+def save_communities(collab_graph, hierarchy, profiles, batch_size=500):
+    """Grava a hierarquia em Community (com o pai de cada comunidade), CommunityMembership
+    e Artist.community (nível 0). Retorna o número de artistas com alguma comunidade alterada.
+
+    As linhas de Community são reaproveitadas por (nível, rótulo) e os pertencimentos
+    são comparados com os do banco, então só muda o que de fato mudou.
+    """
+    fields = ['size', 'dominant_genre', 'dominant_share', 'top_genres', 'genre_counts', 'intra_weight', 'inter_weight']
+    records = [
+        Community(level=level, label=int(label), **{field: row[field] for field in fields})
+        for level, profile in enumerate(profiles)
+        for label, row in zip(profile.index, profile[fields].to_dict('records'))
+    ]
+    with transaction.atomic():
+        Community.objects.bulk_create(
+            records, batch_size=batch_size, update_conflicts=True, unique_fields=['level', 'label'],
+            update_fields=fields,
+        )
+        community_ids = {
+            (level, label): pk for level, label, pk in Community.objects.values_list('level', 'label', 'pk')
+        }
+
+        # Pai de cada comunidade (nível anterior); as linhas que sobraram de uma hierarquia
+        # antiga são apagadas só depois, quando nenhuma comunidade atual aponta para elas
+        parent_ids = pd.Series(pd.NA, index=pd.Index(list(community_ids.values())), dtype='Int64')
+        for level in range(1, len(hierarchy)):
+            for label, parent in enumerate(hierarchy.parents(level)):
+                parent_ids[community_ids[(level, label)]] = community_ids[(level - 1, int(parent))]
+        bulk_update_changed(Community, parent_ids.to_frame('parent_id'), ['parent_id'], batch_size)
+        Community.objects.filter(level__gte=len(hierarchy)).delete()
+        for level, profile in enumerate(profiles):
+            Community.objects.filter(level=level, label__gte=len(profile)).delete()
+
+        # Pertencimentos desejados: (artista, nível) -> comunidade
+        artist_pks = set(Artist.objects.values_list('pk', flat=True))
+        artist_ids = collab_graph.artist_ids
+        desired = []
+        for level in range(len(hierarchy)):
+            labels = community_labels(collab_graph, hierarchy.partition(level))
+            members = np.flatnonzero(labels >= 0)
+            desired.append(pd.DataFrame({
+                'artist_id': artist_ids[members],
+                'level': level,
+                'community_id': [community_ids[(level, label)] for label in labels[members].tolist()],
+            }))
+        desired = pd.concat(desired, ignore_index=True)
+        desired = desired[desired['artist_id'].isin(artist_pks)]
+
+        current = pd.DataFrame(
+            list(CommunityMembership.objects.values_list('pk', 'artist_id', 'level', 'community_id')),
+            columns=['pk', 'artist_id', 'level', 'community_id'],
+        )
+        merged = desired.merge(current, on=['artist_id', 'level'], how='outer', suffixes=('', '_current'))
+        to_create = merged[merged['pk'].isna()]
+        to_delete = merged[merged['community_id'].isna()]
+        to_update = merged[merged['pk'].notna() & merged['community_id'].notna()
+                           & (merged['community_id'] != merged['community_id_current'])]
+
+        stale_pks = to_delete['pk'].astype(np.int64).tolist()
+        for start in range(0, len(stale_pks), 500):
+            CommunityMembership.objects.filter(pk__in=stale_pks[start:start + 500]).delete()
+        CommunityMembership.objects.bulk_update(
+            [CommunityMembership(pk=int(row.pk), community_id=int(row.community_id)) for row in to_update.itertuples()],
+            ['community_id'], batch_size=batch_size,
+        )
+        CommunityMembership.objects.bulk_create(
+            [CommunityMembership(artist_id=row.artist_id, level=int(row.level), community_id=int(row.community_id))
+             for row in to_create.itertuples()],
+            batch_size=batch_size,
+        )
+
+        # Atalho do nível 0 no próprio Artist
+        level_zero = desired[desired['level'] == 0].set_index('artist_id')['community_id']
+        frame = pd.DataFrame({'community_id': level_zero.reindex(pd.Index(sorted(artist_pks))).astype('Int64')})
+        bulk_update_changed(Artist, frame, ['community_id'], batch_size)
+
+    changed = pd.concat([to_create['artist_id'], to_delete['artist_id'], to_update['artist_id']])
+    return changed.nunique()
@@ -0,0 +1,95 @@
+# ars_network/ego.py
+#
+# Ego-redes (vizinhança de k saltos) consultadas direto na adjacência CSR do
+# snapshot em cache: busca em largura por fronteiras, subgrafo induzido, músicas
+# em comum de cada aresta (interseção das linhas da incidência) e as métricas já
+# calculadas dos artistas. Nenhuma HitSong é recarregada além das músicas em comum.
+
+import numpy as np
+import scipy.sparse as sp
+
+from ars_network.models import Artist, HitSong
+
+# Mesmo critério de "ponte" das visualizações: percentil 90 da Intermediação (mínimo 0.001)
+BRIDGE_PERCENTILE = 90
+BRIDGE_MIN_BETWEENNESS = 0.001
+
+NODE_FIELDS = ['spotify_id', 'name', 'num_hits', 'betweenness_centrality', 'degree_centrality']
+
+
+def hop_distances(adjacency, source, k):
+    """Distância (em saltos, até k) de cada artista à origem; -1 para os mais distantes."""
+    distance = np.full(adjacency.shape[0], -1, dtype=np.int64)
+    distance[source] = 0
+    frontier = np.array([source])
+    for hop in range(1, k + 1):
+        if not len(frontier):
+            break
+        neighbors = np.unique(adjacency[frontier].indices)
+        frontier = neighbors[distance[neighbors] < 0]
+        distance[frontier] = hop
+    return distance
+
+
+def bridge_threshold():
+    """Limite de Intermediação para um artista ser marcado como ponte."""
+    values = list(
+        Artist.objects.filter(degree_centrality__gt=0, betweenness_centrality__isnull=False)
+        .values_list('betweenness_centrality', flat=True)
+    )
+    if not values:
+        return BRIDGE_MIN_BETWEENNESS
+    return max(BRIDGE_MIN_BETWEENNESS, float(np.percentile(values, BRIDGE_PERCENTILE)))
+
+
+def ego_network(graph, spotify_id, k=2):
+    """Ego-rede de k saltos de um artista, pronta para serializar em JSON.
+
+    Retorna None se o artista não estiver no índice do grafo. `nodes` traz o salto
+    e as métricas de cada artista; `edges` traz todas as arestas entre os artistas
+    da ego-rede com o peso e os spotify_ids das músicas em comum.
+    """
+    source = graph.index.get(spotify_id)
+    if source is None:
+        return None
+
+    distance = hop_distances(graph.adjacency, source, k)
+    members = np.flatnonzero(distance >= 0)
+    # Origem primeiro, depois por salto
+    members = members[np.argsort(distance[members], kind='stable')]
+    member_ids = graph.artist_ids[members]
+
+    # Subgrafo induzido (triângulo superior: cada aresta uma vez)
+    sub = sp.triu(graph.adjacency[members][:, members], k=1, format='coo')
+    incidence = graph.incidence[members]
+    shared_columns = [
+        np.intersect1d(
+            incidence.indices[incidence.indptr[i]:incidence.indptr[i + 1]],
+            incidence.indices[incidence.indptr[j]:incidence.indptr[j + 1]],
+            assume_unique=True,
+        )
+        for i, j in zip(sub.row, sub.col)
+    ]
+
+    # Só as músicas em comum são lidas do banco
+    song_pks = graph.song_pks[np.unique(np.concatenate(shared_columns))] if shared_columns else []
+    song_ids = dict(HitSong.objects.filter(pk__in=[int(pk) for pk in song_pks]).values_list('pk', 'spotify_id'))
+
+    metrics = {row['spotify_id']: row for row in Artist.objects.filter(spotify_id__in=list(member_ids)).values(*NODE_FIELDS)}
+    threshold = bridge_threshold()
+    nodes = []
+    for artist_id, hop in zip(member_ids, distance[members]):
+        row = dict(metrics.get(artist_id, {'spotify_id': artist_id}), hop=int(hop))
+        row['is_bridge'] = (row.get('betweenness_centrality') or 0.0) >= threshold
+        nodes.append(row)
+
+    edges = [
+        {
+            'source': member_ids[i],
+            'target': member_ids[j],
+            'weight': int(weight),
+            'shared_songs': [song_ids.get(int(pk)) for pk in graph.song_pks[columns]],
+        }
+        for i, j, weight, columns in zip(sub.row, sub.col, sub.data, shared_columns)
+    ]
+    return {'center': spotify_id, 'k': k, 'bridge_threshold': threshold, 'nodes': nodes, 'edges': edges}
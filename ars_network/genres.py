@@ -0,0 +1,152 @@
+# ars_network/genres.py
+#
+# Gêneros normalizados: um único parser para o campo texto Artist.genres, a leitura
+# do mapeamento de super-gêneros do MGD+, consultas indexadas em ArtistGenre e o
+# cálculo vetorizado dos índices de heterogeneidade de gênero por música.
+
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+
+from ars_network.models import ArtistGenre, Genre
+
+GENRE_MAPPING_FILE = settings.BASE_DIR / "data" / "raw" / "Genre Mapping" / "spotify_genre_mapping.csv"
+NO_GENRE = "Sem Gênero"
+
+_LIST_CHARS = re.compile(r"[\[\]'\"]")
+
+
+def parse_genres(raw):
+    """Converte "['pop', 'dance pop']" ou "pop, dance pop" em ['pop', 'dance pop'] (ordem mantida)."""
+    genres = []
+    for genre in _LIST_CHARS.sub("", raw or "").split(','):
+        genre = genre.strip().lower()
+        if genre and genre not in genres:
+            genres.append(genre)
+    return genres
+
+
+def load_genre_mapping(path=GENRE_MAPPING_FILE):
+    """Mapa gênero original -> super-gênero. Vazio se o arquivo não existir."""
+    if not path.exists():
+        return {}
+    mapping = pd.read_csv(path, sep='\t', encoding='utf-8', dtype=str).dropna()
+    return dict(zip(mapping['original_genre'].str.strip().str.lower(), mapping['mapped_genre'].str.strip()))
+
+
+def sync_artist_genres(artist_genres, batch_size=1000, mapping=None):
+    """Recria as ligações ArtistGenre dos artistas informados ({spotify_id: texto de gêneros})."""
+    if mapping is None:
+        mapping = load_genre_mapping()
+
+    parsed = {artist_id: parse_genres(raw) for artist_id, raw in artist_genres.items()}
+    names = sorted({genre for genres in parsed.values() for genre in genres})
+
+    Genre.objects.bulk_create(
+        [Genre(name=name, super_genre=mapping.get(name, "")) for name in names],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    genre_ids = dict(Genre.objects.values_list('name', 'id'))
+
+    # Remove as ligações antigas em lotes (limite de variáveis do SQLite)
+    artist_ids = list(parsed)
+    for start in range(0, len(artist_ids), 500):
+        ArtistGenre.objects.filter(artist_id__in=artist_ids[start:start + 500]).delete()
+    links = [
+        ArtistGenre(artist_id=artist_id, genre_id=genre_ids[genre], position=position)
+        for artist_id, genres in parsed.items()
+        for position, genre in enumerate(genres)
+    ]
+    ArtistGenre.objects.bulk_create(links, batch_size=batch_size)
+    return len(links)
+
+
+def artist_genre_ids():
+    """{spotify_id: [genre_id, ...]} na ordem do Spotify, em uma única consulta."""
+    genres = defaultdict(list)
+    rows = ArtistGenre.objects.order_by('artist_id', 'position').values_list('artist_id', 'genre_id')
+    for artist_id, genre_id in rows:
+        genres[artist_id].append(genre_id)
+    return genres
+
+
+def artist_genre_names():
+    """{spotify_id: [nome, ...]} na ordem do Spotify, em uma única consulta."""
+    genres = defaultdict(list)
+    rows = ArtistGenre.objects.order_by('artist_id', 'position').values_list('artist_id', 'genre__name')
+    for artist_id, name in rows:
+        genres[artist_id].append(name)
+    return genres
+
+
+def dominant_genres():
+    """{spotify_id: primeiro gênero listado pelo Spotify (Title Case)}."""
+    rows = ArtistGenre.objects.filter(position=0).values_list('artist_id', 'genre__name')
+    return {artist_id: name.title() for artist_id, name in rows}
+
+
+# ----------------------------------------------------
+# Heterogeneidade de gênero em lote (todas as músicas de uma vez)
+# ----------------------------------------------------
+
+def artist_genre_matrices(artist_ids):
+    """Matrizes binárias artista x gênero e artista x super-gênero, alinhadas a `artist_ids`.
+
+    Gêneros sem super-gênero no mapeamento contam como super-gênero próprio.
+    """
+    row_of = {artist_id: i for i, artist_id in enumerate(artist_ids)}
+    links = pd.DataFrame(
+        list(ArtistGenre.objects.values_list('artist_id', 'genre_id', 'genre__name', 'genre__super_genre')),
+        columns=['artist_id', 'genre_id', 'name', 'super_genre'],
+    )
+    links = links[links['artist_id'].isin(row_of)]
+    rows = links['artist_id'].map(row_of).to_numpy(dtype=np.int64)
+
+    genre_codes, genre_cols = np.unique(links['genre_id'].to_numpy(dtype=np.int64), return_inverse=True)
+    super_names = links['super_genre'].where(links['super_genre'] != "", links['name'])
+    super_codes, super_cols = np.unique(super_names.to_numpy(dtype=object), return_inverse=True)
+
+    shape = len(artist_ids)
+    genres = sp.csr_matrix((np.ones(len(rows)), (rows, genre_cols)), shape=(shape, len(genre_codes)))
+    supers = sp.csr_matrix((np.ones(len(rows)), (rows, super_cols)), shape=(shape, len(super_codes)))
+    # Um artista com vários subgêneros do mesmo super-gênero conta uma única vez
+    supers.data = np.ones_like(supers.data)
+    return genres, supers
+
+
+def genre_heterogeneity(incidence, artist_ids):
+    """Índices de heterogeneidade de gênero de cada música (coluna de `incidence`).
+
+    `incidence` é a matriz artista x música do grafo de colaboração. Em uma única
+    passada de produtos esparsos calcula:
+      - ihg: gêneros únicos / nº de artistas (Índice de Heterogeneidade de Gênero);
+      - entropy: entropia de Shannon (nats) da distribuição de super-gêneros;
+      - gini_simpson: 1 - Σ p² sobre a mesma distribuição.
+    """
+    genres, supers = artist_genre_matrices(artist_ids)
+    song_by_artist = incidence.T.tocsr().astype(np.float64)
+    num_artists = np.asarray(song_by_artist.sum(axis=1)).ravel()
+
+    # Música x gênero: nº de artistas da música com cada gênero
+    song_genres = song_by_artist @ genres
+    unique_genres = np.diff(song_genres.indptr)
+    ihg = np.divide(unique_genres, num_artists, out=np.zeros(len(num_artists)), where=num_artists > 0)
+
+    # Distribuição de super-gêneros por música
+    song_supers = (song_by_artist @ supers).tocsr()
+    totals = np.asarray(song_supers.sum(axis=1)).ravel()
+    row_totals = np.repeat(totals, np.diff(song_supers.indptr))
+    p = song_supers.data / row_totals
+    row_of_value = np.repeat(np.arange(song_supers.shape[0]), np.diff(song_supers.indptr))
+    entropy = np.bincount(row_of_value, weights=-p * np.log(p), minlength=song_supers.shape[0])
+    gini_simpson = np.where(totals > 0, 1.0 - np.bincount(row_of_value, weights=p * p, minlength=song_supers.shape[0]), 0.0)
+
+    return pd.DataFrame({
+        'ihg': ihg,
+        'entropy': entropy + 0.0,
+        'gini_simpson': gini_simpson,
+    })
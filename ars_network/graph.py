@@ -0,0 +1,240 @@
+# ars_network/graph.py
+#
+# Construção única (e cacheada em disco) do grafo de colaboração entre artistas.
+# Todos os comandos de análise/visualização usam get_collaboration_graph() em vez
+# de reler as HitSongs com prefetch_related e remontar o grafo do zero.
+
+import hashlib
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from django.conf import settings
+
+from ars_network.models import HitSong
+
+CACHE_DIR = settings.BASE_DIR / "data" / "cache"
+SNAPSHOT_PATH = CACHE_DIR / "collaboration_graph.npz"
+SNAPSHOT_VERSION = 2
+
+
+def load_song_artist_links():
+    """Lê a tabela intermediária HitSong.artists em uma única consulta, ordenada."""
+    through = HitSong.artists.through
+    rows = list(through.objects.order_by('hitsong_id', 'artist_id').values_list('hitsong_id', 'artist_id'))
+    return pd.DataFrame(rows, columns=['song_pk', 'artist_id'])
+
+
+def links_fingerprint(links):
+    """Impressão digital (SHA-1) do conteúdo da tabela música-artista."""
+    digest = hashlib.sha1()
+    digest.update(links['song_pk'].to_numpy(dtype=np.int64).tobytes())
+    digest.update("\x00".join(links['artist_id']).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CollaborationGraph:
+    """Grafo ponderado de artistas em forma de matrizes esparsas (CSR).
+
+    `incidence` é a matriz de incidência B (artistas x músicas), com `artist_ids[i]`
+    o spotify_id da linha i e `song_pks[j]` a PK da HitSong da coluna j. A adjacência
+    ponderada é A = B·Bᵀ sem a diagonal: A[i, j] = número de músicas em que i e j
+    colaboraram (MGD+ Methodology).
+
+    Só artistas com pelo menos um colaborador são nós do grafo (como no grafo
+    NetworkX original); os demais ficam no índice com grau 0.
+    """
+
+    def __init__(self, artist_ids, song_pks, incidence, fingerprint, adjacency=None):
+        self.artist_ids = artist_ids
+        self.song_pks = song_pks
+        self.incidence = incidence
+        self.adjacency = adjacency if adjacency is not None else _adjacency_from_incidence(incidence)
+        self.fingerprint = fingerprint
+        self.from_cache = False
+        self._index = None
+
+    @property
+    def index(self):
+        """Mapa spotify_id -> índice inteiro da linha/coluna."""
+        if self._index is None:
+            self._index = {artist_id: i for i, artist_id in enumerate(self.artist_ids)}
+        return self._index
+
+    @property
+    def degree(self):
+        """Número de colaboradores distintos de cada artista."""
+        return np.diff(self.adjacency.indptr)
+
+    @property
+    def weighted_degree(self):
+        """Soma dos pesos das arestas de cada artista."""
+        return np.asarray(self.adjacency.sum(axis=1)).ravel()
+
+    @property
+    def node_mask(self):
+        """Artistas que são nós do grafo (grau > 0)."""
+        return self.degree > 0
+
+    @property
+    def number_of_nodes(self):
+        return int(self.node_mask.sum())
+
+    @property
+    def number_of_edges(self):
+        return int(self.adjacency.nnz // 2)
+
+    @property
+    def edges(self):
+        """Array (m, 2) de índices com i < j (triângulo superior da adjacência)."""
+        upper = sp.triu(self.adjacency, k=1, format='coo')
+        return np.column_stack([upper.row, upper.col]).astype(np.int32).reshape(-1, 2)
+
+    @property
+    def weights(self):
+        return sp.triu(self.adjacency, k=1, format='coo').data
+
+    def degree_centrality(self):
+        """Mesma normalização do nx.degree_centrality: grau / (n - 1), n = nós do grafo."""
+        n = self.number_of_nodes
+        scale = 1.0 / (n - 1) if n > 1 else 0.0
+        return self.degree * scale
+
+    def connected_components(self):
+        """Rótulo de componente por artista (-1 para quem não é nó do grafo) e nº de componentes."""
+        mask = self.node_mask
+        labels = np.full(len(self.artist_ids), -1, dtype=np.int64)
+        sub = self.adjacency[mask][:, mask]
+        num_components, sub_labels = csgraph.connected_components(sub, directed=False)
+        labels[mask] = sub_labels
+        return labels, num_components
+
+    def core_numbers(self):
+        """k-core de cada artista por remoção em lotes (equivalente ao nx.core_number)."""
+        binary = self.adjacency.copy()
+        binary.data = np.ones_like(binary.data)
+        deg = self.degree.astype(np.int64)
+        core = np.zeros(len(deg), dtype=np.int64)
+        alive = np.ones(len(deg), dtype=bool)
+        k = 0
+        while alive.any():
+            k = max(k, int(deg[alive].min()))
+            while True:
+                peel = alive & (deg <= k)
+                if not peel.any():
+                    break
+                core[peel] = k
+                alive[peel] = False
+                deg -= binary @ peel.astype(np.int64)
+        return core
+
+    def to_networkx(self, mask=None):
+        """Grafo NetworkX; com `mask` (bool por artista), só o subgrafo induzido."""
+        G = nx.Graph()
+        edges, weights = self.edges, self.weights
+        if mask is not None:
+            keep = mask[edges[:, 0]] & mask[edges[:, 1]]
+            edges, weights = edges[keep], weights[keep]
+        u = self.artist_ids[edges[:, 0]]
+        v = self.artist_ids[edges[:, 1]]
+        G.add_weighted_edges_from(zip(u.tolist(), v.tolist(), weights.tolist()), weight='weight')
+        return G
+
+    def save(self, path=SNAPSHOT_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as fh:
+            np.savez(
+                fh,
+                version=SNAPSHOT_VERSION,
+                fingerprint=self.fingerprint,
+                artist_ids=self.artist_ids.astype(str),
+                song_pks=self.song_pks,
+                incidence_indptr=self.incidence.indptr,
+                incidence_indices=self.incidence.indices,
+                adjacency_indptr=self.adjacency.indptr,
+                adjacency_indices=self.adjacency.indices,
+                adjacency_data=self.adjacency.data,
+            )
+        # Troca atômica: um comando concorrente nunca lê um snapshot pela metade
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Lê o snapshot do disco. Retorna None se não existir ou for de outra versão."""
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != SNAPSHOT_VERSION:
+                return None
+            artist_ids = data['artist_ids'].astype(object)
+            song_pks = data['song_pks']
+            shape = (len(artist_ids), len(song_pks))
+            indices = data['incidence_indices']
+            incidence = sp.csr_matrix(
+                (np.ones(len(indices), dtype=np.int32), indices, data['incidence_indptr']), shape=shape
+            )
+            adjacency = sp.csr_matrix(
+                (data['adjacency_data'], data['adjacency_indices'], data['adjacency_indptr']),
+                shape=(len(artist_ids), len(artist_ids)),
+            )
+            return cls(artist_ids, song_pks, incidence, str(data['fingerprint']), adjacency=adjacency)
+
+
+def _adjacency_from_incidence(incidence):
+    adjacency = (incidence @ incidence.T).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    adjacency.sort_indices()
+    return adjacency
+
+
+def build_collaboration_graph(links, fingerprint):
+    """Monta a incidência artista x música direto dos pares da tabela intermediária."""
+    artist_ids, rows = np.unique(links['artist_id'].to_numpy(dtype=object), return_inverse=True)
+    song_pks, cols = np.unique(links['song_pk'].to_numpy(dtype=np.int64), return_inverse=True)
+    incidence = sp.csr_matrix(
+        (np.ones(len(links), dtype=np.int32), (rows, cols)), shape=(len(artist_ids), len(song_pks))
+    )
+    incidence.sort_indices()
+    return CollaborationGraph(artist_ids.astype(object), song_pks, incidence, fingerprint)
+
+
+def get_collaboration_graph(use_cache=True, path=SNAPSHOT_PATH):
+    """Retorna o grafo de colaboração, reconstruindo o snapshot só se os dados mudaram."""
+    links = load_song_artist_links()
+    fingerprint = links_fingerprint(links)
+
+    if use_cache:
+        cached = CollaborationGraph.load(path)
+        if cached is not None and cached.fingerprint == fingerprint:
+            cached.from_cache = True
+            return cached
+
+    graph = build_collaboration_graph(links, fingerprint)
+    graph.save(path)
+    return graph
+
+
+_SNAPSHOT_MEMO = {}
+
+
+def cached_collaboration_graph(path=SNAPSHOT_PATH):
+    """Snapshot já gravado em disco, mantido em memória e relido só quando o arquivo muda.
+
+    Não consulta o banco (nem a impressão digital): serve consultas rápidas (API,
+    ego-redes) entre duas execuções do analyze_network. Retorna None se não houver
+    snapshot compatível.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    memo = _SNAPSHOT_MEMO.get(path)
+    if memo is None or memo[0] != mtime:
+        memo = (mtime, CollaborationGraph.load(path))
+        _SNAPSHOT_MEMO[path] = memo
+    return memo[1]
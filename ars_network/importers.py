@@ -0,0 +1,264 @@
+# ars_network/importers.py
+#
+# Preparação vetorizada (coluna a coluna) dos DataFrames do MGD+ e inserção em massa
+# no banco. Usado pelo comando import_mgd_data.
+
+from collections import namedtuple
+
+import pandas as pd
+from ars_network.models import Artist, ChartEntry, HitSong
+
+# Resultado de um upsert: chaves (spotify_id) inseridas/atualizadas e campos alterados
+UpsertResult = namedtuple('UpsertResult', ['created', 'updated', 'fields'])
+LinkSyncResult = namedtuple('LinkSyncResult', ['added', 'removed', 'songs', 'artists'])
+
+AUDIO_FEATURES = [
+    'danceability', 'energy', 'valence', 'tempo',
+    'liveness', 'acousticness', 'speechiness', 'instrumentalness',
+]
+
+# Caracteres de "lista como string" do MGD+ (ex: "['id1', 'id2']")
+_LIST_CHARS = r"[\[\]'\"]"
+
+
+def _strip_list_chars(series):
+    return series.fillna("").astype(str).str.replace(_LIST_CHARS, "", regex=True)
+
+
+def _none_for_nan(df):
+    """Converte NaN/NaT em None para que o Django grave NULL."""
+    df = df.astype(object)
+    return df.where(df.notna(), None)
+
+
+def split_id_lists(df, list_column, key_column):
+    """Explode uma coluna de listas de IDs em pares (chave, id), sem loop por linha."""
+    exploded = (
+        _strip_list_chars(df[list_column])
+        .str.split(',')
+        .explode()
+        .str.strip()
+    )
+    pairs = pd.DataFrame({key_column: df.loc[exploded.index, key_column].values, 'artist_id': exploded.values})
+    pairs = pairs[pairs['artist_id'].fillna("") != ""]
+    return pairs.drop_duplicates().reset_index(drop=True)
+
+
+def prepare_artists(df_artists):
+    """Mapeia o DataFrame de artistas para os campos do modelo Artist."""
+    df = df_artists.drop_duplicates(subset='artist_id')
+    prepared = pd.DataFrame({
+        'spotify_id': df['artist_id'].astype(str).str.strip(),
+        'name': df['name'],
+        # Salva a lista de gêneros como string (MGD+ original)
+        'genres': _strip_list_chars(df['genres']),
+        'artist_popularity': df['popularity'].astype('Int64'),
+    })
+    return _none_for_nan(prepared).reset_index(drop=True)
+
+
+def prepare_hitsongs(df_hits):
+    """Mapeia o DataFrame de hits para os campos do modelo HitSong (NaN, datas, nomes)."""
+    df = df_hits.drop_duplicates(subset='song_id')
+    song_ids = df['song_id'].astype(str).str.strip()
+
+    # Trata nomes ausentes/vazios com o mesmo texto do caminho antigo
+    song_names = df['song_name']
+    missing_name = song_names.isna() | (song_names.fillna("").astype(str).str.strip() == "")
+    song_names = song_names.where(~missing_name, "Nome Desconhecido (ID: " + song_ids + ")")
+
+    num_artists = df['num_artists'] if 'num_artists' in df else pd.Series(1, index=df.index)
+
+    prepared = pd.DataFrame({
+        'spotify_id': song_ids,
+        'name': song_names,
+        'album': df['album'] if 'album' in df else "N/A",
+        'popularity': df['popularity'].fillna(0).astype(int),
+        # Datas em formatos inválidos viram NaT -> NULL
+        'release_date': pd.to_datetime(df['release_date'], errors='coerce', format='mixed').dt.date,
+        'explicit': df['explicit'].fillna(False).astype(bool),
+        'is_collaboration': num_artists.fillna(1) > 1,
+        'market_of_origin': 'BR - Brasil',  # Fixo para o escopo
+    })
+    for feature in AUDIO_FEATURES:
+        prepared[feature] = df[feature].astype(float)
+
+    return _none_for_nan(prepared).reset_index(drop=True)
+
+
+def prepare_song_artist_links(df_hits):
+    """Pares (song_id, artist_id) a partir da coluna de lista de artistas de cada hit."""
+    df = df_hits.drop_duplicates(subset='song_id').copy()
+    df['song_id'] = df['song_id'].astype(str).str.strip()
+    return split_id_lists(df, 'artist_id', 'song_id')
+
+
+def bulk_create_artists(prepared, batch_size):
+    artists = [Artist(**record) for record in prepared.to_dict('records')]
+    Artist.objects.bulk_create(artists, batch_size=batch_size, ignore_conflicts=True)
+    return len(artists)
+
+
+def bulk_create_hitsongs(prepared, batch_size):
+    songs = [HitSong(**record) for record in prepared.to_dict('records')]
+    HitSong.objects.bulk_create(songs, batch_size=batch_size)
+    return len(songs)
+
+
+def _resolve_link_rows(links):
+    """Troca o spotify_id da música pela PK e descarta pares com música/artista inexistente."""
+    song_pk_map = pd.Series(dict(HitSong.objects.values_list('spotify_id', 'id')), dtype=object)
+    known_artists = set(Artist.objects.values_list('spotify_id', flat=True))
+
+    links = links[links['song_id'].isin(song_pk_map.index) & links['artist_id'].isin(known_artists)]
+    return links.assign(hitsong_id=song_pk_map.loc[links['song_id']].values)
+
+
+def bulk_link_artists(links, batch_size):
+    """Preenche a tabela intermediária HitSong.artists com um único bulk insert de pares."""
+    through = HitSong.artists.through
+    links = _resolve_link_rows(links)
+
+    rows = [
+        through(hitsong_id=song_pk, artist_id=artist_id)
+        for song_pk, artist_id in zip(links['hitsong_id'].values, links['artist_id'].values)
+    ]
+    through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return len(rows)
+
+
+# ----------------------------------------------------
+# Importação incremental (upsert por spotify_id)
+# ----------------------------------------------------
+
+def _diff_against_db(model, prepared):
+    """Compara o DataFrame preparado com o banco. Retorna (novas linhas, linhas alteradas, campos alterados)."""
+    fields = [c for c in prepared.columns if c != 'spotify_id']
+    existing = pd.DataFrame(
+        list(model.objects.values('pk', 'spotify_id', *fields)),
+        columns=['pk', 'spotify_id', *fields],
+    )
+    merged = prepared.merge(
+        _none_for_nan(existing), on='spotify_id', how='left', suffixes=('', '__db'), indicator=True
+    )
+    is_new = (merged['_merge'] == 'left_only').values
+
+    changed_mask = pd.Series(False, index=merged.index)
+    changed_fields = []
+    for field in fields:
+        new, old = merged[field], merged[field + '__db']
+        # None == None conta como igual; qualquer outra diferença marca a linha
+        differs = new.ne(old) & ~(new.isna() & old.isna()) & ~is_new
+        if differs.any():
+            changed_fields.append(field)
+            changed_mask |= differs
+
+    return prepared[is_new], merged[changed_mask.values], changed_fields
+
+
+def upsert_rows(model, prepared, batch_size):
+    """Insere só as linhas novas e atualiza (bulk_update) só as linhas e campos que mudaram.
+
+    Os campos de métricas (betweenness, IHG, ...) não fazem parte de `prepared` e,
+    portanto, são preservados.
+    """
+    new_rows, changed_rows, changed_fields = _diff_against_db(model, prepared)
+
+    objs = [model(**record) for record in new_rows.to_dict('records')]
+    model.objects.bulk_create(objs, batch_size=batch_size)
+
+    if changed_fields:
+        updates = [
+            model(pk=record['pk'], **{f: record[f] for f in changed_fields})
+            for record in _none_for_nan(changed_rows[['pk', *changed_fields]]).to_dict('records')
+        ]
+        model.objects.bulk_update(updates, changed_fields, batch_size=batch_size)
+
+    return UpsertResult(
+        created=new_rows['spotify_id'].tolist(),
+        updated=changed_rows['spotify_id'].tolist(),
+        fields=changed_fields,
+    )
+
+
+def sync_song_artist_links(links, batch_size):
+    """Sincroniza a relação M:M apenas para as músicas presentes em `links`.
+
+    Insere os pares que faltam e remove os pares que deixaram de existir. Retorna
+    as músicas e os artistas cujas ligações mudaram.
+    """
+    through = HitSong.artists.through
+    desired = _resolve_link_rows(links)[['hitsong_id', 'artist_id']]
+
+    # Uma única consulta na tabela intermediária; o filtro por música é feito no pandas
+    existing = pd.DataFrame(
+        list(through.objects.values_list('id', 'hitsong_id', 'artist_id')),
+        columns=['id', 'hitsong_id', 'artist_id'],
+    )
+    existing = existing[existing['hitsong_id'].isin(desired['hitsong_id'])]
+    merged = desired.merge(existing, on=['hitsong_id', 'artist_id'], how='outer', indicator=True)
+    to_add = merged[merged['_merge'] == 'left_only']
+    to_remove = merged[merged['_merge'] == 'right_only']
+
+    through.objects.bulk_create(
+        [through(hitsong_id=s, artist_id=a) for s, a in zip(to_add['hitsong_id'], to_add['artist_id'])],
+        batch_size=batch_size,
+    )
+    remove_ids = to_remove['id'].astype(int).tolist()
+    for start in range(0, len(remove_ids), batch_size):
+        through.objects.filter(id__in=remove_ids[start:start + batch_size]).delete()
+
+    touched = pd.concat([to_add, to_remove])
+    song_spotify_ids = dict(HitSong.objects.values_list('id', 'spotify_id'))
+    return LinkSyncResult(
+        added=len(to_add),
+        removed=len(to_remove),
+        songs=sorted(song_spotify_ids[pk] for pk in touched['hitsong_id'].unique()),
+        artists=sorted(touched['artist_id'].unique().tolist()),
+    )
+
+
+# ----------------------------------------------------
+# Charts semanais (data/processed/charts, gerado por scripts/load_data.py)
+# ----------------------------------------------------
+
+CHART_FIELDS = ['position', 'streams', 'peak_position', 'weeks_on_chart']
+
+
+def prepare_chart_entries(df_charts, market):
+    """Mapeia as linhas do dataset de Charts para os campos do modelo ChartEntry."""
+    df = df_charts.assign(song_id=df_charts['song_id'].astype(str).str.strip())
+    df = df.drop_duplicates(subset=['song_id', 'week_start'])
+    prepared = pd.DataFrame({
+        'song_id': df['song_id'],
+        'market': market,
+        'week_start': pd.to_datetime(df['week_start']).dt.date,
+        'week_end': pd.to_datetime(df['week_end']).dt.date,
+    })
+    for field in CHART_FIELDS:
+        prepared[field] = df[field].astype('Int64')
+    return prepared.reset_index(drop=True)
+
+
+def _chart_entry_objects(prepared):
+    """Troca o spotify_id pela PK da HitSong (linhas de músicas fora do banco são descartadas)."""
+    song_pk_map = dict(HitSong.objects.values_list('spotify_id', 'id'))
+    prepared = prepared.assign(song_pk=prepared['song_id'].map(song_pk_map)).dropna(subset=['song_pk'])
+    records = _none_for_nan(prepared.drop(columns='song_id')).to_dict('records')
+    return [ChartEntry(song_id=int(record.pop('song_pk')), **record) for record in records]
+
+
+def bulk_create_chart_entries(prepared, batch_size):
+    entries = _chart_entry_objects(prepared)
+    ChartEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+    return len(entries)
+
+
+def sync_chart_entries(prepared, batch_size):
+    """Substitui as entradas do mercado nas semanas presentes em `prepared` (modo incremental)."""
+    if prepared.empty:
+        return 0
+    market = prepared['market'].iloc[0]
+    weeks = sorted(prepared['week_start'].unique())
+    ChartEntry.objects.filter(market=market, week_start__in=weeks).delete()
+    return bulk_create_chart_entries(prepared, batch_size)
@@ -0,0 +1,233 @@
+# ars_network/layout.py
+#
+# Layouts do grafo de colaboração calculados uma única vez e guardados em disco,
+# com chave (impressão digital do grafo, motor, parâmetros). Os comandos visualize_*
+# leem as posições daqui em vez de repetir o spring_layout O(n²) a cada execução.
+#
+# Motores:
+#   - 'spring': nx.spring_layout (Fruchterman-Reingold exato, o das figuras originais);
+#   - 'barnes_hut': Fruchterman-Reingold com repulsão aproximada por grade (células
+#     vizinhas de forma exata, distantes como massas somadas por FFT), quase linear
+#     por iteração, para o grafo global de vários mercados.
+# Quando o grafo muda pouco, o cálculo parte das posições do layout anterior com os
+# mesmos parâmetros (warm start) e os artistas novos nascem junto aos colaboradores.
+
+import hashlib
+import json
+import os
+
+import networkx as nx
+import numpy as np
+from scipy.signal import fftconvolve
+from scipy.spatial import cKDTree
+
+from ars_network.graph import CACHE_DIR
+
+LAYOUT_DIR = CACHE_DIR / "layouts"
+LAYOUT_ENGINES = ('spring', 'barnes_hut')
+
+# Parâmetros das figuras originais: nx.spring_layout(G, k=0.18, iterations=50, seed=42)
+DEFAULT_K = 0.18
+DEFAULT_ITERATIONS = 50
+DEFAULT_SEED = 42
+
+# Lado máximo da grade de repulsão do motor 'barnes_hut'
+MAX_GRID_SIZE = 256
+# Fração da extensão do layout usada como passo máximo inicial no warm start
+WARM_START_TEMPERATURE = 0.005
+
+
+def add_layout_arguments(parser):
+    """Opções de layout comuns aos comandos visualize_*."""
+    parser.add_argument(
+        '--layout', choices=LAYOUT_ENGINES, default='spring',
+        help="Motor de layout: 'spring' (exato, padrão) ou 'barnes_hut' (aproximado, para grafos grandes)."
+    )
+    parser.add_argument(
+        '--layout-iterations', type=int, default=DEFAULT_ITERATIONS,
+        help=f'Iterações do layout (padrão: {DEFAULT_ITERATIONS}).'
+    )
+    parser.add_argument(
+        '--no-layout-cache', action='store_true',
+        help='Recalcula o layout do zero (sem ler o cache nem partir do layout anterior).'
+    )
+
+
+def layout_options(options):
+    """Converte as opções do comando nos argumentos de get_layout()."""
+    return {
+        'engine': options['layout'],
+        'iterations': options['layout_iterations'],
+        'use_cache': not options['no_layout_cache'],
+    }
+
+
+def _params_key(engine, k, iterations, seed):
+    params = json.dumps({'engine': engine, 'k': k, 'iterations': iterations, 'seed': seed}, sort_keys=True)
+    return hashlib.sha1(params.encode('utf-8')).hexdigest()[:16]
+
+
+def layout_key(engine, iterations, k=DEFAULT_K, seed=DEFAULT_SEED):
+    """Chave dos parâmetros de layout (a mesma dos arquivos em cache), para nomear saídas derivadas."""
+    return _params_key(engine, k, iterations, seed)
+
+
+def _layout_path(params_key, fingerprint):
+    return LAYOUT_DIR / f"{params_key}_{fingerprint[:16]}.npz"
+
+
+def _save(path, fingerprint, pos):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as fh:
+        np.savez(
+            fh,
+            fingerprint=fingerprint,
+            nodes=np.array(list(pos), dtype=str),
+            positions=np.array(list(pos.values()), dtype=np.float64).reshape(-1, 2),
+        )
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    with np.load(path, allow_pickle=False) as data:
+        return str(data['fingerprint']), dict(zip(data['nodes'].astype(object), data['positions']))
+
+
+def _latest_layout(params_key):
+    """Layout mais recente com os mesmos parâmetros (de qualquer versão do grafo)."""
+    candidates = sorted(LAYOUT_DIR.glob(f"{params_key}_*.npz"), key=lambda p: p.stat().st_mtime_ns)
+    return _load(candidates[-1])[1] if candidates else None
+
+
+def warm_start_positions(G, previous, seed=DEFAULT_SEED):
+    """Posições iniciais a partir de um layout anterior.
+
+    Nós que já existiam mantêm a posição; nós novos nascem no centroide dos vizinhos
+    já posicionados (ou em um ponto aleatório, se não houver nenhum), com um leve ruído.
+    """
+    rng = np.random.default_rng(seed)
+    pos = {node: np.asarray(previous[node], dtype=float) for node in G if node in previous}
+    pending = [node for node in G if node not in pos]
+    for node in pending:
+        placed = [pos[nbr] for nbr in G[node] if nbr in pos]
+        center = np.mean(placed, axis=0) if placed else rng.uniform(-1, 1, 2)
+        pos[node] = center + rng.normal(scale=0.01, size=2)
+    return pos
+
+
+def _far_field_kernels(grid_size, cell_size, k):
+    """Núcleos da repulsão k²/d entre células da grade (zerados nas 8 células vizinhas)."""
+    offsets = np.arange(-(grid_size - 1), grid_size) * cell_size
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    dist2 = dx ** 2 + dy ** 2
+    near = np.maximum(np.abs(dx), np.abs(dy)) <= cell_size * 1.0001
+    scale = np.where(near, 0.0, k * k / np.where(near, 1.0, dist2))
+    return dx * scale, dy * scale
+
+
+def barnes_hut_layout(G, k=None, iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED, pos=None, weight='weight'):
+    """Fruchterman-Reingold com repulsão aproximada por grade (O(n + g² log g) por iteração).
+
+    O plano é dividido em uma grade g×g (g ≈ √n). Pares em células vizinhas se
+    repelem de forma exata (cKDTree); as demais células agem como massas pontuais
+    no centro, somadas de uma vez por convolução FFT da grade de massas com o
+    núcleo k²/d. Atração e resfriamento seguem o nx.spring_layout, e o resultado
+    é reescalado para [-1, 1].
+    """
+    nodes = list(G)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    rng = np.random.default_rng(seed)
+    if pos is not None:
+        xy = np.array([pos[node] if node in pos else rng.uniform(-1, 1, 2) for node in nodes], dtype=float)
+    else:
+        xy = rng.uniform(0, 1, (n, 2))
+
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    weights = np.array([d.get(weight, 1.0) for _, _, d in G.edges(data=True)], dtype=float)
+
+    k = k if k is not None else np.sqrt(1.0 / n)
+    # Partindo de um layout anterior, a temperatura menor preserva o mapa já conhecido
+    temperature = max(np.ptp(xy, axis=0).max(), 1e-9) * (0.1 if pos is None else WARM_START_TEMPERATURE)
+    cooling = temperature / (iterations + 1)
+    grid_size = int(np.clip(np.sqrt(n), 4, MAX_GRID_SIZE))
+
+    for _ in range(iterations):
+        displacement = np.zeros_like(xy)
+        low = xy.min(axis=0)
+        cell_size = max(np.ptp(xy, axis=0).max(), 1e-9) / grid_size
+        cells = np.minimum(((xy - low) / cell_size).astype(np.int64), grid_size - 1)
+
+        # a. Repulsão exata entre pares nas células vizinhas (incluindo a própria)
+        pairs = cKDTree(xy).query_pairs(2 * np.sqrt(2) * cell_size, output_type='ndarray')
+        pairs = pairs[np.abs(cells[pairs[:, 0]] - cells[pairs[:, 1]]).max(axis=1) <= 1]
+        if len(pairs):
+            delta = xy[pairs[:, 0]] - xy[pairs[:, 1]]
+            dist2 = np.maximum((delta ** 2).sum(axis=1), 1e-6)
+            force = delta * (k * k / dist2)[:, None]
+            np.add.at(displacement, pairs[:, 0], force)
+            np.subtract.at(displacement, pairs[:, 1], force)
+
+        # b. Repulsão das células distantes: grade de massas convoluída com o núcleo k²/d
+        mass = np.bincount(cells[:, 0] * grid_size + cells[:, 1], minlength=grid_size * grid_size)
+        mass = mass.reshape(grid_size, grid_size).astype(float)
+        kernel_x, kernel_y = _far_field_kernels(grid_size, cell_size, k)
+        field_x = fftconvolve(mass, kernel_x, mode='same')
+        field_y = fftconvolve(mass, kernel_y, mode='same')
+        displacement[:, 0] += field_x[cells[:, 0], cells[:, 1]]
+        displacement[:, 1] += field_y[cells[:, 0], cells[:, 1]]
+
+        # c. Atração ao longo das arestas (proporcional ao peso)
+        if len(edges):
+            delta = xy[edges[:, 0]] - xy[edges[:, 1]]
+            dist = np.sqrt(np.maximum((delta ** 2).sum(axis=1), 1e-12))
+            force = delta * (dist * weights / k)[:, None]
+            np.subtract.at(displacement, edges[:, 0], force)
+            np.add.at(displacement, edges[:, 1], force)
+
+        # d. Passo limitado pela temperatura
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        xy += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    xy = nx.rescale_layout(xy, scale=1)
+    return dict(zip(nodes, xy))
+
+
+def compute_layout(G, engine='spring', k=DEFAULT_K, iterations=DEFAULT_ITERATIONS, seed=DEFAULT_SEED, pos=None):
+    if engine == 'barnes_hut':
+        return barnes_hut_layout(G, k=k, iterations=iterations, seed=seed, pos=pos)
+    return nx.spring_layout(G, k=k, iterations=iterations, seed=seed, pos=pos)
+
+
+def get_layout(G, fingerprint, engine='spring', k=DEFAULT_K, iterations=DEFAULT_ITERATIONS,
+               seed=DEFAULT_SEED, use_cache=True):
+    """Posições {spotify_id: array([x, y])} do grafo, do cache quando possível.
+
+    `fingerprint` identifica a versão do grafo (CollaborationGraph.fingerprint).
+    Sem layout em cache para esta versão, o cálculo parte do layout anterior com
+    os mesmos parâmetros (warm start), se existir.
+    """
+    params_key = _params_key(engine, k, iterations, seed)
+    path = _layout_path(params_key, fingerprint)
+
+    if use_cache and path.exists():
+        cached_fingerprint, pos = _load(path)
+        if cached_fingerprint == fingerprint and set(pos) == set(G):
+            return pos
+
+    initial = None
+    if use_cache:
+        previous = _latest_layout(params_key)
+        if previous:
+            initial = warm_start_positions(G, previous, seed=seed)
+
+    pos = compute_layout(G, engine=engine, k=k, iterations=iterations, seed=seed, pos=initial)
+    _save(path, fingerprint, pos)
+    return pos
@@ -0,0 +1,63 @@
+# ars_network/management/commands/analyze_chart_trends.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ars_network.models import HitSong
+from ars_network.charts import TREND_STABLE, chart_momentum, load_chart_entries
+from ars_network.persistence import bulk_update_changed, record_analysis_run
+import pandas as pd
+
+class Command(BaseCommand):
+    help = 'Calcula velocidade, média/desvio móveis e tendência dos hits a partir das posições semanais (ChartEntry).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--market', default='br',
+            help="Mercado dos Charts usado na série temporal (padrão: 'br')."
+        )
+        parser.add_argument(
+            '--window', type=int, default=4,
+            help='Tamanho da janela móvel, em semanas no chart (padrão: 4).'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=1.0,
+            help="Variação média mínima (pontos/semana) para 'rising'/'falling' (padrão: 1.0)."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tamanho dos lotes do bulk_update (padrão: 500).'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("--- INICIANDO ANÁLISE DE TENDÊNCIA DOS CHARTS ---"))
+
+        # 1. Série temporal do mercado (uma única consulta)
+        entries = load_chart_entries(options['market'])
+        if entries.empty:
+            self.stdout.write(self.style.ERROR(
+                f"Nenhuma posição de Charts para o mercado '{options['market']}'. Rode import_mgd_data primeiro."
+            ))
+            return
+        self.stdout.write(f"{len(entries)} posições semanais de {entries['song_id'].nunique()} músicas carregadas.")
+
+        # 2. Momento de todas as músicas em uma única passada de groupby
+        momentum = chart_momentum(entries, window=options['window'], threshold=options['threshold'])
+
+        # 3. Persistência: músicas sem posição no chart ficam sem métricas e 'stable'
+        song_pks = list(HitSong.objects.values_list('pk', flat=True))
+        song_frame = momentum.reindex(song_pks)
+        song_frame['trend'] = song_frame['trend'].fillna(TREND_STABLE)
+        for field in ('velocity', 'mean_popularity', 'std_popularity'):
+            song_frame[field] = pd.to_numeric(song_frame[field])
+
+        with transaction.atomic():
+            updated = bulk_update_changed(HitSong, song_frame, list(song_frame.columns), options['batch_size'])
+
+        counts = momentum['trend'].value_counts()
+        self.stdout.write(f"Tendências: {counts.get('rising', 0)} subindo, {counts.get('falling', 0)} caindo, "
+                          f"{counts.get('stable', 0)} estáveis.")
+        self.stdout.write(f"{updated} HitSongs alteradas.")
+        if updated:
+            record_analysis_run('analyze_chart_trends', songs_updated=updated,
+                                market=options['market'], window=options['window'])
+        self.stdout.write(self.style.SUCCESS("--- TENDÊNCIA DOS CHARTS CONCLUÍDA ---"))
@@ -3,139 +3,231 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from ars_network.models import Artist, HitSong
-import networkx as nx
-import json
+from ars_network.graph import get_collaboration_graph
+from ars_network.persistence import bulk_update_changed, record_analysis_run
+from ars_network.genres import genre_heterogeneity
+from ars_network.centrality import (
+    approximate_betweenness, betweenness_centrality, incremental_betweenness,
+    load_betweenness_state, normalize_betweenness, save_betweenness_state,
+)
+from django.conf import settings
 import numpy as np
-from collections import defaultdict 
+import pandas as pd
 
 class Command(BaseCommand):
     help = 'Constrói a rede de colaboração, calcula as métricas ARS (Centralidade, IHG) e salva no banco.'
 
-    def _calculate_ihg(self, hit_song):
-        """Calcula o Índice de Heterogeneidade de Gênero (IHG) para uma HitSong."""
-        
-        # 1. Obter todos os gêneros únicos de todos os artistas
-        all_genres = set()
-        num_artists = 0
-        
-        # O prefetch_related garante que os dados do artista já estão na memória
-        for artist in hit_song.artists.all():
-            num_artists += 1
-            
-            # O campo 'genres' é uma string formatada como lista (ex: "['pop', 'dance pop']")
-            # Tentativa robusta de extrair a lista de gêneros
-            try:
-                # Usa json.loads para converter a string de lista em uma lista Python
-                genres_list_raw = json.loads(artist.genres.replace("'", "\""))
-                # Certifica que é uma lista de strings
-                genres_list = [g.strip() for g in genres_list_raw if isinstance(g, str)]
-            except (json.JSONDecodeError, AttributeError):
-                # Fallback: Se não for um formato JSON válido, trata como string separada por vírgula
-                genres_list = [g.strip() for g in artist.genres.strip('[]').split(',') if g.strip()]
-            
-            all_genres.update(genres_list)
-
-        # 2. Cálculo do IHG
-        # IHG = (Número de Gêneros Únicos) / (Número de Artistas Colaboradores)
-        if num_artists > 0:
-            return len(all_genres) / num_artists
-        return 0.0
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Número de processos para a Centralidade de Intermediação (padrão: 1, serial).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tamanho dos lotes do bulk_update das métricas (padrão: 500).'
+        )
+        # Modo aproximado (amostragem de pivôs) para rodadas exploratórias / mercado global
+        parser.add_argument(
+            '--approx', action='store_true',
+            help='Estima a Intermediação por amostragem de pivôs em vez do cálculo exato.'
+        )
+        parser.add_argument(
+            '--epsilon', type=float, default=0.01,
+            help='(--approx) Erro absoluto máximo garantido para todos os nós (padrão: 0.01).'
+        )
+        parser.add_argument(
+            '--confidence', type=float, default=0.95,
+            help='(--approx) Nível de confiança da garantia de erro (padrão: 0.95).'
+        )
+        parser.add_argument(
+            '--top-n', type=int, default=20,
+            help='(--approx) Tamanho do ranking de pontes avaliado quanto à estabilidade (padrão: 20).'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='(--approx) Semente do sorteio de pivôs (padrão: 42).'
+        )
+        # Atualização dinâmica após uma carga parcial (import_mgd_data --mode incremental)
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Recalcula a Intermediação só nos componentes com arestas novas/alteradas desde a última análise exata.'
+        )
+
+    def _approximate_betweenness(self, G, artist_id_map, options):
+        """Intermediação por amostragem de pivôs + relatório de erro e estabilidade do ranking."""
+        result = approximate_betweenness(
+            G, epsilon=options['epsilon'], confidence=options['confidence'], weight='weight',
+            workers=options['workers'], seed=options['seed'], top_n=options['top_n'],
+        )
+        if result.exact:
+            self.stdout.write(self.style.NOTICE(
+                f"Amostra necessária >= nº de nós ({G.number_of_nodes()}): usando o cálculo exato."
+            ))
+            return result.values
+
+        stability = result.stability
+        self.stdout.write(
+            f"Intermediação APROXIMADA: {result.num_samples} pivôs de {G.number_of_nodes()} nós "
+            f"(erro <= {result.epsilon} com {result.confidence:.0%} de confiança)."
+        )
+        self.stdout.write(f"Erro estimado por nó: mediana {np.median(list(result.errors.values())):.5f}, "
+                          f"máximo {max(result.errors.values()):.5f}.")
+        self.stdout.write(f"Estabilidade do Top-{stability['top_n']} (Jaccard bootstrap): "
+                          f"média {stability['top_n_jaccard_mean']:.3f}, mínimo {stability['top_n_jaccard_min']:.3f}.")
+        self.stdout.write(f"Estabilidade das Pontes (percentil 90, borda vermelha): "
+                          f"média {stability['bridge_jaccard_mean']:.3f}, mínimo {stability['bridge_jaccard_min']:.3f}.")
+        if stability['unstable_top_n']:
+            names = [artist_id_map[a].name if a in artist_id_map else a for a in stability['unstable_top_n']]
+            self.stdout.write(self.style.WARNING(f"Posições instáveis no Top-{stability['top_n']} (< 90% dos bootstraps): "
+                                                 f"{', '.join(names)}"))
+
+        # Relatório por nó (estimativa, erro e frequência no Top-N / conjunto de pontes)
+        report = pd.DataFrame({
+            'artist_id': list(result.values),
+            'name': [artist_id_map[a].name if a in artist_id_map else "" for a in result.values],
+            'betweenness_estimate': list(result.values.values()),
+            'error_bound': [result.errors[a] for a in result.values],
+            'top_n_frequency': [stability['top_n_frequency'][a] for a in result.values],
+            'bridge_frequency': [stability['bridge_frequency'][a] for a in result.values],
+        }).sort_values('betweenness_estimate', ascending=False)
+        output_dir = settings.BASE_DIR / "data" / "analysis_output"
+        output_dir.mkdir(exist_ok=True)
+        output_path = output_dir / "betweenness_approx_report.csv"
+        report.to_csv(output_path, sep=';', index=False, encoding='utf-8-sig')
+        self.stdout.write(f"Relatório de erro por nó salvo em: {output_path}")
+
+        return result.values
+
+    def _exact_betweenness(self, collab_graph, options):
+        """Intermediação exata (completa ou incremental) e gravação do estado para a próxima rodada."""
+        state = load_betweenness_state() if options['incremental'] else None
+        if options['incremental'] and state is None:
+            self.stdout.write(self.style.NOTICE("Nenhum estado de análise anterior encontrado: cálculo completo."))
+
+        if state is not None:
+            update = incremental_betweenness(collab_graph, state, weight='weight', workers=options['workers'])
+            raw_betweenness = update.raw_betweenness
+            self.stdout.write(
+                f"Modo incremental: {len(update.changed_artists)} artistas com arestas alteradas; "
+                f"{len(update.recomputed_artists)} de {collab_graph.number_of_nodes} nós recalculados."
+            )
+        else:
+            raw_betweenness = betweenness_centrality(
+                collab_graph.to_networkx(), weight='weight', workers=options['workers'], normalized=False
+            )
+
+        save_betweenness_state(collab_graph, raw_betweenness)
+        return normalize_betweenness(raw_betweenness, collab_graph.number_of_nodes)
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("--- INICIANDO ANÁLISE ARS E CÁLCULO DE MÉTRICAS ---"))
         
-        # 1. Preparação: Mapear colaborações
-        collaborations = defaultdict(lambda: defaultdict(int)) # {artist1: {artist2: weight}}
+        # 1. Preparação: Mapear artistas
         artist_id_map = {artist.spotify_id: artist for artist in Artist.objects.all()}
 
         if not artist_id_map:
             self.stdout.write(self.style.ERROR("Nenhum artista encontrado no banco de dados. Importe os dados primeiro."))
             return
 
-        # Busca todas as HitSongs e seus artistas relacionados de uma vez
-        hit_songs = HitSong.objects.prefetch_related('artists').all()
+        # Busca todas as HitSongs de uma vez (os artistas vêm da matriz de incidência)
+        hit_songs = list(HitSong.objects.values_list('pk', flat=True))
         
         self.stdout.write(f"Construindo rede a partir de {len(hit_songs)} hits...")
 
-        # 2. Construção da Rede de Colaboração (Grafo NetworkX)
-        for song in hit_songs:
-            artist_ids = [artist.spotify_id for artist in song.artists.all()]
-            
-            # Cria arestas para todas as combinações (pares) de artistas na música
-            for i in range(len(artist_ids)):
-                for j in range(i + 1, len(artist_ids)):
-                    id1, id2 = sorted((artist_ids[i], artist_ids[j]))
-                    
-                    # Pondera a aresta pelo número de colaborações (MGD+ Methodology)
-                    collaborations[id1][id2] += 1
-        
-        # Cria o grafo
-        G = nx.Graph()
-        
-        for id1, inner_dict in collaborations.items():
-            for id2, weight in inner_dict.items():
-                G.add_edge(id1, id2, weight=weight)
+        # 2. Construção da Rede de Colaboração (snapshot compartilhado, ver ars_network/graph.py)
+        collab_graph = get_collaboration_graph()
+        if collab_graph.from_cache:
+            self.stdout.write("Grafo carregado do snapshot em cache (dados inalterados).")
         
-        self.stdout.write(f"Rede de Colaboração construída: {G.number_of_nodes()} nós, {G.number_of_edges()} arestas.")
+        self.stdout.write(f"Rede de Colaboração construída: {collab_graph.number_of_nodes} nós, {collab_graph.number_of_edges} arestas.")
 
         # 3. Cálculo das Métricas de Centralidade
         self.stdout.write("Calculando Centralidade de Intermediação (Betweenness) e Grau...")
 
         # Centralidade de Intermediação (Betweenness): Peso=weight considera a força da colaboração
-        betweenness = nx.betweenness_centrality(G, weight='weight')
+        # (único passo que ainda precisa do grafo NetworkX; origens divididas entre --workers processos)
+        if options['approx']:
+            betweenness = self._approximate_betweenness(collab_graph.to_networkx(), artist_id_map, options)
+        else:
+            betweenness = self._exact_betweenness(collab_graph, options)
+
+        # Métricas estruturais direto na matriz CSR (NumPy/SciPy)
         # Centralidade de Grau (Degree): Quantos colaboradores o artista tem
-        degree = nx.degree_centrality(G)
+        nodes = collab_graph.node_mask
+        degree = dict(zip(collab_graph.artist_ids[nodes], collab_graph.degree_centrality()[nodes]))
+        weighted_degree = collab_graph.weighted_degree
+        component_labels, num_components = collab_graph.connected_components()
+        core = collab_graph.core_numbers()
+
+        largest_component = np.bincount(component_labels[nodes]).max() if nodes.any() else 0
+        self.stdout.write(f"Componentes conexos: {num_components} (maior: {largest_component} artistas).")
+        if nodes.any():
+            self.stdout.write(f"Grau ponderado máximo: {weighted_degree.max()} | k-core máximo: {core.max()} "
+                              f"({int((core == core.max()).sum())} artistas no núcleo).")
 
         # 4. Persistência: Artistas (Nós) - Salvando as métricas de Centralidade
         self.stdout.write("Salvando Centralidades no modelo Artist...")
+
+        # Contagem de Hits e Colaborações direto da matriz de incidência (sem consulta por artista)
+        incidence = collab_graph.incidence
+        song_is_collab = dict(HitSong.objects.values_list('id', 'is_collaboration'))
+        collab_columns = np.array([song_is_collab.get(pk, False) for pk in collab_graph.song_pks], dtype=np.int64)
+        num_hits = dict(zip(collab_graph.artist_ids, np.diff(incidence.indptr)))
+        # Collab hits: hits onde o artista participou E havia mais de um artista
+        num_collab_hits = dict(zip(collab_graph.artist_ids, incidence @ collab_columns))
+
+        artist_ids = list(artist_id_map)
+        artist_frame = pd.DataFrame({
+            'betweenness_centrality': [betweenness.get(a, 0.0) for a in artist_ids],
+            'degree_centrality': [degree.get(a, 0.0) for a in artist_ids],
+            'num_hits': [num_hits.get(a, 0) for a in artist_ids],
+            'num_collab_hits': [num_collab_hits.get(a, 0) for a in artist_ids],
+        }, index=artist_ids)
+
         with transaction.atomic():
-            for artist_id, artist_obj in artist_id_map.items():
-                
-                # Campos vazios no Admin (serão preenchidos aqui)
-                artist_obj.betweenness_centrality = betweenness.get(artist_id, 0.0)
-                artist_obj.degree_centrality = degree.get(artist_id, 0.0)
-                
-                # Opcional, mas útil: Contagem de Hits e Colaborações (simples, mas robusto)
-                artist_hits = hit_songs.filter(artists=artist_obj)
-                artist_obj.num_hits = artist_hits.count()
-                # Collab hits: hits onde o artista participou E havia mais de um artista
-                artist_obj.num_collab_hits = artist_hits.filter(is_collaboration=True).count()
-                
-                artist_obj.save()
+            artists_updated = bulk_update_changed(Artist, artist_frame, list(artist_frame.columns), options['batch_size'])
         
-        self.stdout.write("Centralidades e contagem de Hits salvas no modelo Artist.")
+        self.stdout.write(f"Centralidades e contagem de Hits salvas no modelo Artist ({artists_updated} artistas alterados).")
 
         # 5. Cálculo e Persistência: HitSongs (IHG e Centralidade Média)
         self.stdout.write("Calculando IHG e Média de Intermediação para HitSongs...")
-        
-        # Re-carrega os objetos Artist com as novas centralidades salvas
-        artists_with_metrics = {a.spotify_id: a for a in Artist.objects.all()}
 
+        # Intermediação Média dos Colaboradores: Bᵀ·b / nº de artistas da música
+        artist_betweenness = np.array([betweenness.get(a, 0.0) for a in collab_graph.artist_ids])
+        total_betweenness = incidence.T @ artist_betweenness
+        num_collaborators = np.diff(incidence.tocsc().indptr)
+        avg_by_song_pk = dict(zip(
+            collab_graph.song_pks,
+            np.divide(total_betweenness, num_collaborators, out=np.zeros(len(total_betweenness)), where=num_collaborators > 0),
+        ))
+
+        # a. IHG (Heterogeneidade de Gênero), Entropia e Gini-Simpson de todas as músicas de uma vez
+        heterogeneity = genre_heterogeneity(incidence, collab_graph.artist_ids)
+        heterogeneity.index = collab_graph.song_pks
+
+        # Músicas sem artistas ligados ficam com 0.0
+        songs = pd.DataFrame(index=pd.Index(hit_songs, name='pk'))
+        heterogeneity = heterogeneity.reindex(songs.index, fill_value=0.0)
+        song_frame = pd.DataFrame({
+            'genre_heterogeneity_index': heterogeneity['ihg'],
+            'genre_entropy': heterogeneity['entropy'],
+            'genre_gini_simpson': heterogeneity['gini_simpson'],
+            # b. Intermediação Média dos Colaboradores
+            'avg_artist_betweenness': pd.Series(avg_by_song_pk, dtype=float).reindex(songs.index, fill_value=0.0),
+        }, index=songs.index)
+
+        # c. Persistir na HitSong (só linhas e campos alterados)
         with transaction.atomic():
-            for song in hit_songs:
-                
-                # a. Calcular IHG (Heterogeneidade de Gênero)
-                ihg_value = self._calculate_ihg(song)
-                
-                # b. Calcular Intermediação Média dos Colaboradores
-                total_betweenness = 0.0
-                num_collaborators = 0
-                
-                for artist in song.artists.all():
-                    # Usa o valor persistido que acabamos de calcular
-                    total_betweenness += artists_with_metrics.get(artist.spotify_id, Artist()).betweenness_centrality
-                    num_collaborators += 1
-                
-                # Evita divisão por zero
-                avg_betweenness = total_betweenness / num_collaborators if num_collaborators > 0 else 0.0
-                
-                # Opcional: Calcula a soma da popularidade, para análise
-                song.mean_popularity = song.popularity
-                
-                # c. Persistir na HitSong
-                song.genre_heterogeneity_index = ihg_value
-                song.avg_artist_betweenness = avg_betweenness
-                song.save()
+            songs_updated = bulk_update_changed(HitSong, song_frame, list(song_frame.columns), options['batch_size'])
+
+        self.stdout.write(f"{songs_updated} HitSongs alteradas.")
 
+        # d. Nova versão das métricas: invalida o cache e os ETags da API JSON
+        if artists_updated or songs_updated:
+            record_analysis_run(
+                'analyze_network', artists_updated, songs_updated,
+                mode='approx' if options['approx'] else ('incremental' if options['incremental'] else 'exact'),
+                nodes=collab_graph.number_of_nodes, edges=collab_graph.number_of_edges,
+            )
         self.stdout.write("IHG e Centralidade Média salvas no modelo HitSong.")
         self.stdout.write(self.style.SUCCESS("--- ANÁLISE ARS CONCLUÍDA. DADOS PRONTOS PARA REGRESSÃO! ---"))
\ No newline at end of file
@@ -0,0 +1,91 @@
+# ars_network/management/commands/analyze_temporal_network.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ars_network.models import ArtistCentralitySnapshot
+from ars_network.graph import get_collaboration_graph
+from ars_network.temporal import GRANULARITIES, chart_windows, load_week_song_matrix, temporal_centrality
+from ars_network.timing import PhaseTimer
+import numpy as np
+
+class Command(BaseCommand):
+    help = 'Calcula a Centralidade de Intermediação e de Grau por janela temporal (ano, trimestre ou N semanas) e salva a série por artista.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--market', default='br',
+            help="Mercado dos Charts que define quando cada hit está ativo (padrão: 'br')."
+        )
+        parser.add_argument(
+            '--granularity', choices=GRANULARITIES, default='year',
+            help="'year', 'quarter' ou 'sliding' (janela deslizante de --window-weeks semanas). Padrão: year."
+        )
+        parser.add_argument(
+            '--window-weeks', type=int, default=8,
+            help='(sliding) Tamanho da janela em semanas (padrão: 8).'
+        )
+        parser.add_argument(
+            '--step-weeks', type=int, default=1,
+            help='(sliding) Avanço da janela em semanas (padrão: 1).'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Número de processos para a Centralidade de Intermediação (padrão: 1, serial).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Tamanho dos lotes do bulk_create dos snapshots (padrão: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("--- INICIANDO ANÁLISE DA REDE TEMPORAL ---"))
+        timer = PhaseTimer()
+        market = options['market']
+        granularity = options['granularity']
+        label = f"{options['window_weeks']}w" if granularity == 'sliding' else granularity
+
+        # 1. Grafo completo (snapshot compartilhado) e semanas de Charts de cada música
+        with timer.phase("Grafo e matriz semana x música"):
+            collab_graph = get_collaboration_graph()
+            week_starts, week_ends, week_song = load_week_song_matrix(market, collab_graph)
+
+        if not len(week_starts):
+            self.stdout.write(self.style.ERROR(
+                f"Nenhuma posição de Charts para o mercado '{market}'. Rode import_mgd_data primeiro."
+            ))
+            return
+
+        windows = chart_windows(week_starts, week_ends, granularity,
+                                window_weeks=options['window_weeks'], step_weeks=options['step_weeks'])
+        self.stdout.write(f"{len(week_starts)} semanas de Charts ({market.upper()}) -> {len(windows)} janelas '{label}'.")
+
+        # 2. Centralidades por janela (adjacência e intermediação reaproveitadas da janela anterior)
+        snapshots = []
+        artist_ids = collab_graph.artist_ids
+        with timer.phase("Centralidades por janela"):
+            for result in temporal_centrality(collab_graph, week_song, windows, workers=options['workers']):
+                graph = result.graph
+                self.stdout.write(
+                    f"{result.window.start} a {result.window.end}: {graph.number_of_nodes} nós, "
+                    f"{graph.number_of_edges} arestas ({result.recomputed} nós recalculados)"
+                )
+                for i in np.flatnonzero(result.num_hits > 0):
+                    snapshots.append(ArtistCentralitySnapshot(
+                        artist_id=artist_ids[i],
+                        market=market,
+                        granularity=label,
+                        window_start=result.window.start,
+                        window_end=result.window.end,
+                        num_hits=int(result.num_hits[i]),
+                        betweenness_centrality=float(result.betweenness[i]),
+                        degree_centrality=float(result.degree[i]),
+                    ))
+
+        # 3. Persistência: substitui a série anterior da mesma granularidade
+        with timer.phase("Persistência dos snapshots"), transaction.atomic():
+            ArtistCentralitySnapshot.objects.filter(market=market, granularity=label).delete()
+            ArtistCentralitySnapshot.objects.bulk_create(snapshots, batch_size=options['batch_size'])
+
+        self.stdout.write(f"{len(snapshots)} snapshots de centralidade salvos.")
+        timer.write_report(self.stdout, "Relatório de Tempo (rede temporal)")
+        self.stdout.write(self.style.SUCCESS("--- ANÁLISE DA REDE TEMPORAL CONCLUÍDA ---"))
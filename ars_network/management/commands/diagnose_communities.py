@@ -1,84 +1,81 @@
 # ars_network/management/commands/diagnose_communities.py
 
 from django.core.management.base import BaseCommand
-from ars_network.models import Artist, HitSong
-import networkx as nx
-import community.community_louvain as community
-from collections import defaultdict
-import json
-import operator
+from ars_network.graph import get_collaboration_graph
+from ars_network.communities import (
+    DEFAULT_TOP_GENRES, add_community_arguments, community_options, get_partition, profile_hierarchy,
+    save_communities, write_partition_summary,
+)
+from ars_network.persistence import record_analysis_run
+from ars_network.timing import PhaseTimer
 
 class Command(BaseCommand):
     help = 'Roda o algoritmo Louvain e diagnostica o gênero dominante em cada comunidade.'
 
+    def add_arguments(self, parser):
+        add_community_arguments(parser)
+        parser.add_argument(
+            '--top-genres', type=int, default=DEFAULT_TOP_GENRES,
+            help=f'Quantos gêneros mais frequentes guardar por comunidade (padrão: {DEFAULT_TOP_GENRES}).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tamanho dos lotes do bulk_update (padrão: 500).'
+        )
+
     def _rebuild_graph(self):
         # A mesma função de reconstrução de grafo usada para a visualização
-        collaborations = defaultdict(lambda: defaultdict(int))
-        hit_songs = HitSong.objects.prefetch_related('artists').all()
-        
-        for song in hit_songs:
-            artist_ids = [artist.spotify_id for artist in song.artists.all()]
-            for i in range(len(artist_ids)):
-                for j in range(i + 1, len(artist_ids)):
-                    id1, id2 = sorted((artist_ids[i], artist_ids[j]))
-                    collaborations[id1][id2] += 1
-        
-        G = nx.Graph()
-        for id1, inner_dict in collaborations.items():
-            for id2, weight in inner_dict.items():
-                G.add_edge(id1, id2, weight=weight)
-        return G
+        # Grafo compartilhado (snapshot em cache, ver ars_network/graph.py)
+        self.collab_graph = get_collaboration_graph()
+        return self.collab_graph.to_networkx()
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("--- DIAGNÓSTICO DE COMUNIDADES LOUVAIN ---"))
-        
-        G = self._rebuild_graph()
-        artists = Artist.objects.all()
-        
-        # 1. Executar o Algoritmo Louvain
-        self.stdout.write("Executando Louvain para identificar comunidades...")
-        partition = community.best_partition(G, weight='weight', random_state=42) # Usar a mesma seed
+        timer = PhaseTimer()
 
-        # 2. Mapear Gêneros por Comunidade
-        community_genres = defaultdict(lambda: defaultdict(int))
-        
-        # Iterar sobre todos os artistas
-        for artist in artists:
-            community_id = partition.get(artist.spotify_id)
-            if community_id is None:
-                continue # Artistas isolados (grau 0)
+        with timer.phase("Grafo"):
+            G = self._rebuild_graph()
+
+        # 1. Partição de consenso compartilhada com os visualize_* (ver ars_network/communities.py)
+        self.stdout.write("Executando Louvain para identificar comunidades...")
+        try:
+            with timer.phase("Comunidades"):
+                result = get_partition(G, self.collab_graph.fingerprint, **community_options(options))
+        except ValueError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+        write_partition_summary(self.stdout, result)
 
-            # Extração robusta de gêneros do campo 'genres' (string)
-            try:
-                genres_list_raw = json.loads(artist.genres.replace("'", "\""))
-                genres_list = [g.strip().lower() for g in genres_list_raw if isinstance(g, str)]
-            except (json.JSONDecodeError, AttributeError):
-                genres_list = [g.strip().lower() for g in artist.genres.strip('[]').split(',') if g.strip()]
+        # 2. Perfil de cada comunidade, em todos os níveis da hierarquia (uma passada por nível)
+        hierarchy = result.hierarchy
+        with timer.phase("Perfil das comunidades"):
+            profiles = profile_hierarchy(self.collab_graph, hierarchy, top_k=options['top_genres'])
 
-            # Contar a frequência de cada gênero dentro da comunidade
-            for genre in genres_list:
-                community_genres[community_id][genre] += 1
+        # 3. Persistir em Community, CommunityMembership e Artist.community (só o que mudou)
+        with timer.phase("Persistência"):
+            artists_updated = save_communities(self.collab_graph, hierarchy, profiles, options['batch_size'])
+            # Nova versão das métricas só quando algo mudou (invalida o cache e os ETags da API JSON)
+            if artists_updated:
+                record_analysis_run(
+                    'diagnose_communities', artists_updated,
+                    algorithm=result.algorithm, runs=result.runs,
+                    communities=[len(profile) for profile in profiles], modularity=hierarchy.modularities,
+                )
+        self.stdout.write("\n--- HIERARQUIA DE COMUNIDADES ---")
+        for level, profile in enumerate(profiles):
+            self.stdout.write(f"  Nível {level}: {len(profile)} comunidades | Modularidade: {hierarchy.modularities[level]:.4f}")
+        self.stdout.write(f"{artists_updated} artistas mudaram de comunidade em algum nível.")
 
-        # 3. Determinar o Gênero Dominante de Cada Comunidade
-        self.stdout.write("\n--- RESULTADO DA INFERÊNCIA DE GÊNERO ---")
-        
-        results = {}
-        for community_id, genre_counts in community_genres.items():
-            
-            # Encontra o gênero mais frequente (o dominante)
-            dominant_genre = max(genre_counts.items(), key=operator.itemgetter(1))[0]
-            
-            # Conta o número de artistas na comunidade
-            num_artists_in_community = sum(1 for cid in partition.values() if cid == community_id)
+        # 4. Gênero Dominante de Cada Comunidade do nível pedido (da maior para a menor)
+        level = result.level
+        parents = hierarchy.parents(level)
+        self.stdout.write(f"\n--- RESULTADO DA INFERÊNCIA DE GÊNERO (NÍVEL {level}) ---")
+        for community_id, row in profiles[level].iterrows():
+            within = f", dentro da {parents[community_id]}" if parents is not None else ""
+            self.stdout.write(f"Comunidade {community_id} ({row['size']} Artistas{within}):")
+            self.stdout.write(f"  Gênero Dominante: {row['dominant_genre'].upper()} ({row['dominant_share']:.0%} dos artistas)")
+            self.stdout.write(f"  Top {options['top_genres']} Gêneros: {', '.join(row['top_genres'])}")
+            self.stdout.write(f"  Peso Interno / Externo: {row['intra_weight']:.0f} / {row['inter_weight']:.0f}")
 
-            results[community_id] = {
-                'dominant_genre': dominant_genre,
-                'num_artists': num_artists_in_community,
-                'top_genres': [g[0] for g in sorted(genre_counts.items(), key=operator.itemgetter(1), reverse=True)[:3]]
-            }
-            
-            self.stdout.write(f"Comunidade {community_id} ({num_artists_in_community} Artistas):")
-            self.stdout.write(f"  Gênero Dominante: {dominant_genre.upper()}")
-            self.stdout.write(f"  Top 3 Gêneros: {', '.join(results[community_id]['top_genres'])}")
-        
-        self.stdout.write(self.style.SUCCESS("\nDIAGNÓSTICO CONCLUÍDO. Use os IDs das Comunidades para criar a legenda de cores."))
\ No newline at end of file
+        timer.write_report(self.stdout, "Relatório de Tempo (comunidades)")
+        self.stdout.write(self.style.SUCCESS("\nDIAGNÓSTICO CONCLUÍDO. Use os IDs das Comunidades para criar a legenda de cores."))
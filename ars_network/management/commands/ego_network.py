@@ -0,0 +1,73 @@
+# ars_network/management/commands/ego_network.py
+
+from django.core.management.base import BaseCommand
+from ars_network.models import Artist
+from ars_network.graph import get_collaboration_graph
+from ars_network.ego import ego_network
+from ars_network.timing import PhaseTimer
+from pathlib import Path
+import json
+
+class Command(BaseCommand):
+    help = 'Consulta a ego-rede de k saltos de um artista (colaboradores, pontes, pesos e músicas em comum).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('artist', help='spotify_id ou nome do artista (ex.: "Anitta").')
+        parser.add_argument(
+            '--k', type=int, default=2,
+            help='Número de saltos a partir do artista (padrão: 2).'
+        )
+        parser.add_argument(
+            '--bridges-only', action='store_true',
+            help='Lista apenas os artistas da ego-rede marcados como ponte.'
+        )
+        parser.add_argument(
+            '--json', type=Path, default=None,
+            help='Salva a ego-rede completa (nós, arestas e músicas em comum) neste arquivo JSON.'
+        )
+
+    def _resolve_artist(self, value):
+        if Artist.objects.filter(spotify_id=value).exists():
+            return value
+        matches = list(Artist.objects.filter(name__iexact=value).values_list('spotify_id', flat=True))
+        return matches[0] if matches else None
+
+    def handle(self, *args, **options):
+        timer = PhaseTimer()
+        spotify_id = self._resolve_artist(options['artist'])
+        if spotify_id is None:
+            self.stdout.write(self.style.ERROR(f"Artista '{options['artist']}' não encontrado."))
+            return
+
+        # Índice de adjacência em cache (data/cache), conferido pela impressão digital dos
+        # dados: após uma reimportação (novas PKs de HitSong) o snapshot é reconstruído
+        with timer.phase("Carregar índice do grafo"):
+            graph = get_collaboration_graph()
+        with timer.phase("Consulta da ego-rede"):
+            ego = ego_network(graph, spotify_id, k=options['k'])
+
+        if ego is None or len(ego['nodes']) == 1:
+            self.stdout.write(self.style.NOTICE(f"'{options['artist']}' não tem colaborações na rede."))
+            return
+
+        center = ego['nodes'][0]
+        self.stdout.write(self.style.SUCCESS(
+            f"--- EGO-REDE DE {center.get('name', spotify_id)} (k={options['k']}): "
+            f"{len(ego['nodes']) - 1} artistas, {len(ego['edges'])} arestas ---"
+        ))
+        self.stdout.write(f"Limite de ponte (percentil 90 da Intermediação): {ego['bridge_threshold']:.4f}")
+
+        for node in ego['nodes'][1:]:
+            if options['bridges_only'] and not node['is_bridge']:
+                continue
+            marker = " [PONTE]" if node['is_bridge'] else ""
+            self.stdout.write(
+                f"  {node['hop']} salto(s) | {node.get('name', node['spotify_id'])}{marker} | "
+                f"Intermediação {node.get('betweenness_centrality') or 0.0:.4f} | Hits {node.get('num_hits') or 0}"
+            )
+
+        if options['json']:
+            options['json'].write_text(json.dumps(ego, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(f"Ego-rede salva em: {options['json']}")
+
+        timer.write_report(self.stdout, "Relatório de Tempo (ego-rede)")
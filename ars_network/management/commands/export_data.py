@@ -2,62 +2,155 @@
 
 from django.core.management.base import BaseCommand
 from ars_network.models import HitSong
+from ars_network.genres import parse_genres
+import gzip
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 from django.conf import settings
 
+# Campos da HitSong exportados (na ordem das colunas de saída)
+SONG_FIELDS = [
+    ('spotify_id', 'song_id'),
+    ('name', 'song_name'),
+    ('popularity', 'popularity'),
+    # O CAMPO CRUCIAL DE INSPEÇÃO:
+    ('is_collaboration', 'is_collaboration'),
+]
+METRIC_FIELDS = [
+    # As variáveis preditivas e de controle calculadas
+    'avg_artist_betweenness', 'genre_heterogeneity_index', 'danceability', 'energy', 'valence',
+]
+
+# Esquema fixo do Parquet: colunas de lista tipadas (não strings de listas Python)
+PARQUET_SCHEMA = pa.schema(
+    [
+        ('song_id', pa.string()),
+        ('song_name', pa.string()),
+        ('popularity', pa.int32()),
+        ('is_collaboration', pa.bool_()),
+        ('artist_ids', pa.list_(pa.string())),
+        ('artist_names', pa.list_(pa.string())),
+        ('artist_count', pa.int32()),
+        ('all_genres_list', pa.list_(pa.string())),
+    ]
+    + [(field, pa.float64()) for field in METRIC_FIELDS]
+)
+
 class Command(BaseCommand):
-    help = 'Exporta os dados de HitSongs, incluindo métricas ARS e colaboração, para um arquivo CSV/Excel.'
+    help = 'Exporta os dados de HitSongs, incluindo métricas ARS e colaboração, para CSV (Excel) ou Parquet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=['csv', 'parquet'], default='csv',
+            help="'csv': separado por ; para o Excel (padrão). 'parquet': colunar, com listas tipadas."
+        )
+        parser.add_argument(
+            '--compression', choices=['none', 'snappy', 'gzip', 'zstd'], default=None,
+            help="Compressão do arquivo (padrão: 'snappy' no Parquet, 'none' no CSV; CSV aceita só 'gzip')."
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Músicas lidas do banco (e gravadas) por lote; a memória não cresce com o total (padrão: 2000).'
+        )
+        parser.add_argument(
+            '--output', type=Path, default=None,
+            help='Arquivo de saída (padrão: data/analysis_output/ars_spotify_data_completa.<csv|parquet>).'
+        )
+
+    def _iter_chunks(self, chunk_size):
+        """Lotes de músicas por paginação por chave (pk > último pk), com os artistas de cada lote."""
+        through = HitSong.artists.through
+        song_columns = [field for field, _ in SONG_FIELDS] + METRIC_FIELDS
+        last_pk = 0
+        while True:
+            rows = list(
+                HitSong.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', *song_columns)[:chunk_size]
+            )
+            if not rows:
+                return
+            songs = pd.DataFrame(rows, columns=['pk', *song_columns]).set_index('pk')
+            first_pk, last_pk = songs.index[0], songs.index[-1]
+
+            # Artistas do lote inteiro em uma única consulta (intervalo de PKs, sem limite de variáveis)
+            links = pd.DataFrame(
+                list(
+                    through.objects.filter(hitsong_id__gte=first_pk, hitsong_id__lte=last_pk)
+                    .order_by('hitsong_id', 'artist_id')
+                    .values_list('hitsong_id', 'artist_id', 'artist__name', 'artist__genres')
+                ),
+                columns=['pk', 'artist_id', 'artist_name', 'artist_genres'],
+            )
+            artists = links.groupby('pk', sort=False).agg(list).reindex(songs.index)
+            for column in ('artist_id', 'artist_name', 'artist_genres'):
+                songs[column] = [value if isinstance(value, list) else [] for value in artists[column]]
+            yield songs.rename(columns=dict(SONG_FIELDS))
+
+    def _csv_frame(self, songs):
+        return pd.DataFrame({
+            'song_id': songs['song_id'],
+            'song_name': songs['song_name'],
+            'popularity': songs['popularity'],
+            'is_collaboration': songs['is_collaboration'],
+            # Informações dos artistas
+            'artist_names': songs['artist_name'].map("; ".join),  # Usa ponto e vírgula para separar artistas
+            'artist_count': songs['artist_name'].map(len),
+            'all_genres_list': songs['artist_genres'].map(str),
+            **{field: songs[field] for field in METRIC_FIELDS},
+        })
+
+    def _parquet_table(self, songs):
+        # Gêneros únicos da música (união dos gêneros dos artistas, na ordem do Spotify)
+        genres = [
+            list(dict.fromkeys(genre for raw in artist_genres for genre in parse_genres(raw)))
+            for artist_genres in songs['artist_genres']
+        ]
+        frame = pd.DataFrame({
+            'song_id': songs['song_id'],
+            'song_name': songs['song_name'],
+            'popularity': songs['popularity'],
+            'is_collaboration': songs['is_collaboration'],
+            'artist_ids': songs['artist_id'],
+            'artist_names': songs['artist_name'],
+            'artist_count': songs['artist_name'].map(len),
+            'all_genres_list': genres,
+            **{field: songs[field].astype(float) for field in METRIC_FIELDS},
+        })
+        return pa.Table.from_pandas(frame, schema=PARQUET_SCHEMA, preserve_index=False)
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("--- INICIANDO EXPORTAÇÃO DE DADOS PARA INSPEÇÃO ---"))
-        
-        # 1. Obter todos os dados do modelo HitSong com os artistas relacionados
-        hit_songs = HitSong.objects.prefetch_related('artists').all()
-        
-        # 2. Criar uma lista para armazenar os dados tabulares
-        data_list = []
-        
-        for song in hit_songs:
-            # 2a. Extrair dados dos artistas
-            artist_names = [a.name for a in song.artists.all()]
-            artist_genres = [a.genres for a in song.artists.all()]
-
-            # 2b. Formatar o resultado
-            data_list.append({
-                'song_id': song.spotify_id,
-                'song_name': song.name,
-                'popularity': song.popularity,
-                
-                # O CAMPO CRUCIAL DE INSPEÇÃO:
-                'is_collaboration': song.is_collaboration,
-                
-                # Informações dos artistas
-                'artist_names': "; ".join(artist_names), # Usa ponto e vírgula para separar artistas
-                'artist_count': len(artist_names),
-                'all_genres_list': artist_genres,
-                
-                # As variáveis preditivas e de controle calculadas
-                'avg_artist_betweenness': song.avg_artist_betweenness,
-                'genre_heterogeneity_index': song.genre_heterogeneity_index,
-                'danceability': song.danceability,
-                'energy': song.energy,
-                'valence': song.valence,
-            })
-
-        # 3. Converter para DataFrame
-        df = pd.DataFrame(data_list)
-        
-        # 4. Definir o caminho de saída
-        BASE_DIR = settings.BASE_DIR
-        output_dir = BASE_DIR / "data" / "analysis_output"
-        output_dir.mkdir(exist_ok=True)
-        
-        output_path = output_dir / "ars_spotify_data_completa.csv"
-        
-        # 5. Salvar o arquivo (usando ; como delimitador para evitar conflito com nomes)
-        df.to_csv(output_path, sep=';', index=False, encoding='utf-8-sig')
+        export_format = options['format']
+        compression = options['compression'] or ('snappy' if export_format == 'parquet' else 'none')
+        if export_format == 'csv' and compression not in ('none', 'gzip'):
+            self.stdout.write(self.style.ERROR("O CSV aceita apenas --compression none ou gzip."))
+            return
+
+        # 1. Definir o caminho de saída
+        output_path = options['output']
+        if output_path is None:
+            output_dir = settings.BASE_DIR / "data" / "analysis_output"
+            output_dir.mkdir(exist_ok=True)
+            suffix = ".csv.gz" if compression == 'gzip' and export_format == 'csv' else f".{export_format}"
+            output_path = output_dir / f"ars_spotify_data_completa{suffix}"
+
+        # 2. Exportar lote a lote (paginação por chave no banco, um grupo de linhas por lote no arquivo)
+        num_songs = 0
+        if export_format == 'parquet':
+            with pq.ParquetWriter(output_path, PARQUET_SCHEMA, compression=compression) as writer:
+                for songs in self._iter_chunks(options['chunk_size']):
+                    writer.write_table(self._parquet_table(songs))
+                    num_songs += len(songs)
+        else:
+            # 3. Salvar o arquivo (usando ; como delimitador para evitar conflito com nomes)
+            opener = gzip.open if compression == 'gzip' else open
+            with opener(output_path, 'wt', encoding='utf-8-sig', newline='') as fh:
+                for songs in self._iter_chunks(options['chunk_size']):
+                    self._csv_frame(songs).to_csv(fh, sep=';', index=False, header=num_songs == 0)
+                    num_songs += len(songs)
 
         self.stdout.write(self.style.SUCCESS(f"\n--- EXPORTAÇÃO CONCLUÍDA ---"))
-        self.stdout.write(f"Arquivo salvo em: {output_path}")
-        self.stdout.write(self.style.NOTICE("Aberto no Excel, use 'Dados -> De Texto/CSV' e use ; como delimitador."))
\ No newline at end of file
+        self.stdout.write(f"{num_songs} músicas exportadas. Arquivo salvo em: {output_path}")
+        if export_format == 'csv':
+            self.stdout.write(self.style.NOTICE("Aberto no Excel, use 'Dados -> De Texto/CSV' e use ; como delimitador."))
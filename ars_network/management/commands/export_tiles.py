@@ -0,0 +1,64 @@
+# ars_network/management/commands/export_tiles.py
+
+from django.core.management.base import BaseCommand
+from ars_network.graph import get_collaboration_graph
+from ars_network.layout import add_layout_arguments, get_layout, layout_key, layout_options
+from ars_network.models import AnalysisRun
+from ars_network.viewport import LayoutIndex
+from ars_network.tiles import DEFAULT_MAX_ZOOM, TILES_DIR, export_tiles, tile_primitives
+from ars_network.timing import PhaseTimer
+import shutil
+
+class Command(BaseCommand):
+    help = 'Gera a pirâmide de tiles (z/x/y) da rede a partir do layout em cache, para o visualizador web (/network/map/).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-zoom', type=int, default=DEFAULT_MAX_ZOOM,
+            help=f'Último nível de zoom gerado (padrão: {DEFAULT_MAX_ZOOM}; o nível z tem 4^z tiles no máximo).'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regera os tiles mesmo que a camada desta versão (grafo, layout e métricas) já exista.'
+        )
+        add_layout_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("--- INICIANDO EXPORTAÇÃO DOS TILES DA REDE ---"))
+        timer = PhaseTimer()
+
+        # 1. Grafo e layout em cache
+        with timer.phase("Grafo e layout"):
+            collab_graph = get_collaboration_graph()
+            G = collab_graph.to_networkx()
+            pos = get_layout(G, collab_graph.fingerprint, **layout_options(options))
+            layout_index = LayoutIndex(G, pos)
+
+        # A camada é identificada pela versão do grafo, pelos parâmetros do layout e pela versão
+        # das métricas (última AnalysisRun): os tiles são servidos como imutáveis, então qualquer
+        # mudança de conteúdo precisa gerar uma URL nova
+        latest_run = AnalysisRun.objects.order_by('-pk').values_list('pk', flat=True).first()
+        params_key = layout_key(options['layout'], options['layout_iterations'])
+        layer = f"{collab_graph.fingerprint[:16]}-{options['layout']}-{params_key[:8]}-r{latest_run or 0}"
+        output_dir = TILES_DIR / layer
+        if (output_dir / "metadata.json").exists() and not options['force']:
+            self.stdout.write(self.style.NOTICE(f"Camada '{layer}' já existe em {output_dir}. Use --force para regerar."))
+            return
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+
+        # 2. Estilos dos nós (métricas da última análise) e níveis de rótulo
+        with timer.phase("Estilos e rótulos"):
+            primitives = tile_primitives(layout_index)
+
+        # 3. Renderização nível a nível (só os tiles com conteúdo)
+        with timer.phase("Renderização dos tiles"):
+            tiles_per_level = export_tiles(
+                primitives, output_dir, max_zoom=options['max_zoom'], fingerprint=collab_graph.fingerprint,
+                layout=params_key, analysis_run=latest_run,
+            )
+
+        for z, count in tiles_per_level.items():
+            self.stdout.write(f"  z={z}: {count} tiles de {4 ** z} possíveis")
+        self.stdout.write(self.style.SUCCESS(f"Camada '{layer}' salva em: {output_dir}"))
+        timer.write_report(self.stdout, "Relatório de Tempo (tiles)")
@@ -1,54 +1,207 @@
 # ars_network/management/commands/import_mgd_data.py
 
+import json
 import pandas as pd
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from pathlib import Path
 from ars_network.models import Artist, HitSong
+from ars_network import importers
+from ars_network.genres import sync_artist_genres
+from ars_network.persistence import record_analysis_run
+from ars_network.timing import PhaseTimer
 from django.conf import settings # <--- ESSENCIAL
 from datetime import datetime
 
 # 1. Obter o BASE_DIR a partir das configurações do Django (seguro)
 BASE_DIR = settings.BASE_DIR 
 PROCESSED_DIR = BASE_DIR / "data" / "processed" 
+# Dataset particionado market=<m>/year=<a> escrito por scripts/load_data.py
+CHARTS_DATASET_DIR = PROCESSED_DIR / "charts"
+MARKET = "br"
 
 class Command(BaseCommand):
     help = 'Importa dados de Artistas e Hit Songs (filtrados para BR) do MGD+ para o banco de dados.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=['bulk', 'incremental', 'legacy'], default='bulk',
+            help="'bulk': apaga e recarrega tudo com inserção em massa (padrão). "
+                 "'incremental': upsert por spotify_id, preservando as métricas já calculadas. "
+                 "'legacy': caminho antigo, linha a linha (útil para comparar tempos)."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Tamanho dos lotes usados no bulk_create/bulk_update (padrão: 1000).'
+        )
+        parser.add_argument(
+            '--changes-file', type=Path, default=PROCESSED_DIR / "import_changes.json",
+            help='(Modo incremental) Arquivo JSON com os artistas e músicas alterados na importação.'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("--- INICIANDO IMPORTAÇÃO DO MGD+ (MERCADO BR) ---"))
+        timer = PhaseTimer()
         
         # 1. Carregar dados Parquet
         try:
-            df_artists = pd.read_parquet(PROCESSED_DIR / "artists_br.parquet")
-            df_hits = pd.read_parquet(PROCESSED_DIR / "hitsongs_br.parquet")
+            with timer.phase("Leitura dos Parquet"):
+                df_artists = pd.read_parquet(PROCESSED_DIR / f"artists_{MARKET}.parquet")
+                df_hits = pd.read_parquet(PROCESSED_DIR / f"hitsongs_{MARKET}.parquet")
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f"Arquivos Parquet não encontrados na pasta: {PROCESSED_DIR}"))
             self.stdout.write(self.style.NOTICE("Rode o script de pré-processamento novamente."))
             return
         
+        if options['mode'] == 'incremental':
+            # Não apaga nada: o diff contra o banco decide o que inserir e o que atualizar
+            artists_changed, songs_changed = self._import_incremental(
+                df_artists, df_hits, timer, options['batch_size'], options['changes_file']
+            )
+            self._import_charts(timer, options['batch_size'], incremental=True)
+            # Nova versão dos dados: invalida o cache e os ETags da API JSON
+            if artists_changed or songs_changed:
+                record_analysis_run('import_mgd_data', artists_changed, songs_changed, mode='incremental')
+            timer.write_report(self.stdout, "Relatório de Tempo (modo incremental)")
+            self.stdout.write(self.style.SUCCESS("--- IMPORTAÇÃO INCREMENTAL CONCLUÍDA ---"))
+            return
+
         # Limpa dados existentes para evitar duplicatas e conflitos na chave primária
-        Artist.objects.all().delete()
-        HitSong.objects.all().delete()
+        with timer.phase("Limpeza das tabelas"):
+            Artist.objects.all().delete()
+            HitSong.objects.all().delete()
 
+        if options['mode'] == 'legacy':
+            self._import_legacy(df_artists, df_hits, timer)
+        else:
+            self._import_bulk(df_artists, df_hits, timer, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS("Hit Songs importadas e ligadas aos artistas com sucesso."))
+        self._import_charts(timer, options['batch_size'])
+        # Tudo foi recriado (inclusive as PKs das HitSongs): invalida o cache e os ETags da API JSON
+        record_analysis_run(
+            'import_mgd_data', Artist.objects.count(), HitSong.objects.count(), mode=options['mode'],
+        )
+        timer.write_report(self.stdout, f"Relatório de Tempo (modo {options['mode']})")
+        self.stdout.write(self.style.SUCCESS("--- IMPORTAÇÃO DE DADOS CONCLUÍDA. PRÓXIMO: ANÁLISE ARS ---"))
+
+    def _import_bulk(self, df_artists, df_hits, timer, batch_size):
+        # ----------------------------------------------------
+        # 2. Preparação Vetorizada (NaN, datas, listas de IDs)
+        # ----------------------------------------------------
+        with timer.phase("Preparação vetorizada"):
+            artists = importers.prepare_artists(df_artists)
+            hits = importers.prepare_hitsongs(df_hits)
+            links = importers.prepare_song_artist_links(df_hits)
+
+        with transaction.atomic():
+            # 3. Artistas (Nós da Rede)
+            self.stdout.write(self.style.SUCCESS(f"Importando {len(artists)} Artistas..."))
+            with timer.phase("bulk_create Artist"):
+                importers.bulk_create_artists(artists, batch_size)
+            with timer.phase("Gêneros normalizados"):
+                num_genre_links = sync_artist_genres(dict(zip(artists['spotify_id'], artists['genres'])), batch_size)
+            self.stdout.write(f"{num_genre_links} ligações artista-gênero criadas.")
+
+            # 4. Hit Songs (Fatos e Atributos)
+            self.stdout.write(self.style.SUCCESS(f"Importando {len(hits)} Hit Songs..."))
+            with timer.phase("bulk_create HitSong"):
+                importers.bulk_create_hitsongs(hits, batch_size)
+
+            # 5. Relação M:M em um único bulk insert de pares (música, artista)
+            with timer.phase("bulk insert HitSong.artists"):
+                num_links = importers.bulk_link_artists(links, batch_size)
+            self.stdout.write(f"{num_links} ligações música-artista inseridas.")
+
+    def _import_charts(self, timer, batch_size, incremental=False):
+        """Carrega as posições semanais do mercado no modelo ChartEntry (série temporal dos hits)."""
+        if not (CHARTS_DATASET_DIR / f"market={MARKET}").exists():
+            self.stdout.write(self.style.NOTICE(
+                f"Dataset de Charts não encontrado em {CHARTS_DATASET_DIR}: rode scripts/load_data.py para carregar ChartEntry."
+            ))
+            return
+
+        with timer.phase("Leitura dos Charts"):
+            df_charts = pd.read_parquet(CHARTS_DATASET_DIR, filters=[('market', '=', MARKET)])
+            entries = importers.prepare_chart_entries(df_charts, MARKET)
+
+        with timer.phase("bulk_create ChartEntry"), transaction.atomic():
+            if incremental:
+                num_entries = importers.sync_chart_entries(entries, batch_size)
+            else:
+                num_entries = importers.bulk_create_chart_entries(entries, batch_size)
+        self.stdout.write(f"{num_entries} posições semanais de Charts ({MARKET.upper()}) importadas.")
+
+    def _import_incremental(self, df_artists, df_hits, timer, batch_size, changes_file):
+        with timer.phase("Preparação vetorizada"):
+            artists = importers.prepare_artists(df_artists)
+            hits = importers.prepare_hitsongs(df_hits)
+            links = importers.prepare_song_artist_links(df_hits)
+
+        with transaction.atomic():
+            with timer.phase("Upsert Artist"):
+                artist_result = importers.upsert_rows(Artist, artists, batch_size)
+            with timer.phase("Gêneros normalizados"):
+                # Só os artistas novos/alterados têm as ligações de gênero recriadas
+                touched = artists[artists['spotify_id'].isin(artist_result.created + artist_result.updated)]
+                sync_artist_genres(dict(zip(touched['spotify_id'], touched['genres'])), batch_size)
+            with timer.phase("Upsert HitSong"):
+                song_result = importers.upsert_rows(HitSong, hits, batch_size)
+            with timer.phase("Sincronização HitSong.artists"):
+                link_result = importers.sync_song_artist_links(links, batch_size)
+
+        # Relatório de alterações
+        self.stdout.write(self.style.SUCCESS("\n--- ALTERAÇÕES DETECTADAS ---"))
+        for label, result in (("Artistas", artist_result), ("Hit Songs", song_result)):
+            self.stdout.write(f"{label}: {len(result.created)} novos, {len(result.updated)} atualizados "
+                              f"(campos: {', '.join(result.fields) or '-'})")
+        self.stdout.write(f"Ligações música-artista: {link_result.added} adicionadas, {link_result.removed} removidas "
+                          f"({len(link_result.songs)} músicas afetadas).")
+
+        # Parte do grafo afetada: artistas novos/alterados + artistas de ligações alteradas
+        affected_artists = sorted(set(artist_result.created) | set(artist_result.updated) | set(link_result.artists))
+        changes = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'artists': {'created': artist_result.created, 'updated': artist_result.updated},
+            'hitsongs': {'created': song_result.created, 'updated': song_result.updated},
+            'links': {'added': link_result.added, 'removed': link_result.removed, 'songs': link_result.songs},
+            'affected_artists': affected_artists,
+        }
+        changes_file.parent.mkdir(parents=True, exist_ok=True)
+        changes_file.write_text(json.dumps(changes, indent=2, ensure_ascii=False), encoding='utf-8')
+
+        if affected_artists or song_result.created or song_result.updated:
+            self.stdout.write(self.style.NOTICE(
+                f"{len(affected_artists)} artistas afetados na rede. Detalhes salvos em: {changes_file}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Nenhuma alteração: o banco já está sincronizado com os Parquet."))
+
+        artists_changed = len(set(artist_result.created) | set(artist_result.updated) | set(link_result.artists))
+        songs_changed = len(set(song_result.created) | set(song_result.updated) | set(link_result.songs))
+        return artists_changed, songs_changed
+
+    def _import_legacy(self, df_artists, df_hits, timer):
         # ----------------------------------------------------
         # 2. Importar Artistas (Nós da Rede)
         # ----------------------------------------------------
         self.stdout.write(self.style.SUCCESS(f"Importando {len(df_artists)} Artistas..."))
-        artists_to_create = []
-        for index, row in df_artists.iterrows():
-            # Mapeamento do DataFrame para o Modelo Artist
-            artists_to_create.append(
-                Artist(
-                    spotify_id=row['artist_id'],
-                    name=row['name'],
-                    # Salva a lista de gêneros como string (MGD+ original)
-                    genres=row['genres'].strip('[]').replace("'", "").replace('"', ""),
-                    artist_popularity=row['popularity'] if pd.notna(row['popularity']) else None,
+        with timer.phase("Artistas (iterrows + bulk_create)"):
+            artists_to_create = []
+            for index, row in df_artists.iterrows():
+                # Mapeamento do DataFrame para o Modelo Artist
+                artists_to_create.append(
+                    Artist(
+                        spotify_id=row['artist_id'],
+                        name=row['name'],
+                        # Salva a lista de gêneros como string (MGD+ original)
+                        genres=row['genres'].strip('[]').replace("'", "").replace('"', ""),
+                        artist_popularity=row['popularity'] if pd.notna(row['popularity']) else None,
+                    )
                 )
-            )
-        # Inserção em massa (Mais rápido)
-        Artist.objects.bulk_create(artists_to_create, ignore_conflicts=True)
+            # Inserção em massa (Mais rápido)
+            Artist.objects.bulk_create(artists_to_create, ignore_conflicts=True)
+            sync_artist_genres({a.spotify_id: a.genres for a in artists_to_create})
         self.stdout.write(self.style.SUCCESS("Artistas importados com sucesso."))
 
         # ----------------------------------------------------
@@ -59,7 +212,7 @@ class Command(BaseCommand):
         # Mapeia IDs para objetos Artist para a ligação M:M posterior
         artist_obj_map = {a.spotify_id: a for a in Artist.objects.all()}
 
-        with transaction.atomic():
+        with timer.phase("Hit Songs (create + artists.set por linha)"), transaction.atomic():
             for index, row in df_hits.iterrows():
                 
                 # PREPARAÇÃO DE DADOS ANTES DA CRIAÇÃO
@@ -109,6 +262,3 @@ class Command(BaseCommand):
                 linked_artists = [artist_obj_map[id] for id in artist_ids if id in artist_obj_map]
                 
                 hit_song.artists.set(linked_artists)
-
-        self.stdout.write(self.style.SUCCESS("Hit Songs importadas e ligadas aos artistas com sucesso."))
-        self.stdout.write(self.style.SUCCESS("--- IMPORTAÇÃO DE DADOS CONCLUÍDA. PRÓXIMO: ANÁLISE ARS ---"))
\ No newline at end of file
@@ -1,136 +1,69 @@
 # ars_network/management/commands/visualize_network.py (VERSÃO APRIMORADA)
 
 from django.core.management.base import BaseCommand
-from ars_network.models import Artist, HitSong
-import networkx as nx
-import community.community_louvain as community
-import matplotlib.pyplot as plt
-from collections import defaultdict
-import matplotlib.colors as mcolors
-from pathlib import Path
+from ars_network.models import Artist
+from ars_network.graph import get_collaboration_graph
+from ars_network.communities import add_community_arguments, community_options, get_partition, write_partition_summary
+from ars_network.layout import add_layout_arguments, get_layout, layout_options
+from ars_network.rendering import (
+    LEGEND_BRIDGE, RenderPrimitives, View, add_output_arguments, artist_metrics, output_options, render_views,
+    write_extra_outputs,
+)
+from ars_network.viewport import LayoutIndex
 from django.conf import settings
-import numpy as np
 
 class Command(BaseCommand):
     help = 'Constrói e visualiza o grafo de colaboração com detecção de comunidades e rótulos aprimorados.'
 
+    def add_arguments(self, parser):
+        add_layout_arguments(parser)
+        add_community_arguments(parser)
+        add_output_arguments(parser)
+
     # Usamos o mesmo método de construção de rede (omiti para concisão, assumindo que já está definido)
     def _rebuild_graph(self):
-        collaborations = defaultdict(lambda: defaultdict(int))
-        hit_songs = HitSong.objects.prefetch_related('artists').all()
-        
-        for song in hit_songs:
-            artist_ids = [artist.spotify_id for artist in song.artists.all()]
-            for i in range(len(artist_ids)):
-                for j in range(i + 1, len(artist_ids)):
-                    id1, id2 = sorted((artist_ids[i], artist_ids[j]))
-                    collaborations[id1][id2] += 1
-        
-        G = nx.Graph()
-        for id1, inner_dict in collaborations.items():
-            for id2, weight in inner_dict.items():
-                G.add_edge(id1, id2, weight=weight)
-        return G
+        # Grafo compartilhado (snapshot em cache, ver ars_network/graph.py)
+        self.collab_graph = get_collaboration_graph()
+        return self.collab_graph.to_networkx()
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("--- INICIANDO VISUALIZAÇÃO DA REDE DE COLABORAÇÃO APRIMORADA ---"))
         
         G = self._rebuild_graph()
-        
-        artists = Artist.objects.all()
-        artist_metrics = {a.spotify_id: a for a in artists}
-
-        # 1. Detecção de Comunidades (Louvain)
-        partition = community.best_partition(G, weight='weight')
-        num_communities = max(partition.values()) + 1
-        
-        # 2. Preparação das Métricas de Visualização
-        
-        # Mapa de cores e tamanhos
-        cmap = plt.cm.get_cmap('tab20', num_communities)
-        
-        # Define o limite mínimo para ser considerado um "hub" ou "ponte" relevante
-        # Usaremos o percentil 90 (os 10% mais altos) para Intermediação
-        betweenness_values = [artist_metrics[n].betweenness_centrality for n in G.nodes()]
-        if betweenness_values:
-            betweenness_threshold = max(0.001, np.percentile(betweenness_values, 90))
-        else:
-            betweenness_threshold = 0.001
-        
-        # Listas de nós, rótulos e cores
-        node_colors = []
-        node_sizes = []
-        node_border_colors = []
-        labels = {}
-        
-        for node in G.nodes():
-            metrics = artist_metrics.get(node)
-            if not metrics: continue
 
-            # a. Tamanho do Nó (Baseado no Grau de Centralidade - Hubs)
-            size = metrics.degree_centrality * 8000
-            node_sizes.append(size)
-            
-            # b. Cor do Nó (Baseado na Comunidade)
-            node_colors.append(cmap(partition.get(node, 0)))
+        # 1. Detecção de Comunidades (partição de consenso em cache, ver ars_network/communities.py)
+        try:
+            communities = get_partition(G, self.collab_graph.fingerprint, **community_options(options))
+        except ValueError as exc:
+            self.stdout.write(self.style.ERROR(str(exc)))
+            return
+        partition = communities.partition
+        write_partition_summary(self.stdout, communities)
 
-            # c. Highlight (Cor de Borda) para as Pontes (Intermediação)
-            # Se a Centralidade de Intermediação for alta (top 10%), pinta a borda de vermelho
-            if metrics.betweenness_centrality >= betweenness_threshold:
-                node_border_colors.append('red')
-                # Rotula todas as pontes e os hubs importantes
-                labels[node] = metrics.name
-            else:
-                node_border_colors.append(cmap(partition.get(node, 0))) # Usa a cor da comunidade
-            
-            # d. Rótulos Adicionais: Adiciona rótulo para hubs muito grandes (top 5% do Grau)
-            if size > np.percentile(node_sizes, 95):
-                labels[node] = metrics.name
+        # 2. Primitivas de desenho (cor pela comunidade, tamanho pelo Grau, borda vermelha nas pontes);
+        #    limiar das pontes sobre os nós do grafo
+        # Layout calculado uma vez por versão do grafo (ver ars_network/layout.py)
+        pos = get_layout(G, self.collab_graph.fingerprint, **layout_options(options))
+        layout_index = LayoutIndex(G, pos)
+        primitives = RenderPrimitives(
+            layout_index, artist_metrics(Artist.objects.filter(spotify_id__in=list(layout_index.nodes))),
+            [partition.get(node, 0) for node in layout_index.nodes], cmap_name='tab20',
+        )
+        num_labels = int((primitives.is_bridge | primitives.is_hub).sum())
+        self.stdout.write(f"Rotulando {num_labels} nós (Pontes e Hubs Top)...")
 
-        # 3. Desenho do Grafo
-        self.stdout.write(f"Rotulando {len(labels)} nós (Pontes e Hubs Top)...")
-        
-        plt.figure(figsize=(20, 16))
-        
-        # Layout (ajuste leve no k para separar um pouco mais)
-        pos = nx.spring_layout(G, k=0.18, iterations=50, seed=42) 
-
-        # Desenha as Arestas
-        edge_widths = [G[u][v]['weight'] * 0.5 for u, v in G.edges()]
-        nx.draw_networkx_edges(G, pos, 
-                               width=edge_widths, 
-                               alpha=0.3, 
-                               edge_color='gray')
-        
-        # Desenha os Nós (com o Highlight de Borda)
-        # O contorno (linewidth) e a cor de borda (edgecolor) destacam as pontes
-        nx.draw_networkx_nodes(G, pos, 
-                               node_size=node_sizes, 
-                               node_color=node_colors, 
-                               edgecolors=node_border_colors,
-                               linewidths=2, # Borda mais grossa para destacar
-                               alpha=0.8)
-
-        # Desenha os Rótulos
-        nx.draw_networkx_labels(G, pos, labels=labels, font_size=9, font_weight='bold')
-
-        # Cria a legenda manual para o highlight
-        self.stdout.write("Criando legenda para o destaque das 'Pontes' (Intermediação)...")
-        plt.plot([], [], 'o', color='gray', alpha=0.7, markeredgecolor='red', markersize=10, linewidth=0, label='Ponte Crítica (Alta Intermediação)')
-        plt.legend(scatterpoints=1, frameon=False, labelspacing=1, title="Destaque ARS", fontsize=12)
-
-
-        plt.title(f"Rede de Colaboração de Artistas BR (2017-2019) | Nós: {G.number_of_nodes()} | Arestas: {G.number_of_edges()}", fontsize=16)
-        plt.axis('off')
-        
-        # 4. Salvamento
+        # 3. Desenho e Salvamento
         BASE_DIR = settings.BASE_DIR
-        output_dir = BASE_DIR / "data" / "analysis_output"
-        output_dir.mkdir(exist_ok=True)
-        
-        output_path = output_dir / "artist_collaboration_network_br_aprimorado.png"
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=300)
+        output_path = BASE_DIR / "data" / "analysis_output" / "artist_collaboration_network_br_aprimorado.png"
+        view = View(
+            'aprimorado',
+            f"Rede de Colaboração de Artistas BR (2017-2019) | Nós: {G.number_of_nodes()} | Arestas: {G.number_of_edges()}",
+            output_path, figsize=(20, 16), edge_alpha=0.3, title_size=16, legend=LEGEND_BRIDGE,
+            **output_options(options),
+        )
+        results = render_views(primitives, [view])
         
-        self.stdout.write(self.style.SUCCESS(f"\nGrafo aprimorado salvo com sucesso em: {output_path}"))
-        self.stdout.write(self.style.NOTICE("Nós com borda VERMELHA são as 'Pontes' (Alta Centralidade de Intermediação)."))
\ No newline at end of file
+        for result in results:
+            self.stdout.write(self.style.SUCCESS(f"\nGrafo aprimorado salvo com sucesso em: {result.path}"))
+        write_extra_outputs(self.stdout, primitives, results, output_path, options)
+        self.stdout.write(self.style.NOTICE("Nós com borda VERMELHA são as 'Pontes' (Alta Centralidade de Intermediação)."))
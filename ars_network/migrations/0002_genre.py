@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:34
+
+import re
+
+import django.db.models.deletion
+import pandas as pd
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_genres(apps, schema_editor):
+    # Preenche Genre/ArtistGenre a partir do campo texto Artist.genres já importado
+    Artist = apps.get_model('ars_network', 'Artist')
+    Genre = apps.get_model('ars_network', 'Genre')
+    ArtistGenre = apps.get_model('ars_network', 'ArtistGenre')
+
+    mapping = {}
+    mapping_file = settings.BASE_DIR / "data" / "raw" / "Genre Mapping" / "spotify_genre_mapping.csv"
+    if mapping_file.exists():
+        df = pd.read_csv(mapping_file, sep='\t', encoding='utf-8', dtype=str).dropna()
+        mapping = dict(zip(df['original_genre'].str.strip().str.lower(), df['mapped_genre'].str.strip()))
+
+    parsed = {}
+    for artist_id, raw in Artist.objects.values_list('spotify_id', 'genres'):
+        genres = []
+        for genre in re.sub(r"[\[\]'\"]", "", raw or "").split(','):
+            genre = genre.strip().lower()
+            if genre and genre not in genres:
+                genres.append(genre)
+        parsed[artist_id] = genres
+
+    names = sorted({g for genres in parsed.values() for g in genres})
+    Genre.objects.bulk_create([Genre(name=n, super_genre=mapping.get(n, "")) for n in names])
+    genre_ids = dict(Genre.objects.values_list('name', 'id'))
+    ArtistGenre.objects.bulk_create([
+        ArtistGenre(artist_id=artist_id, genre_id=genre_ids[genre], position=position)
+        for artist_id, genres in parsed.items()
+        for position, genre in enumerate(genres)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('super_genre', models.CharField(blank=True, db_index=True, default='', max_length=100, verbose_name='Super-gênero')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArtistGenre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_links', to='ars_network.artist')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artist_links', to='ars_network.genre')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='genre_tags',
+            field=models.ManyToManyField(blank=True, related_name='artists', through='ars_network.ArtistGenre', to='ars_network.genre'),
+        ),
+        migrations.AddIndex(
+            model_name='artistgenre',
+            index=models.Index(fields=['genre', 'artist'], name='ars_network_genre_i_6c5526_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artistgenre',
+            index=models.Index(fields=['artist', 'position'], name='ars_network_artist__340c42_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='artistgenre',
+            constraint=models.UniqueConstraint(fields=('artist', 'genre'), name='unique_artist_genre'),
+        ),
+        migrations.RunPython(populate_genres, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0002_genre'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hitsong',
+            name='genre_entropy',
+            field=models.FloatField(null=True, verbose_name='Entropia de Shannon dos Super-gêneros'),
+        ),
+        migrations.AddField(
+            model_name='hitsong',
+            name='genre_gini_simpson',
+            field=models.FloatField(null=True, verbose_name='Índice de Gini-Simpson dos Super-gêneros'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0003_genre_diversity_measures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('market', models.CharField(max_length=10, verbose_name='Mercado')),
+                ('week_start', models.DateField(verbose_name='Início da Semana')),
+                ('week_end', models.DateField(verbose_name='Fim da Semana')),
+                ('position', models.PositiveSmallIntegerField(verbose_name='Posição')),
+                ('streams', models.BigIntegerField(null=True)),
+                ('peak_position', models.PositiveSmallIntegerField(null=True, verbose_name='Melhor Posição')),
+                ('weeks_on_chart', models.PositiveSmallIntegerField(null=True, verbose_name='Semanas no Chart')),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chart_entries', to='ars_network.hitsong')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['song', 'week_start'], name='ars_network_song_id_2693b6_idx'), models.Index(fields=['market', 'week_start'], name='ars_network_market_ae0d28_idx')],
+                'constraints': [models.UniqueConstraint(fields=('song', 'market', 'week_start'), name='unique_chart_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0004_chart_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtistCentralitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('market', models.CharField(max_length=10, verbose_name='Mercado')),
+                ('granularity', models.CharField(max_length=10, verbose_name='Granularidade')),
+                ('window_start', models.DateField(verbose_name='Início da Janela')),
+                ('window_end', models.DateField(verbose_name='Fim da Janela')),
+                ('num_hits', models.IntegerField(default=0, verbose_name='Hits na Janela')),
+                ('betweenness_centrality', models.FloatField(verbose_name='Centralidade de Intermediação')),
+                ('degree_centrality', models.FloatField(verbose_name='Centralidade de Grau')),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='centrality_snapshots', to='ars_network.artist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['market', 'granularity', 'window_start'], name='ars_network_market_719f81_idx')],
+                'constraints': [models.UniqueConstraint(fields=('artist', 'market', 'granularity', 'window_start'), name='unique_artist_window')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0005_artist_centrality_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('finished_at', models.DateTimeField(auto_now_add=True, verbose_name='Concluída em')),
+                ('artists_updated', models.IntegerField(default=0, verbose_name='Artistas Alterados')),
+                ('songs_updated', models.IntegerField(default=0, verbose_name='Músicas Alteradas')),
+                ('details', models.JSONField(blank=True, default=dict)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0006_analysis_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Community',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.PositiveIntegerField(verbose_name='Comunidade')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Artistas')),
+                ('dominant_genre', models.CharField(blank=True, default='', max_length=255, verbose_name='Gênero Dominante')),
+                ('dominant_share', models.FloatField(default=0.0, verbose_name='Participação do Gênero Dominante')),
+                ('top_genres', models.JSONField(blank=True, default=list)),
+                ('genre_counts', models.JSONField(blank=True, default=dict)),
+                ('intra_weight', models.FloatField(default=0.0, verbose_name='Peso Interno')),
+                ('inter_weight', models.FloatField(default=0.0, verbose_name='Peso Externo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('label',), name='unique_community_label')],
+            },
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='community',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='artists', to='ars_network.community', verbose_name='Comunidade'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ars_network', '0007_community'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='Nível')),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='community',
+            name='unique_community_label',
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='level',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Nível'),
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='ars_network.community', verbose_name='Comunidade-mãe'),
+        ),
+        migrations.AddConstraint(
+            model_name='community',
+            constraint=models.UniqueConstraint(fields=('level', 'label'), name='unique_community_level_label'),
+        ),
+        migrations.AddField(
+            model_name='communitymembership',
+            name='artist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='community_memberships', to='ars_network.artist'),
+        ),
+        migrations.AddField(
+            model_name='communitymembership',
+            name='community',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='ars_network.community'),
+        ),
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['community', 'artist'], name='ars_network_communi_ceab8a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='communitymembership',
+            constraint=models.UniqueConstraint(fields=('artist', 'level'), name='unique_artist_community_level'),
+        ),
+    ]
@@ -13,6 +13,8 @@ class Artist(models.Model):
     # Gêneros do artista (CRÍTICO para a hipótese de "pontes")
     # Gêneros são extraídos do artista, não da faixa [cite: 381]
     genres = models.CharField(max_length=1024, default="", blank=True) 
+    # Mesmos gêneros normalizados (tabela Genre), preenchidos na importação
+    genre_tags = models.ManyToManyField('Genre', through='ArtistGenre', related_name='artists', blank=True)
     
     # Métricas do artista:
     artist_popularity = models.IntegerField(null=True, verbose_name="Popularidade do Artista") 
@@ -22,10 +24,87 @@ class Artist(models.Model):
     # Métricas da ARS a ser calculada
     betweenness_centrality = models.FloatField(null=True, verbose_name="Centralidade de Intermediação")
     degree_centrality = models.FloatField(null=True, verbose_name="Centralidade de Grau")
+    # Comunidade do nível 0 (gravada pelo diagnose_communities); nula para artistas isolados.
+    # Os demais níveis da hierarquia ficam em CommunityMembership
+    community = models.ForeignKey(
+        'Community', on_delete=models.SET_NULL, null=True, blank=True, related_name='artists', verbose_name="Comunidade"
+    )
     
     def __str__(self):
         return self.name
 
+# COMUNIDADES DA REDE (perfil de gênero e pesos de aresta, calculados pelo diagnose_communities)
+class Community(models.Model):
+    # Nível da hierarquia: 0 = partição de consenso, 1+ = sub-comunidades do nível anterior
+    level = models.PositiveSmallIntegerField(default=0, verbose_name="Nível")
+    # ID canônico dentro do nível (0 = a maior comunidade)
+    label = models.PositiveIntegerField(verbose_name="Comunidade")
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='children', verbose_name="Comunidade-mãe"
+    )
+    size = models.PositiveIntegerField(default=0, verbose_name="Artistas")
+    dominant_genre = models.CharField(max_length=255, default="", blank=True, verbose_name="Gênero Dominante")
+    # Fração dos artistas da comunidade que têm o gênero dominante
+    dominant_share = models.FloatField(default=0.0, verbose_name="Participação do Gênero Dominante")
+    # Top-k gêneros (mais frequente primeiro) e tabela completa {gênero: nº de artistas}
+    top_genres = models.JSONField(default=list, blank=True)
+    genre_counts = models.JSONField(default=dict, blank=True)
+    # Soma dos pesos (músicas em comum) das arestas internas e das que saem da comunidade
+    intra_weight = models.FloatField(default=0.0, verbose_name="Peso Interno")
+    inter_weight = models.FloatField(default=0.0, verbose_name="Peso Externo")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['level', 'label'], name='unique_community_level_label'),
+        ]
+
+    def __str__(self):
+        return f'Comunidade {self.level}.{self.label} ({self.dominant_genre or "-"}, {self.size} artistas)'
+
+# PERTENCIMENTO DE CADA ARTISTA ÀS COMUNIDADES (uma linha por nível da hierarquia)
+class CommunityMembership(models.Model):
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='community_memberships')
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='memberships')
+    level = models.PositiveSmallIntegerField(verbose_name="Nível")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'level'], name='unique_artist_community_level'),
+        ]
+        indexes = [
+            models.Index(fields=['community', 'artist']),
+        ]
+
+    def __str__(self):
+        return f'{self.artist_id} -> {self.community_id} (nível {self.level})'
+
+# GÊNEROS NORMALIZADOS (um registro por gênero do Spotify)
+class Genre(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    # Super-gênero do mapeamento MGD+ (data/raw/Genre Mapping/spotify_genre_mapping.csv)
+    super_genre = models.CharField(max_length=100, default="", blank=True, db_index=True, verbose_name="Super-gênero")
+
+    def __str__(self):
+        return self.name
+
+# LIGAÇÃO ARTISTA-GÊNERO (guarda a ordem do Spotify: position 0 = gênero dominante)
+class ArtistGenre(models.Model):
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='genre_links')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='artist_links')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'genre'], name='unique_artist_genre'),
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'artist']),
+            models.Index(fields=['artist', 'position']),
+        ]
+
+    def __str__(self):
+        return f'{self.artist_id} -> {self.genre_id} ({self.position})'
+
 # A FAIXA/HIT MUSICAL
 class HitSong(models.Model):
     # ID principal e detalhes básicos da faixa
@@ -56,6 +135,9 @@ class HitSong(models.Model):
     
     # Métricas da ARS e Hipótese
     genre_heterogeneity_index = models.FloatField(null=True, verbose_name="Índice de Heterogeneidade de Gênero") 
+    # Medidas alternativas sobre os super-gêneros mapeados (calculadas na mesma passada do IHG)
+    genre_entropy = models.FloatField(null=True, verbose_name="Entropia de Shannon dos Super-gêneros")
+    genre_gini_simpson = models.FloatField(null=True, verbose_name="Índice de Gini-Simpson dos Super-gêneros")
     avg_artist_betweenness = models.FloatField(null=True, verbose_name="Média da Intermediação dos Artistas") 
     
     # Campos estatísticos (que você já tinha)
@@ -67,3 +149,64 @@ class HitSong(models.Model):
 
     def __str__(self):
         return f'{self.name} ({self.market_of_origin})'
+
+# POSIÇÕES SEMANAIS NOS CHARTS (série temporal de cada hit por mercado)
+class ChartEntry(models.Model):
+    song = models.ForeignKey(HitSong, on_delete=models.CASCADE, related_name='chart_entries')
+    market = models.CharField(max_length=10, verbose_name="Mercado")  # ex.: 'br', 'global'
+    week_start = models.DateField(verbose_name="Início da Semana")
+    week_end = models.DateField(verbose_name="Fim da Semana")
+    position = models.PositiveSmallIntegerField(verbose_name="Posição")
+    streams = models.BigIntegerField(null=True)
+    peak_position = models.PositiveSmallIntegerField(null=True, verbose_name="Melhor Posição")
+    weeks_on_chart = models.PositiveSmallIntegerField(null=True, verbose_name="Semanas no Chart")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['song', 'market', 'week_start'], name='unique_chart_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['song', 'week_start']),
+            models.Index(fields=['market', 'week_start']),
+        ]
+
+    def __str__(self):
+        return f'{self.market} {self.week_start}: #{self.position} {self.song_id}'
+
+# SÉRIE TEMPORAL DE CENTRALIDADE (uma linha por artista e janela da rede temporal)
+class ArtistCentralitySnapshot(models.Model):
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='centrality_snapshots')
+    market = models.CharField(max_length=10, verbose_name="Mercado")
+    # 'year', 'quarter' ou janela deslizante em semanas (ex.: '8w')
+    granularity = models.CharField(max_length=10, verbose_name="Granularidade")
+    window_start = models.DateField(verbose_name="Início da Janela")
+    window_end = models.DateField(verbose_name="Fim da Janela")
+    num_hits = models.IntegerField(default=0, verbose_name="Hits na Janela")
+    betweenness_centrality = models.FloatField(verbose_name="Centralidade de Intermediação")
+    degree_centrality = models.FloatField(verbose_name="Centralidade de Grau")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['artist', 'market', 'granularity', 'window_start'], name='unique_artist_window'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['market', 'granularity', 'window_start']),
+        ]
+
+    def __str__(self):
+        return f'{self.artist_id} {self.granularity} {self.window_start}: {self.betweenness_centrality:.4f}'
+
+# EXECUÇÕES DE ANÁLISE (versão das métricas servidas pela API: ETag/Last-Modified e cache)
+class AnalysisRun(models.Model):
+    # Comando que gravou as métricas (ex.: 'analyze_network', 'analyze_chart_trends')
+    kind = models.CharField(max_length=50)
+    finished_at = models.DateTimeField(auto_now_add=True, verbose_name="Concluída em")
+    artists_updated = models.IntegerField(default=0, verbose_name="Artistas Alterados")
+    songs_updated = models.IntegerField(default=0, verbose_name="Músicas Alteradas")
+    # Parâmetros e resumo da rodada (modo, nº de nós/arestas, ...)
+    details = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.finished_at:%Y-%m-%d %H:%M})'
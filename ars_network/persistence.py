@@ -0,0 +1,63 @@
+# ars_network/persistence.py
+#
+# Gravação em massa de métricas: compara os valores novos com os do banco e faz
+# bulk_update apenas das linhas (e dos campos) que realmente mudaram. Cada rodada
+# de análise é registrada em AnalysisRun (versão das métricas servidas pela API).
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from ars_network.models import AnalysisRun
+
+
+def bulk_update_changed(model, frame, fields, batch_size=500, rtol=1e-9):
+    """Atualiza `fields` de `model` a partir de `frame` (indexado pela PK).
+
+    Floats são comparados com tolerância relativa `rtol`, para que diferenças de
+    arredondamento (ex.: somas paralelas) não gerem escritas desnecessárias.
+    Retorna o número de linhas atualizadas.
+    """
+    if frame.empty:
+        return 0
+
+    current = pd.DataFrame(
+        list(model.objects.values('pk', *fields)), columns=['pk', *fields]
+    ).set_index('pk').reindex(frame.index)
+
+    changed_mask = np.zeros(len(frame), dtype=bool)
+    changed_fields = []
+    for field in fields:
+        new, old = frame[field], current[field]
+        if is_numeric_dtype(new):
+            differs = ~np.isclose(
+                new.astype(float).values, old.astype(float).values, rtol=rtol, atol=0.0, equal_nan=True
+            )
+        else:
+            differs = (new.ne(old) & ~(new.isna() & old.isna())).values
+        if differs.any():
+            changed_fields.append(field)
+            changed_mask |= differs
+
+    if not changed_fields:
+        return 0
+
+    changed = frame.loc[changed_mask, changed_fields].astype(object)
+    changed = changed.where(changed.notna(), None)
+    objs = [
+        model(pk=pk, **dict(zip(changed_fields, values)))
+        for pk, values in zip(changed.index, changed.itertuples(index=False, name=None))
+    ]
+    model.objects.bulk_update(objs, changed_fields, batch_size=batch_size)
+    return len(objs)
+
+
+def record_analysis_run(kind, artists_updated=0, songs_updated=0, **details):
+    """Registra uma rodada que gravou métricas.
+
+    As chaves de cache e os ETags da API incluem o id da última rodada, então as
+    respostas em cache deixam de ser usadas assim que a nova rodada é registrada.
+    """
+    return AnalysisRun.objects.create(
+        kind=kind, artists_updated=artists_updated, songs_updated=songs_updated, details=details,
+    )
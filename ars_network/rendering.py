@@ -0,0 +1,342 @@
+# ars_network/rendering.py
+#
+# Pipeline de renderização das figuras da rede. Os estilos de todos os nós (cor,
+# tamanho, borda, rótulo) são calculados uma única vez em arrays NumPy
+# (RenderPrimitives); cada vista (grafo completo, zoom, foco em um gênero, 100%
+# dos rótulos) apenas escolhe um subconjunto e desenha as arestas como uma única
+# LineCollection e os nós como um único scatter. As vistas podem ser geradas em
+# paralelo, um processo por vista (as primitivas vão uma vez para cada processo).
+#
+# Formatos de saída: PNG/WebP (DPI configurável) e SVG/PDF, nos quais a camada de
+# arestas (e a de nós, em grafos densos) é rasterizada e só textos e legenda
+# ficam vetoriais. O grafo estilizado também pode ser exportado em GraphML, GEXF
+# ou JSON para ferramentas externas (Gephi, Cytoscape, d3).
+
+import json
+import multiprocessing
+import time
+from collections import namedtuple
+
+import matplotlib.colors as mcolors
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+# Mesmos critérios de destaque dos comandos visualize_*
+BRIDGE_PERCENTILE = 90
+BRIDGE_MIN_BETWEENNESS = 0.001
+HUB_PERCENTILE = 95
+NODE_SIZE_SCALE = 8000
+FADED_COLOR = mcolors.to_rgba('#d9d9d9')
+BRIDGE_LABEL = 'Ponte Crítica (Alta Intermediação)'
+
+LABELS_DEFAULT = 'default'   # pontes e hubs
+LABELS_ALL = 'all'
+LABELS_NONE = 'none'
+
+LEGEND_KEYS = 'keys'         # uma entrada por cor (gênero/comunidade) + ponte
+LEGEND_BRIDGE = 'bridge'     # só a entrada da ponte
+
+OUTPUT_FORMATS = ('png', 'webp', 'svg', 'pdf')
+GRAPH_FORMATS = ('graphml', 'gexf', 'json')
+DEFAULT_DPI = 300
+WEBP_QUALITY = 90
+# Acima deste número de nós, o scatter também é rasterizado nas saídas vetoriais
+RASTERIZE_NODES_ABOVE = 2000
+
+
+def add_output_arguments(parser):
+    """Opções de formato de saída comuns aos comandos visualize_*."""
+    parser.add_argument(
+        '--format', action='append', choices=OUTPUT_FORMATS, default=None,
+        help="Formato da imagem (repetível): png (padrão), webp, svg ou pdf (arestas rasterizadas)."
+    )
+    parser.add_argument(
+        '--dpi', type=int, default=DEFAULT_DPI,
+        help=f'Resolução das imagens e das camadas rasterizadas dos vetoriais (padrão: {DEFAULT_DPI}).'
+    )
+    parser.add_argument(
+        '--graph-format', action='append', choices=GRAPH_FORMATS, default=None,
+        help='Exporta também o grafo estilizado (posições, cores, tamanhos) neste formato (repetível).'
+    )
+    parser.add_argument(
+        '--render-report', action='store_true',
+        help='Mostra o tempo de desenho/gravação e o tamanho de cada arquivo gerado.'
+    )
+    parser.add_argument(
+        '--time-budget', type=float, default=None,
+        help='Orçamento de tempo (s) por arquivo no relatório; arquivos acima dele são sinalizados.'
+    )
+
+
+def output_options(options):
+    """Converte as opções do comando nos campos de formato de uma View."""
+    return {'formats': tuple(dict.fromkeys(options['format'] or ['png'])), 'dpi': options['dpi']}
+
+
+class RenderPrimitives:
+    """Arrays de estilo por nó e arestas, na ordem do LayoutIndex (calculados uma vez)."""
+
+    def __init__(self, layout_index, metrics, color_keys, cmap_name='gist_rainbow', key_labels=None, all_keys=None):
+        """`metrics`: {spotify_id: (nome, intermediação, grau)}; `color_keys`: chave de cor por nó
+        (gênero, comunidade...), na ordem de `layout_index.nodes`.
+
+        O limiar das pontes é o percentil de todo o `metrics` (inclusive artistas fora do
+        grafo) e `all_keys`, se informado, fixa o domínio da paleta (ex.: gêneros de todos
+        os artistas), como nos comandos visualize_* originais."""
+        self.layout_index = layout_index
+        self.xy = layout_index.xy
+        n = len(layout_index)
+
+        rows = [metrics.get(node) for node in layout_index.nodes]
+        self.has_metrics = np.array([row is not None for row in rows], dtype=bool)
+        self.names = np.array([row[0] if row else node for row, node in zip(rows, layout_index.nodes)], dtype=object)
+        self.betweenness = np.array([(row[1] or 0.0) if row else 0.0 for row in rows], dtype=np.float64)
+        self.sizes = np.array([(row[2] or 0.0) if row else 0.0 for row in rows], dtype=np.float64) * NODE_SIZE_SCALE
+
+        # Percentis calculados uma única vez para todas as vistas
+        values = np.array([row[1] or 0.0 for row in metrics.values()], dtype=np.float64)
+        self.betweenness_threshold = max(BRIDGE_MIN_BETWEENNESS, np.percentile(values, BRIDGE_PERCENTILE)) if len(values) else BRIDGE_MIN_BETWEENNESS
+        positive = self.sizes[self.sizes > 0]
+        self.hub_threshold = np.percentile(positive, HUB_PERCENTILE) if len(positive) else 0.0
+        self.is_bridge = self.has_metrics & (self.betweenness >= self.betweenness_threshold)
+        self.is_hub = self.has_metrics & (self.sizes > self.hub_threshold)
+
+        # Cores: uma por chave, na ordem das chaves
+        self.color_keys = np.array(list(color_keys), dtype=object).reshape(n)
+        keys = sorted(set(self.color_keys).union(all_keys or ()), key=str)
+        cmap = plt.cm.get_cmap(cmap_name, max(len(keys), 1))
+        self.key_colors = {key: cmap(i) for i, key in enumerate(keys)}
+        self.key_labels = key_labels or {key: str(key) for key in keys}
+        self.colors = np.array([self.key_colors[key] for key in self.color_keys], dtype=np.float64).reshape(n, 4)
+        self.borders = self.colors.copy()
+        self.borders[self.is_bridge] = mcolors.to_rgba('red')
+
+        adjacency = layout_index.adjacency.tocoo()
+        self.edge_u, self.edge_v = adjacency.row.astype(np.int64), adjacency.col.astype(np.int64)
+        self.edge_weights = adjacency.data.astype(np.float64)
+
+    @property
+    def number_of_nodes(self):
+        return len(self.xy)
+
+    @property
+    def number_of_edges(self):
+        return len(self.edge_u)
+
+    def legend_handles(self, legend):
+        handles = []
+        if legend == LEGEND_KEYS:
+            handles = [
+                Line2D([0], [0], marker='o', color='w', label=self.key_labels.get(key, str(key)),
+                       markersize=10, markerfacecolor=color)
+                for key, color in self.key_colors.items()
+            ]
+        handles.append(Line2D([0], [0], marker='o', color='w', label=BRIDGE_LABEL, markersize=10,
+                              markerfacecolor='gray', markeredgecolor='red', markeredgewidth=2))
+        return handles
+
+
+View = namedtuple('View', [
+    'name', 'title', 'output_path', 'viewport', 'focus', 'labels', 'legend',
+    'figsize', 'dpi', 'edge_alpha', 'font_size', 'font_weight', 'title_size', 'legend_title', 'formats',
+])
+View.__new__.__defaults__ = (
+    None, None, LABELS_DEFAULT, LEGEND_KEYS, (25, 20), DEFAULT_DPI, 0.15, 9, 'bold', None, "Destaque ARS", ('png',),
+)
+View.__doc__ = """Uma figura a gerar: recorte (viewport), foco opcional (máscara booleana de nós
+em destaque; os demais ficam em cinza), política de rótulos, legenda e formatos de saída
+(um arquivo por formato: o sufixo de `output_path` é trocado pelo de cada formato)."""
+
+RenderResult = namedtuple('RenderResult', [
+    'name', 'format', 'path', 'nodes', 'edges', 'draw_seconds', 'save_seconds', 'size_bytes',
+])
+
+
+def _view_selection(primitives, view):
+    """Índices dos nós e das arestas desenhados na vista."""
+    index = primitives.layout_index
+    if view.viewport is None:
+        nodes = np.arange(primitives.number_of_nodes)
+        u, v, w = primitives.edge_u, primitives.edge_v, primitives.edge_weights
+    else:
+        nodes = index.nodes_in(view.viewport)
+        u, v, w = index.edges_among(nodes)
+    if view.focus is not None:
+        keep = view.focus[u] | view.focus[v]
+        u, v, w = u[keep], v[keep], w[keep]
+    return nodes, u, v, w
+
+
+def _label_mask(primitives, view, nodes):
+    if view.labels == LABELS_NONE:
+        return np.zeros(len(nodes), dtype=bool)
+    mask = primitives.has_metrics[nodes]
+    if view.labels == LABELS_DEFAULT:
+        mask &= primitives.is_bridge[nodes] | primitives.is_hub[nodes]
+    if view.focus is not None:
+        mask &= view.focus[nodes]
+    return mask
+
+
+def draw_view(primitives, view, ax):
+    """Desenha a vista no eixo: uma LineCollection (arestas), um scatter (nós) e os rótulos."""
+    nodes, u, v, w = _view_selection(primitives, view)
+    xy = primitives.xy
+
+    segments = np.stack([xy[u], xy[v]], axis=1)
+    # Camada de arestas sempre rasterizada nas saídas vetoriais (não afeta PNG/WebP)
+    ax.add_collection(LineCollection(segments, linewidths=w * 0.5, colors='gray', alpha=view.edge_alpha,
+                                     zorder=1, rasterized=True))
+
+    colors, borders = primitives.colors[nodes], primitives.borders[nodes]
+    if view.focus is not None:
+        faded = ~view.focus[nodes]
+        colors, borders = colors.copy(), borders.copy()
+        colors[faded] = FADED_COLOR
+        borders[faded] = FADED_COLOR
+    ax.scatter(xy[nodes, 0], xy[nodes, 1], s=primitives.sizes[nodes], c=colors,
+               edgecolors=borders, linewidths=2, alpha=0.8, zorder=2, rasterized=len(nodes) > RASTERIZE_NODES_ABOVE)
+
+    for i in nodes[_label_mask(primitives, view, nodes)]:
+        ax.text(xy[i, 0], xy[i, 1], primitives.names[i], fontsize=view.font_size, fontweight=view.font_weight,
+                ha='center', va='center', zorder=3)
+
+    if view.viewport is not None:
+        ax.set_xlim(view.viewport.xmin, view.viewport.xmax)
+        ax.set_ylim(view.viewport.ymin, view.viewport.ymax)
+    else:
+        ax.autoscale_view()
+    ax.set_title(view.title, fontsize=view.title_size)
+    ax.set_axis_off()
+    return len(nodes), len(u)
+
+
+def render_view(primitives, view):
+    """Desenha a vista uma vez e salva em cada formato; retorna uma RenderResult por arquivo."""
+    start = time.perf_counter()
+    fig = Figure(figsize=view.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    num_nodes, num_edges = draw_view(primitives, view, ax)
+    if view.legend == LEGEND_KEYS:
+        ax.legend(handles=primitives.legend_handles(view.legend), title=view.legend_title,
+                  loc='upper right', bbox_to_anchor=(1.2, 1), ncol=1, fontsize=10)
+    elif view.legend == LEGEND_BRIDGE:
+        ax.legend(handles=primitives.legend_handles(view.legend), title=view.legend_title,
+                  frameon=False, labelspacing=1, fontsize=12)
+    fig.tight_layout()
+    draw_seconds = time.perf_counter() - start
+
+    results = []
+    view.output_path.parent.mkdir(parents=True, exist_ok=True)
+    for fmt in view.formats:
+        path = view.output_path.with_suffix(f'.{fmt}')
+        start = time.perf_counter()
+        extra = {'pil_kwargs': {'quality': WEBP_QUALITY}} if fmt == 'webp' else {}
+        fig.savefig(path, format=fmt, dpi=view.dpi, bbox_inches='tight', **extra)
+        results.append(RenderResult(view.name, fmt, path, num_nodes, num_edges, draw_seconds,
+                                    time.perf_counter() - start, path.stat().st_size))
+    return results
+
+
+# Primitivas do processo trabalhador (enviadas uma única vez pelo initializer do Pool)
+_WORKER_PRIMITIVES = None
+
+
+def _init_worker(primitives):
+    global _WORKER_PRIMITIVES
+    _WORKER_PRIMITIVES = primitives
+
+
+def _render_in_worker(view):
+    return render_view(_WORKER_PRIMITIVES, view)
+
+
+def render_views(primitives, views, workers=1):
+    """Gera todas as vistas, em série ou uma por processo; devolve as RenderResult na ordem das vistas."""
+    views = list(views)
+    workers = min(workers, len(views))
+    if workers <= 1:
+        per_view = [render_view(primitives, view) for view in views]
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(primitives,)) as pool:
+            per_view = pool.map(_render_in_worker, views, chunksize=1)
+    return [result for results in per_view for result in results]
+
+
+def styled_graph(primitives):
+    """Grafo networkx com posição, cor, tamanho e destaques de cada nó (para GraphML/GEXF/JSON)."""
+    G = nx.Graph()
+    for i, node in enumerate(primitives.layout_index.nodes):
+        r, g, b, a = (int(round(c * 255)) for c in primitives.colors[i])
+        x, y = (float(c) for c in primitives.xy[i])
+        G.add_node(
+            node, label=str(primitives.names[i]), group=str(primitives.color_keys[i]),
+            color=mcolors.to_hex(primitives.colors[i]), border=mcolors.to_hex(primitives.borders[i]),
+            size=float(primitives.sizes[i]), x=x, y=y,
+            betweenness=float(primitives.betweenness[i]),
+            is_bridge=bool(primitives.is_bridge[i]), is_hub=bool(primitives.is_hub[i]),
+            viz={'color': {'r': r, 'g': g, 'b': b, 'a': a / 255}, 'position': {'x': x, 'y': y, 'z': 0.0},
+                 'size': float(np.sqrt(primitives.sizes[i]))},
+        )
+    nodes = primitives.layout_index.nodes
+    G.add_weighted_edges_from(
+        (nodes[u], nodes[v], float(w)) for u, v, w in zip(primitives.edge_u, primitives.edge_v, primitives.edge_weights)
+    )
+    return G
+
+
+def export_styled_graph(primitives, base_path, fmt):
+    """Salva o grafo estilizado em `base_path`.<fmt>; retorna o caminho."""
+    G = styled_graph(primitives)
+    path = base_path.with_suffix(f'.{fmt}')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == 'gexf':
+        nx.write_gexf(G, path)
+    else:
+        # GraphML e JSON não aceitam atributos aninhados: só os campos planos
+        for _, data in G.nodes(data=True):
+            data.pop('viz')
+        if fmt == 'graphml':
+            nx.write_graphml(G, path)
+        else:
+            path.write_text(json.dumps(nx.node_link_data(G, edges='edges'), ensure_ascii=False), encoding='utf-8')
+    return path
+
+
+def write_render_report(stdout, results, budget=None):
+    """Tempo de preparo (montagem da figura) e de gravação (rasterização + escrita) e tamanho por arquivo."""
+    stdout.write("\n--- Relatório de Renderização ---")
+    width = max((len(r.name) for r in results), default=0)
+    for r in results:
+        total = r.draw_seconds + r.save_seconds
+        flag = "  ACIMA DO ORÇAMENTO" if budget is not None and total > budget else ""
+        stdout.write(
+            f"  {r.name.ljust(width)}  {r.format:<4}  preparo {r.draw_seconds:7.2f}s  "
+            f"gravação {r.save_seconds:7.2f}s  {r.size_bytes / 1e6:8.2f} MB{flag}"
+        )
+    # Formato mais barato (tempo de gravação) de cada vista dentro do orçamento
+    for name in dict.fromkeys(r.name for r in results):
+        candidates = [r for r in results if r.name == name and (budget is None or r.draw_seconds + r.save_seconds <= budget)]
+        if candidates:
+            best = min(candidates, key=lambda r: (r.save_seconds, r.size_bytes))
+            stdout.write(f"  {name}: formato mais barato = {best.format} ({best.save_seconds:.2f}s, {best.size_bytes / 1e6:.2f} MB)")
+
+
+def write_extra_outputs(stdout, primitives, results, graph_base, options):
+    """Exportações do grafo estilizado (--graph-format) e relatório (--render-report) de um comando."""
+    for fmt in dict.fromkeys(options['graph_format'] or []):
+        path = export_styled_graph(primitives, graph_base, fmt)
+        stdout.write(f"Grafo estilizado ({fmt}) salvo em: {path}")
+    if options['render_report']:
+        write_render_report(stdout, results, options['time_budget'])
+
+
+def artist_metrics(artists):
+    """{spotify_id: (nome, intermediação, grau)} a partir de objetos Artist (já com as métricas)."""
+    return {a.spotify_id: (a.name, a.betweenness_centrality, a.degree_centrality) for a in artists}
@@ -0,0 +1,140 @@
+# ars_network/temporal.py
+#
+# Rede de colaboração temporal: snapshots do grafo por ano, trimestre ou janela
+# deslizante de N semanas de Charts. A adjacência de cada janela é obtida da
+# anterior somando/subtraindo só as músicas que entraram/saíram (A += Bₑ·Bₑᵀ −
+# Bₛ·Bₛᵀ), e a Intermediação é recalculada só nos componentes alterados.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ars_network.centrality import (
+    BetweennessState, incremental_betweenness, normalize_betweenness,
+)
+from ars_network.graph import CollaborationGraph
+from ars_network.models import ChartEntry
+
+GRANULARITIES = ('year', 'quarter', 'sliding')
+
+Window = namedtuple('Window', ['start', 'end', 'weeks'])
+WindowCentrality = namedtuple('WindowCentrality', [
+    'window', 'graph', 'betweenness', 'degree', 'num_hits', 'recomputed',
+])
+
+
+def load_week_song_matrix(market, collab_graph):
+    """Semanas do mercado e matriz binária semana x música alinhada às colunas do grafo.
+
+    Retorna (week_starts, week_ends, matriz CSR). Posições de músicas fora do grafo
+    (sem artistas ligados) são ignoradas.
+    """
+    entries = pd.DataFrame(
+        list(ChartEntry.objects.filter(market=market).values_list('song_id', 'week_start', 'week_end')),
+        columns=['song_id', 'week_start', 'week_end'],
+    )
+    weeks = entries[['week_start', 'week_end']].drop_duplicates('week_start').sort_values('week_start')
+    week_row = pd.Series(np.arange(len(weeks)), index=weeks['week_start'].values)
+    song_col = pd.Series(np.arange(len(collab_graph.song_pks)), index=collab_graph.song_pks)
+
+    entries = entries[entries['song_id'].isin(song_col.index)]
+    rows = week_row.loc[entries['week_start']].to_numpy()
+    cols = song_col.loc[entries['song_id']].to_numpy()
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(weeks), len(song_col))
+    )
+    matrix.data = np.ones_like(matrix.data)
+    return weeks['week_start'].to_numpy(), weeks['week_end'].to_numpy(), matrix
+
+
+def chart_windows(week_starts, week_ends, granularity, window_weeks=8, step_weeks=1):
+    """Janelas (início, fim, índices das semanas) por ano, trimestre ou deslizantes."""
+    if granularity == 'sliding':
+        last_start = max(len(week_starts) - window_weeks, 0)
+        return [
+            Window(week_starts[i], week_ends[min(i + window_weeks, len(week_starts)) - 1],
+                   np.arange(i, min(i + window_weeks, len(week_starts))))
+            for i in range(0, last_start + 1, step_weeks)
+        ]
+
+    # A semana pertence ao período em que termina: a semana de 30/12/2016 a 05/01/2017
+    # é do chart de 2017, e não uma janela de 2016 com uma semana só
+    ends = pd.to_datetime(pd.Series(week_ends))
+    keys = ends.dt.year if granularity == 'year' else ends.dt.year * 10 + ends.dt.quarter
+    windows = []
+    for _, weeks in pd.Series(np.arange(len(week_starts))).groupby(keys.values):
+        weeks = weeks.to_numpy()
+        windows.append(Window(week_starts[weeks[0]], week_ends[weeks[-1]], weeks))
+    return windows
+
+
+def _outer(incidence_csc, songs):
+    """Bₘ·Bₘᵀ para o subconjunto `songs` de colunas da incidência."""
+    sub = incidence_csc[:, songs]
+    return (sub @ sub.T).tocsr()
+
+
+def window_graphs(collab_graph, week_song, windows):
+    """Gera o CollaborationGraph de cada janela, atualizando a adjacência de forma incremental.
+
+    `counts` guarda em quantas semanas da janela corrente cada música aparece; uma
+    música só entra/sai da adjacência quando a contagem passa de/para zero.
+    """
+    incidence_csc = collab_graph.incidence.tocsc()
+    num_artists = len(collab_graph.artist_ids)
+    adjacency = sp.csr_matrix((num_artists, num_artists), dtype=collab_graph.adjacency.dtype)
+    counts = np.zeros(week_song.shape[1], dtype=np.int64)
+    previous_weeks = np.array([], dtype=np.int64)
+
+    for window in windows:
+        entering = np.setdiff1d(window.weeks, previous_weeks)
+        leaving = np.setdiff1d(previous_weeks, window.weeks)
+        active_before = counts > 0
+        counts += np.asarray(week_song[entering].sum(axis=0)).ravel().astype(np.int64)
+        counts -= np.asarray(week_song[leaving].sum(axis=0)).ravel().astype(np.int64)
+        active = counts > 0
+
+        added = np.flatnonzero(active & ~active_before)
+        removed = np.flatnonzero(active_before & ~active)
+        adjacency = adjacency + _outer(incidence_csc, added) - _outer(incidence_csc, removed)
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        adjacency.sort_indices()
+        previous_weeks = window.weeks
+
+        songs = np.flatnonzero(active)
+        yield window, CollaborationGraph(
+            collab_graph.artist_ids,
+            collab_graph.song_pks[songs],
+            incidence_csc[:, songs].tocsr(),
+            f"{collab_graph.fingerprint}:{window.start}",
+            adjacency=adjacency.copy(),
+        )
+
+
+def temporal_centrality(collab_graph, week_song, windows, workers=1):
+    """Intermediação e grau de cada artista em cada janela.
+
+    Cada janela parte do estado da anterior (incremental_betweenness): componentes
+    sem arestas alteradas mantêm a intermediação não normalizada já calculada.
+    """
+    artist_ids = collab_graph.artist_ids
+    num_artists = len(artist_ids)
+    state = BetweennessState(artist_ids, sp.csr_matrix((num_artists, num_artists)), np.zeros(num_artists))
+
+    for window, graph in window_graphs(collab_graph, week_song, windows):
+        update = incremental_betweenness(graph, state, weight='weight', workers=workers)
+        raw = np.array([update.raw_betweenness.get(a, 0.0) for a in artist_ids])
+        state = BetweennessState(artist_ids, graph.adjacency, raw)
+
+        normalized = normalize_betweenness(dict(zip(artist_ids, raw)), graph.number_of_nodes)
+        yield WindowCentrality(
+            window=window,
+            graph=graph,
+            betweenness=np.array([normalized[a] for a in artist_ids]),
+            degree=graph.degree_centrality(),
+            num_hits=np.diff(graph.incidence.indptr),
+            recomputed=len(update.recomputed_artists),
+        )
@@ -0,0 +1,190 @@
+# ars_network/tiles.py
+#
+# Pirâmide de tiles (z/x/y, 256 px) da rede de colaboração, gerada a partir do
+# layout em cache (ars_network/layout.py). O mundo é o quadrado que envolve o
+# layout; no nível z ele é dividido em 2^z × 2^z tiles, com y=0 no topo (mesma
+# convenção dos mapas web). Cada nó, aresta e rótulo é distribuído de uma vez
+# nos tiles que sua caixa toca, então cada tile desenha só o que lhe pertence.
+#
+# Densidade de rótulos por nível (mesmos limites dos comandos visualize_*):
+#   z=0     artistas no percentil 99 da Intermediação
+#   z=1     pontes (percentil 90 da Intermediação, mínimo 0.001)
+#   z=2     pontes e hubs (percentil 95 do Grau)
+#   z>=3    todos os artistas
+
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from ars_network.genres import NO_GENRE, dominant_genres
+from ars_network.models import Artist
+from ars_network.rendering import BRIDGE_MIN_BETWEENNESS, RenderPrimitives, artist_metrics
+
+TILES_DIR = settings.BASE_DIR / "data" / "tiles"
+TILE_SIZE = 256
+DEFAULT_MAX_ZOOM = 5
+TOP_BRIDGE_PERCENTILE = 99
+
+# Figura de referência (25 polegadas a 300 dpi): nós e arestas seguem a escala dela.
+# Os tiles são desenhados a 72 dpi, então 1 ponto tipográfico = 1 px.
+REFERENCE_DPI = 300
+REFERENCE_WIDTH_PX = 25 * REFERENCE_DPI
+TILE_DPI = 72
+FONT_SIZE = 9
+# Caixa aproximada de um rótulo (px por caractere, altura) para distribuí-lo nos tiles vizinhos
+LABEL_CHAR_PX = 6
+LABEL_HEIGHT_PX = 12
+
+def tile_primitives(layout_index):
+    """Primitivas de desenho (rendering.RenderPrimitives) coloridas pelo Gênero Dominante.
+
+    As métricas vêm do banco (última execução do analyze_network).
+    """
+    metrics = artist_metrics(Artist.objects.filter(spotify_id__in=list(layout_index.nodes)))
+    genres = dominant_genres()
+    return RenderPrimitives(layout_index, metrics, [genres.get(node, NO_GENRE) for node in layout_index.nodes])
+
+
+def label_levels(primitives):
+    """Primeiro nível de zoom em que cada artista ganha rótulo."""
+    top_threshold = max(BRIDGE_MIN_BETWEENNESS, np.percentile(primitives.betweenness, TOP_BRIDGE_PERCENTILE))
+    level = np.full(primitives.number_of_nodes, 3, dtype=np.int64)
+    level[primitives.is_hub | primitives.is_bridge] = 2
+    level[primitives.is_bridge] = 1
+    level[primitives.has_metrics & (primitives.betweenness >= top_threshold)] = 0
+    level[~primitives.has_metrics] = np.iinfo(np.int64).max
+    return level
+
+
+def world_bounds(layout_index, margin=0.05):
+    """Quadrado (x0, y0, lado) que envolve o layout, com margem."""
+    low, high = layout_index.xy.min(axis=0), layout_index.xy.max(axis=0)
+    side = max((high - low).max(), 1e-9) * (1 + 2 * margin)
+    center = (low + high) / 2
+    return center[0] - side / 2, center[1] - side / 2, side
+
+
+def _bucket(boxes, origin, tile_world, n_tiles):
+    """Distribui caixas (xmin, ymin, xmax, ymax) nos tiles que tocam: {(x, y): índices}."""
+    x0, y0 = origin
+    tx0 = np.clip(((boxes[:, 0] - x0) / tile_world).astype(np.int64), 0, n_tiles - 1)
+    tx1 = np.clip(((boxes[:, 2] - x0) / tile_world).astype(np.int64), 0, n_tiles - 1)
+    # y do tile cresce para baixo: o topo do mundo é a linha 0
+    ty0 = np.clip(((y0 + tile_world * n_tiles - boxes[:, 3]) / tile_world).astype(np.int64), 0, n_tiles - 1)
+    ty1 = np.clip(((y0 + tile_world * n_tiles - boxes[:, 1]) / tile_world).astype(np.int64), 0, n_tiles - 1)
+
+    spans_x, spans_y = tx1 - tx0 + 1, ty1 - ty0 + 1
+    counts = spans_x * spans_y
+    item = np.repeat(np.arange(len(boxes)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    tile_x = tx0[item] + offset % spans_x[item]
+    tile_y = ty0[item] + offset // spans_x[item]
+
+    buckets = {}
+    if not len(item):
+        return buckets
+    order = np.lexsort((tile_y, tile_x))
+    keys = np.stack([tile_x[order], tile_y[order]], axis=1)
+    starts = np.flatnonzero(np.r_[True, (np.diff(keys, axis=0) != 0).any(axis=1)])
+    for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+        buckets[(int(keys[start, 0]), int(keys[start, 1]))] = item[order[start:end]]
+    return buckets
+
+
+def _render_tile(path, bounds, primitives, edge_widths, node_idx, edge_idx, label_idx, size_scale):
+    fig = Figure(figsize=(TILE_SIZE / TILE_DPI, TILE_SIZE / TILE_DPI), dpi=TILE_DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_xlim(bounds[0], bounds[2])
+    ax.set_ylim(bounds[1], bounds[3])
+
+    xy = primitives.xy
+    if edge_idx is not None and len(edge_idx):
+        segments = np.stack([xy[primitives.edge_u[edge_idx]], xy[primitives.edge_v[edge_idx]]], axis=1)
+        ax.add_collection(LineCollection(segments, linewidths=edge_widths[edge_idx], colors='gray', alpha=0.15))
+    if node_idx is not None and len(node_idx):
+        ax.scatter(xy[node_idx, 0], xy[node_idx, 1], s=np.maximum(primitives.sizes[node_idx] * size_scale, 2.0),
+                   c=primitives.colors[node_idx], edgecolors=primitives.borders[node_idx], linewidths=0.8, alpha=0.8)
+    if label_idx is not None:
+        for i in label_idx:
+            ax.text(xy[i, 0], xy[i, 1], primitives.names[i], fontsize=FONT_SIZE, fontweight='bold',
+                    ha='center', va='center', clip_on=False)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path, dpi=TILE_DPI, transparent=True)
+
+
+def export_tiles(primitives, output_dir, max_zoom=DEFAULT_MAX_ZOOM, fingerprint='', layout='', analysis_run=None):
+    """Gera a pirâmide z=0..max_zoom em `output_dir` e grava metadata.json. Retorna {z: tiles}."""
+    xy = primitives.xy
+    u, v, weights = primitives.edge_u, primitives.edge_v, primitives.edge_weights
+    edge_boxes = np.column_stack([np.minimum(xy[u], xy[v]), np.maximum(xy[u], xy[v])])
+    x0, y0, side = world_bounds(primitives.layout_index)
+    label_chars = np.array([len(str(name)) for name in primitives.names])
+    label_level = label_levels(primitives)
+
+    tiles_per_level = {}
+    for z in range(max_zoom + 1):
+        n_tiles = 2 ** z
+        tile_world = side / n_tiles
+        world_per_px = tile_world / TILE_SIZE
+        # Nós e arestas crescem com o zoom: no nível em que o mundo tem ~7500 px eles
+        # ficam do tamanho da figura de referência
+        linear_scale = REFERENCE_DPI / TILE_DPI * TILE_SIZE * n_tiles / REFERENCE_WIDTH_PX
+        size_scale = linear_scale ** 2
+        edge_widths = np.clip(weights * 0.5 * linear_scale, 0.2, None)
+
+        radius = (np.sqrt(np.maximum(primitives.sizes * size_scale, 2.0)) / 2 + 2) * world_per_px
+        node_buckets = _bucket(np.column_stack([xy - radius[:, None], xy + radius[:, None]]), (x0, y0), tile_world, n_tiles)
+        edge_buckets = _bucket(edge_boxes, (x0, y0), tile_world, n_tiles) if len(u) else {}
+
+        labeled = np.flatnonzero(label_level <= z)
+        half_w = label_chars[labeled] * LABEL_CHAR_PX / 2 * world_per_px
+        half_h = LABEL_HEIGHT_PX / 2 * world_per_px
+        label_boxes = np.column_stack([
+            xy[labeled, 0] - half_w, xy[labeled, 1] - half_h, xy[labeled, 0] + half_w, xy[labeled, 1] + half_h,
+        ])
+        label_buckets = {key: labeled[idx] for key, idx in _bucket(label_boxes, (x0, y0), tile_world, n_tiles).items()}
+
+        keys = set(node_buckets) | set(edge_buckets) | set(label_buckets)
+        for tx, ty in keys:
+            bounds = (x0 + tx * tile_world, y0 + (n_tiles - ty - 1) * tile_world,
+                      x0 + (tx + 1) * tile_world, y0 + (n_tiles - ty) * tile_world)
+            _render_tile(
+                output_dir / str(z) / str(tx) / f"{ty}.png", bounds, primitives, edge_widths,
+                node_buckets.get((tx, ty)), edge_buckets.get((tx, ty)), label_buckets.get((tx, ty)), size_scale,
+            )
+        tiles_per_level[z] = len(keys)
+
+    metadata = {
+        'fingerprint': fingerprint,
+        'layout': layout,
+        'analysis_run': analysis_run,
+        'tile_size': TILE_SIZE,
+        'min_zoom': 0,
+        'max_zoom': max_zoom,
+        'world': {'x0': x0, 'y0': y0, 'side': side},
+        'nodes': primitives.number_of_nodes,
+        'tiles': tiles_per_level,
+    }
+    tmp_path = output_dir / "metadata.json.tmp"
+    tmp_path.write_text(json.dumps(metadata, indent=2), encoding='utf-8')
+    os.replace(tmp_path, output_dir / "metadata.json")
+    return tiles_per_level
+
+
+def latest_tile_layer():
+    """Nome da camada de tiles mais recente (diretório com metadata.json) ou None."""
+    layers = sorted(TILES_DIR.glob("*/metadata.json"), key=lambda p: p.stat().st_mtime_ns)
+    return layers[-1].parent.name if layers else None
+
+
+def tile_metadata(layer):
+    path = TILES_DIR / layer / "metadata.json"
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
@@ -0,0 +1,34 @@
+# ars_network/timing.py
+
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Mede o tempo (wall-clock) de cada fase de um comando e monta um relatório."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def report_lines(self):
+        width = max((len(name) for name, _ in self.phases), default=0)
+        lines = [f"  {name.ljust(width)}  {seconds:9.3f}s" for name, seconds in self.phases]
+        lines.append(f"  {'TOTAL'.ljust(width)}  {self.total:9.3f}s")
+        return lines
+
+    def write_report(self, stdout, title="Relatório de Tempo por Fase"):
+        stdout.write(f"\n--- {title} ---")
+        for line in self.report_lines():
+            stdout.write(line)
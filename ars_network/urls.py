@@ -16,4 +16,16 @@ urlpatterns = [
     # Rota Principal para a Importação dos Dados CSV do MGD+
     # Você a executará via linha de comando, mas esta view serve como um fallback.
     path('import/mgd-data/', views.import_mgd_data_view, name='import-mgd-data'),
-]
\ No newline at end of file
+
+    # API JSON somente leitura (métricas da última análise, com ETag e cache)
+    path('api/artists/', views.api_artists, name='api-artists'),
+    path('api/artists/<str:spotify_id>/neighbors/', views.api_artist_neighbors, name='api-artist-neighbors'),
+    path('api/artists/<str:spotify_id>/ego/', views.api_artist_ego, name='api-artist-ego'),
+    path('api/songs/', views.api_songs, name='api-songs'),
+    path('api/bridges/', views.api_bridges, name='api-bridges'),
+    path('api/communities/', views.api_communities, name='api-communities'),
+
+    # Mapa da rede em tiles (pirâmide gerada pelo comando export_tiles)
+    path('network/map/', views.network_map, name='network-map'),
+    path('network/tiles/<slug:layer>/<int:z>/<int:x>/<int:y>.png', views.network_tile, name='network-tile'),
+]
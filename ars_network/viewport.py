@@ -0,0 +1,97 @@
+# ars_network/viewport.py
+#
+# Índice espacial sobre as posições do layout em cache (ars_network/layout.py):
+# seleciona os nós e as arestas dentro de uma janela (viewport) sem percorrer o
+# grafo inteiro. Os nós vêm de uma cKDTree (consulta de bola na norma do máximo);
+# as arestas, das linhas da adjacência CSR desses nós.
+#
+# Também interpreta as regiões de zoom nomeadas da linha de comando:
+#   nome=Artista            janela centrada no artista (meia-largura padrão)
+#   nome=Artista@0.3        janela centrada no artista com meia-largura 0.3
+#   nome=x0,y0,x1,y1        janela dada pelos cantos
+
+from collections import namedtuple
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.spatial import cKDTree
+
+DEFAULT_ZOOM_RADIUS = 0.4
+
+Viewport = namedtuple('Viewport', ['xmin', 'ymin', 'xmax', 'ymax'])
+ZoomRegion = namedtuple('ZoomRegion', ['name', 'artist', 'radius', 'bbox'])
+
+
+class LayoutIndex:
+    """Posições do layout em arrays, com cKDTree e adjacência CSR na mesma ordem."""
+
+    def __init__(self, G, pos, weight='weight'):
+        self.nodes = np.array(list(G), dtype=object)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.xy = np.array([pos[node] for node in self.nodes], dtype=np.float64).reshape(-1, 2)
+        self.tree = cKDTree(self.xy)
+        self.adjacency = sp.triu(
+            nx.to_scipy_sparse_array(G, nodelist=list(self.nodes), weight=weight, format='csr'), k=1, format='csr'
+        )
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def bounds(self, margin=0.0):
+        low, high = self.xy.min(axis=0) - margin, self.xy.max(axis=0) + margin
+        return Viewport(low[0], low[1], high[0], high[1])
+
+    def nodes_in(self, viewport):
+        """Índices (ordenados) dos nós dentro da janela."""
+        center = [(viewport.xmin + viewport.xmax) / 2, (viewport.ymin + viewport.ymax) / 2]
+        half = max(viewport.xmax - viewport.xmin, viewport.ymax - viewport.ymin) / 2
+        candidates = np.array(self.tree.query_ball_point(center, half, p=np.inf), dtype=np.int64)
+        if not len(candidates):
+            return candidates
+        x, y = self.xy[candidates, 0], self.xy[candidates, 1]
+        inside = (x >= viewport.xmin) & (x <= viewport.xmax) & (y >= viewport.ymin) & (y <= viewport.ymax)
+        return np.sort(candidates[inside])
+
+    def edges_among(self, node_indices):
+        """Arestas (u, v, peso) com as duas pontas em `node_indices`, em índices globais."""
+        node_indices = np.asarray(node_indices, dtype=np.int64)
+        sub = self.adjacency[node_indices][:, node_indices].tocoo()
+        return node_indices[sub.row], node_indices[sub.col], sub.data
+
+
+def parse_zoom(value):
+    """Converte 'nome=alvo' em ZoomRegion; levanta ValueError se o formato for inválido."""
+    name, sep, target = value.partition('=')
+    name, target = name.strip(), target.strip()
+    if not sep or not name or not target:
+        raise ValueError(f"Zoom inválido '{value}': use nome=Artista[@raio] ou nome=x0,y0,x1,y1.")
+
+    parts = target.split(',')
+    if len(parts) == 4:
+        try:
+            x0, y0, x1, y1 = (float(p) for p in parts)
+        except ValueError:
+            pass
+        else:
+            return ZoomRegion(name, None, None, Viewport(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)))
+
+    artist, _, radius = target.rpartition('@')
+    if artist and radius:
+        try:
+            return ZoomRegion(name, artist.strip(), float(radius), None)
+        except ValueError:
+            pass
+    return ZoomRegion(name, target, DEFAULT_ZOOM_RADIUS, None)
+
+
+def zoom_viewport(region, layout_index, artist_ids_by_name):
+    """Janela de uma ZoomRegion; None se o artista não estiver no layout."""
+    if region.bbox is not None:
+        return region.bbox
+    spotify_id = artist_ids_by_name.get(region.artist.casefold(), region.artist)
+    i = layout_index.index.get(spotify_id)
+    if i is None:
+        return None
+    x, y = layout_index.xy[i]
+    return Viewport(x - region.radius, y - region.radius, x + region.radius, y + region.radius)
@@ -1,6 +1,15 @@
 # ars_network/views.py
 
-from django.shortcuts import HttpResponse
+import re
+
+import numpy as np
+from django.http import FileResponse, Http404
+from django.shortcuts import HttpResponse, render
+
+from .api import ApiError, cached_json_view, collaboration_graph, int_param, keyset_page, selected_fields
+from .ego import ego_network
+from .models import Artist, Community, HitSong
+from .tiles import TILES_DIR, latest_tile_layer, tile_metadata
 
 # --- Views de Placeholder ---
 
@@ -18,4 +27,140 @@ def user_info(request):
 
 def import_mgd_data_view(request):
     # Esta rota apenas instrui o usuário a rodar o comando customizado
-    return HttpResponse("Para importar os dados, você deve rodar o comando customizado do Django no terminal (não via navegador): python manage.py import_mgd_data")
\ No newline at end of file
+    return HttpResponse("Para importar os dados, você deve rodar o comando customizado do Django no terminal (não via navegador): python manage.py import_mgd_data")
+
+# --- API JSON (somente leitura; infraestrutura em ars_network/api.py) ---
+# O primeiro campo de cada lista é a chave da paginação (sempre incluído)
+ARTIST_FIELDS = [
+    'spotify_id', 'name', 'genres', 'artist_popularity', 'num_hits', 'num_collab_hits',
+    'betweenness_centrality', 'degree_centrality', 'community',
+]
+ARTIST_DEFAULT_FIELDS = ['spotify_id', 'name', 'num_hits', 'betweenness_centrality', 'degree_centrality']
+
+SONG_FIELDS = [
+    'id', 'spotify_id', 'name', 'album', 'popularity', 'release_date', 'explicit', 'is_collaboration',
+    'danceability', 'energy', 'valence', 'tempo', 'liveness', 'acousticness', 'speechiness', 'instrumentalness',
+    'genre_heterogeneity_index', 'genre_entropy', 'genre_gini_simpson', 'avg_artist_betweenness',
+    'velocity', 'mean_popularity', 'std_popularity', 'trend',
+]
+SONG_DEFAULT_FIELDS = [
+    'id', 'spotify_id', 'name', 'popularity', 'is_collaboration',
+    'genre_heterogeneity_index', 'avg_artist_betweenness',
+]
+
+COMMUNITY_FIELDS = [
+    'id', 'level', 'label', 'parent', 'size', 'dominant_genre', 'dominant_share', 'top_genres', 'genre_counts',
+    'intra_weight', 'inter_weight',
+]
+COMMUNITY_DEFAULT_FIELDS = ['id', 'level', 'label', 'parent', 'size', 'dominant_genre', 'dominant_share', 'top_genres']
+
+
+@cached_json_view
+def api_artists(request):
+    """GET /api/artists/?fields=...&after=<spotify_id>&limit=N"""
+    fields = selected_fields(request, ARTIST_FIELDS, ARTIST_DEFAULT_FIELDS)
+    return keyset_page(request, Artist.objects.all(), 'spotify_id', fields)
+
+
+@cached_json_view
+def api_songs(request):
+    """GET /api/songs/?fields=...&after=<id>&limit=N"""
+    fields = selected_fields(request, SONG_FIELDS, SONG_DEFAULT_FIELDS)
+    page = keyset_page(request, HitSong.objects.all(), 'id', fields)
+    for row in page['results']:
+        if row.get('release_date') is not None:
+            row['release_date'] = row['release_date'].isoformat()
+    return page
+
+
+@cached_json_view
+def api_communities(request):
+    """GET /api/communities/?level=0&parent=<id>&fields=...&after=<id>&limit=N : hierarquia de comunidades."""
+    fields = selected_fields(request, COMMUNITY_FIELDS, COMMUNITY_DEFAULT_FIELDS)
+    communities = Community.objects.all()
+    level = int_param(request, 'level', None, minimum=0)
+    if level is not None:
+        communities = communities.filter(level=level)
+    parent = int_param(request, 'parent', None)
+    if parent is not None:
+        communities = communities.filter(parent_id=parent)
+    return keyset_page(request, communities, 'id', fields)
+
+
+@cached_json_view
+def api_bridges(request):
+    """GET /api/bridges/?n=20&fields=... : Top-N artistas por Centralidade de Intermediação."""
+    n = int_param(request, 'n', 20, maximum=1000)
+    fields = selected_fields(request, ARTIST_FIELDS, ARTIST_DEFAULT_FIELDS)
+    rows = (
+        Artist.objects.filter(betweenness_centrality__isnull=False)
+        .order_by('-betweenness_centrality', 'spotify_id')
+        .values(*fields)[:n]
+    )
+    return {'results': [dict(row, rank=rank) for rank, row in enumerate(rows, start=1)]}
+
+
+@cached_json_view
+def api_artist_neighbors(request, spotify_id):
+    """GET /api/artists/<spotify_id>/neighbors/ : colaboradores diretos e nº de músicas em comum."""
+    fields = selected_fields(request, ARTIST_FIELDS, ['spotify_id', 'name', 'betweenness_centrality'])
+    artist = Artist.objects.filter(spotify_id=spotify_id).values(*fields).first()
+    if artist is None:
+        raise ApiError(f"Artista '{spotify_id}' não encontrado.", status=404)
+
+    graph = collaboration_graph(request)
+    row = graph.index.get(spotify_id)
+    if row is None:
+        return {'artist': artist, 'results': []}
+
+    # Linha do artista na adjacência CSR: vizinhos e pesos sem percorrer o grafo
+    start, end = graph.adjacency.indptr[row], graph.adjacency.indptr[row + 1]
+    neighbor_ids = graph.artist_ids[graph.adjacency.indices[start:end]]
+    weights = graph.adjacency.data[start:end]
+    order = np.argsort(-weights, kind='stable')
+
+    details = {a['spotify_id']: a for a in Artist.objects.filter(spotify_id__in=list(neighbor_ids)).values(*fields)}
+    results = [
+        dict(details.get(neighbor_ids[i], {'spotify_id': neighbor_ids[i]}), shared_songs=int(weights[i]))
+        for i in order
+    ]
+    return {'artist': artist, 'results': results}
+
+
+@cached_json_view
+def api_artist_ego(request, spotify_id):
+    """GET /api/artists/<spotify_id>/ego/?k=2 : ego-rede de k saltos com pesos e músicas em comum."""
+    k = int_param(request, 'k', 2, maximum=4)
+    ego = ego_network(collaboration_graph(request), spotify_id, k=k)
+    if ego is None:
+        if not Artist.objects.filter(spotify_id=spotify_id).exists():
+            raise ApiError(f"Artista '{spotify_id}' não encontrado.", status=404)
+        # Artista sem músicas ligadas: ego-rede só com ele mesmo
+        ego = {'center': spotify_id, 'k': k, 'nodes': [], 'edges': []}
+    return ego
+
+
+# --- Mapa da rede em tiles (gerados pelo comando export_tiles) ---
+# Mesmo formato aceito pelo conversor <slug:layer> das URLs dos tiles
+LAYER_PATTERN = re.compile(r'[-a-zA-Z0-9_]+')
+
+
+def network_map(request):
+    """GET /network/map/?layer=<camada> : visualizador que busca só os tiles visíveis."""
+    layer = request.GET.get('layer') or latest_tile_layer()
+    metadata = tile_metadata(layer) if layer and LAYER_PATTERN.fullmatch(layer) else None
+    if metadata is None:
+        return HttpResponse(
+            "Nenhuma camada de tiles encontrada. Rode o comando: python manage.py export_tiles", status=404
+        )
+    return render(request, 'ars_network/network_map.html', {'layer': layer, 'metadata': metadata})
+
+
+def network_tile(request, layer, z, x, y):
+    """GET /network/tiles/<camada>/<z>/<x>/<y>.png : tiles imutáveis (a camada muda com o grafo, o layout e as métricas)."""
+    path = TILES_DIR / layer / str(z) / str(x) / f"{y}.png"
+    if not path.is_file():
+        raise Http404("Tile vazio ou inexistente.")
+    response = FileResponse(open(path, 'rb'), content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -89,6 +89,18 @@ DATABASES = {
 }
 
 
+# Cache (respostas da API JSON, ver ars_network/api.py)
+# LocMem por processo no desenvolvimento; em produção use Redis/Memcached via .env
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "ars-network"),
+    }
+}
+# Tempo máximo (s) de uma resposta da API no cache; uma nova análise já invalida antes
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 3600))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
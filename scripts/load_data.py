@@ -1,19 +1,14 @@
 from pathlib import Path
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
 
-# ---------------------------
-# Função para ler CSVs com separadores diferentes
-# (Mantida apenas para Charts, onde o delimitador pode variar)
-# ---------------------------
-def read_csv_try(path):
-    """Tenta ler um CSV com diferentes delimitadores (, ; \t)."""
-    # Usado para charts, que pode ter um separador diferente por ano/região
-    for sep in [',', ';', '\t']:
-        try:
-            return pd.read_csv(path, sep=sep, encoding='utf-8')
-        except Exception:
-            continue
-    raise ValueError(f"Não consegui ler o arquivo {path}")
+import pandas as pd
 
 # ---------------------------
 # Caminhos base
@@ -21,103 +16,285 @@ def read_csv_try(path):
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DIR = BASE_DIR / "data" / "raw"
 PROCESSED_DIR = BASE_DIR / "data" / "processed"
-PROCESSED_DIR.mkdir(exist_ok=True)
-
-print(f"Diretório de Processamento: {PROCESSED_DIR}")
-
-# ---------------------------
-# 1. Carregar Artists (Forçando Tabulação para corrigir leitura de colunas)
-# ---------------------------
-artists_file = RAW_DIR / "Artists" / "spotify_artists_info_complete.csv"
 
-# CORREÇÃO CRÍTICA: Forçando o delimitador de tabulação (\t)
-# O erro 'KeyError: artist_id' ocorreu porque a leitura inicial falhou e leu tudo em uma coluna.
-df_artists = pd.read_csv(artists_file, sep='\t', encoding='utf-8') 
+CHARTS_RAW_DIR = RAW_DIR / "Charts"
+ARTISTS_FILE = RAW_DIR / "Artists" / "spotify_artists_info_complete.csv"
+# Nome do arquivo conforme o README
+HITS_FILE = RAW_DIR / "Hit Songs" / "spotify_hits_dataset_complete.csv"
 
-# Limpa espaços em branco nos nomes das colunas
-df_artists.columns = df_artists.columns.str.strip()
-print("\nArtistas carregados:", len(df_artists))
-print(f"Colunas do DF Artists (após correção de delimitador): {df_artists.columns.tolist()}")
+# Dataset Parquet particionado por mercado e ano (market=br/year=2019/part-0.parquet)
+CHARTS_DATASET_DIR = PROCESSED_DIR / "charts"
+# Incrementar quando o esquema das partições mudar (força a reescrita)
+PARTITION_FORMAT = 2
+# Assinatura (nome, tamanho, mtime) dos arquivos de origem de cada partição/saída
+MANIFEST_FILE = CHARTS_DATASET_DIR / "_manifest.json"
 
-# Garante que o ID e Gêneros estejam no formato de string limpa
-df_artists['artist_id'] = df_artists['artist_id'].astype(str).str.strip()
-df_artists['genres'] = df_artists['genres'].astype(str).str.strip()
+DEFAULT_YEARS = [2017, 2018, 2019]
 
 # ---------------------------
-# 2. Carregar Charts BR 2017-2019
+# Esquema dos CSVs semanais de Charts (mesmos tipos em todas as partições)
 # ---------------------------
-charts_br_dir = RAW_DIR / "Charts" / "br"
-dfs_charts = []
-
-# Iterar sobre pastas de ano e arquivos CSV
-for year_folder in charts_br_dir.iterdir():
-    if year_folder.is_dir() and year_folder.name.isdigit():
-        for file in year_folder.glob("*.csv"):
-            try:
-                # Usando read_csv_try para charts (pode ser , ou ;)
-                df = read_csv_try(file) 
-                df["year"] = int(year_folder.name)
-                dfs_charts.append(df)
-            except Exception as e:
-                print(f"Erro lendo {file}: {e}")
-
-if not dfs_charts:
-    raise FileNotFoundError("Nenhum arquivo de Charts BR encontrado. Verifique a estrutura de pastas.")
-
-df_charts_br = pd.concat(dfs_charts, ignore_index=True)
-# A coluna de ID de faixa no Charts é 'song_id' (limpa espaços para segurança)
-df_charts_br.columns = df_charts_br.columns.str.strip()
-print("Charts BR 2017-2019 carregados:", len(df_charts_br))
+CHART_DELIMITERS = ",;\t"
+CHART_DTYPES = {
+    'position': 'Int16',
+    'song_id': 'string',
+    'song_name': 'string',
+    'artist': 'string',
+    'streams': 'Int64',
+    'last_week_position': 'Int16',
+    'weeks_on_chart': 'Int16',
+    'peak_position': 'Int16',
+    # Variação de posição ("-2", "5") ou "new" para estreias
+    'position_status': 'string',
+}
+# Ex.: br-weekly_with_features-2019-01-04--2019-01-11.csv
+CHART_FILENAME = re.compile(
+    r"^(?P<market>[a-z]+)-weekly_with_features-"
+    r"(?P<week_start>\d{4}-\d{2}-\d{2})--(?P<week_end>\d{4}-\d{2}-\d{2})\.csv$"
+)
 
-# ---------------------------
-# 3. Carregar Hit Songs (Forçando Tabulação para corrigir leitura de colunas)
-# ---------------------------
-# Nome do arquivo conforme o README
-hits_file = RAW_DIR / "Hit Songs" / "spotify_hits_dataset_complete.csv" 
-# CORREÇÃO: Forçando o delimitador de tabulação (\t)
-df_hits = pd.read_csv(hits_file, sep='\t', encoding='utf-8') 
-df_hits.columns = df_hits.columns.str.strip() # Limpa espaços em branco
-print("\nHit Songs carregadas (total):", len(df_hits))
 
 # ---------------------------
-# 4. Filtragem: Selecionar apenas as faixas que estiveram no Chart BR
+# Manifesto: detecta partições cujos arquivos de origem não mudaram
 # ---------------------------
+def files_signature(files):
+    """SHA-1 de (nome, tamanho, mtime) dos arquivos: muda se algum for alterado, incluído ou removido."""
+    digest = hashlib.sha1()
+    for file in sorted(files):
+        stat = file.stat()
+        digest.update(f"{file.name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
 
-# IDs Únicos de Faixas do Chart BR (usando a coluna 'song_id' do Charts)
-# Garante que os IDs estejam limpos
-track_ids_br = df_charts_br["song_id"].astype(str).str.strip().unique() 
-print("IDs únicos de faixas que foram hit no BR (da Tabela Charts):", len(track_ids_br))
 
-# Filtrar o DataFrame de Hit Songs pelas faixas do BR
-df_hits_br = df_hits[df_hits["song_id"].isin(track_ids_br)].copy()
-print("Hit Songs filtradas para o BR (com Audio Features):", len(df_hits_br))
+def load_manifest():
+    if not MANIFEST_FILE.exists():
+        return {}
+    return json.loads(MANIFEST_FILE.read_text(encoding='utf-8'))
+
+
+def save_manifest(manifest):
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = MANIFEST_FILE.with_suffix('.tmp')
+    tmp_file.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp_file, MANIFEST_FILE)
+
+
+def available_markets():
+    return sorted(p.name for p in CHARTS_RAW_DIR.iterdir() if p.is_dir())
+
+
+def partition_dir(market, year):
+    return CHARTS_DATASET_DIR / f"market={market}" / f"year={year}"
+
 
 # ---------------------------
-# 5. Filtragem de Artistas
+# 1. Charts: leitura paralela e escrita das partições alteradas
 # ---------------------------
+def sniff_delimiter(path):
+    """Detecta o delimitador (, ; ou tab) uma única vez, só pela linha de cabeçalho."""
+    with open(path, encoding='utf-8', newline='') as fh:
+        header = fh.readline()
+    try:
+        return csv.Sniffer().sniff(header, delimiters=CHART_DELIMITERS).delimiter
+    except csv.Error:
+        # Cabeçalho de uma coluna só (ou ambíguo): usa o delimitador mais frequente
+        return max(CHART_DELIMITERS, key=header.count)
+
+
+def parse_chart_filename(path):
+    """(mercado, início da semana, fim da semana) a partir do nome do arquivo semanal."""
+    match = CHART_FILENAME.match(Path(path).name)
+    if match is None:
+        return None, pd.NaT, pd.NaT
+    return match['market'], pd.Timestamp(match['week_start']), pd.Timestamp(match['week_end'])
+
+
+def read_chart_file(file):
+    """Lê um CSV semanal de Charts com delimitador detectado e tipos explícitos."""
+    sep = sniff_delimiter(file)
+    df = pd.read_csv(
+        file, sep=sep, encoding='utf-8',
+        dtype=CHART_DTYPES, na_values=['nan', ''], keep_default_na=False,
+    )
+    # A coluna de ID de faixa no Charts é 'song_id' (limpa espaços para segurança)
+    df.columns = df.columns.str.strip()
+    df['song_id'] = df['song_id'].str.strip()
+
+    _, week_start, week_end = parse_chart_filename(file)
+    df['week_start'] = week_start
+    df['week_end'] = week_end
+    df[['week_start', 'week_end']] = df[['week_start', 'week_end']].astype('datetime64[ms]')
+    return df
 
-# Extrair TODOS os IDs de artistas (colaboradores) de todas as faixas BR
-all_artist_ids_br = set()
-for ids_string in df_hits_br["artist_id"].dropna():
-    # Limpa caracteres de lista ([', ', ']) se existirem.
-    cleaned_string = ids_string.strip('[]').replace("'", "").replace('"', "")
-    ids_list = [id.strip() for id in cleaned_string.split(',') if id.strip()]
-    all_artist_ids_br.update(ids_list)
 
-print("IDs únicos de artistas dos hits BR:", len(all_artist_ids_br))
+def stale_partitions(markets, years, manifest, force=False):
+    """{(mercado, ano): (arquivos, assinatura)} das partições que precisam ser (re)escritas."""
+    stale = {}
+    for market in markets:
+        for year in years:
+            files = sorted((CHARTS_RAW_DIR / market / str(year)).glob("*.csv"))
+            if not files:
+                continue
+            signature = f"{files_signature(files)}:v{PARTITION_FORMAT}"
+            up_to_date = (
+                manifest.get(f"charts/{market}/{year}") == signature
+                and (partition_dir(market, year) / "part-0.parquet").exists()
+            )
+            if force or not up_to_date:
+                stale[(market, year)] = (files, signature)
+    return stale
+
+
+def write_chart_partitions(stale, manifest, workers):
+    """Lê em paralelo todos os CSVs das partições alteradas e grava uma partição por (mercado, ano)."""
+    jobs = [(key, file) for key, (files, _) in stale.items() for file in files]
+    if not jobs:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(read_chart_file, [file for _, file in jobs], chunksize=8))
+
+    by_partition = {}
+    for (key, _), df in zip(jobs, frames):
+        by_partition.setdefault(key, []).append(df)
+
+    for (market, year), dfs in by_partition.items():
+        df_charts = pd.concat(dfs, ignore_index=True).sort_values(['week_start', 'position'], kind='stable')
+        target = partition_dir(market, year)
+        # Substitui a partição inteira (semanas removidas na origem não ficam para trás)
+        shutil.rmtree(target, ignore_errors=True)
+        target.mkdir(parents=True)
+        df_charts.to_parquet(target / "part-0.parquet", index=False)
+        manifest[f"charts/{market}/{year}"] = stale[(market, year)][1]
+        save_manifest(manifest)
+        print(f"Charts {market.upper()} {year}: {len(df_charts)} linhas ({len(dfs)} semanas)")
+
+
+def market_charts(market, years):
+    """Partições do mercado concatenadas, com a coluna `year` do layout antigo (charts_<mercado>.parquet)."""
+    dfs = []
+    for year in years:
+        part = partition_dir(market, year) / "part-0.parquet"
+        if part.exists():
+            dfs.append(pd.read_parquet(part).assign(year=year))
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+
+def chart_song_ids(market, years):
+    """IDs únicos de faixas presentes nas partições do mercado (lê só a coluna song_id)."""
+    song_ids = set()
+    for year in years:
+        part = partition_dir(market, year) / "part-0.parquet"
+        if part.exists():
+            ids = pd.read_parquet(part, columns=['song_id'])['song_id']
+            song_ids.update(ids.astype(str).str.strip())
+    return song_ids
 
-# Filtrar o DataFrame de Artistas (df_artists)
-df_artists_br = df_artists[df_artists["artist_id"].isin(all_artist_ids_br)].copy()
-# Agora esperamos um número > 0 aqui
-print("Artistas filtrados para o BR:", len(df_artists_br))
 
 # ---------------------------
-# 6. Salvar as Versões FINAIS FILTRADAS (Prontas para o Django)
+# 2. Hits e Artistas por mercado (prontos para o Django)
 # ---------------------------
-df_artists_br.to_parquet(PROCESSED_DIR / "artists_br.parquet", index=False)
-df_hits_br.to_parquet(PROCESSED_DIR / "hitsongs_br.parquet", index=False)
-df_charts_br.to_parquet(PROCESSED_DIR / "charts_br.parquet", index=False) 
+def load_artists():
+    # CORREÇÃO CRÍTICA: Forçando o delimitador de tabulação (\t)
+    # O erro 'KeyError: artist_id' ocorreu porque a leitura inicial falhou e leu tudo em uma coluna.
+    df_artists = pd.read_csv(ARTISTS_FILE, sep='\t', encoding='utf-8')
+    # Limpa espaços em branco nos nomes das colunas
+    df_artists.columns = df_artists.columns.str.strip()
+    # Garante que o ID e Gêneros estejam no formato de string limpa
+    df_artists['artist_id'] = df_artists['artist_id'].astype(str).str.strip()
+    df_artists['genres'] = df_artists['genres'].astype(str).str.strip()
+    return df_artists
+
+
+def load_hits():
+    # CORREÇÃO: Forçando o delimitador de tabulação (\t)
+    df_hits = pd.read_csv(HITS_FILE, sep='\t', encoding='utf-8')
+    df_hits.columns = df_hits.columns.str.strip()  # Limpa espaços em branco
+    return df_hits
+
+
+def hit_artist_ids(df_hits):
+    """Todos os IDs de artistas (colaboradores) da coluna de lista de cada hit."""
+    return set(
+        df_hits["artist_id"].dropna().astype(str)
+        # Limpa caracteres de lista ([', ', ']) se existirem.
+        .str.replace(r"[\[\]'\"]", "", regex=True)
+        .str.split(',').explode().str.strip()
+        .loc[lambda ids: ids != ""]
+    )
+
+
+def write_market_outputs(market, years, df_hits, df_artists):
+    # Filtrar o DataFrame de Hit Songs pelas faixas que estiveram no Chart do mercado
+    track_ids = chart_song_ids(market, years)
+    df_hits_market = df_hits[df_hits["song_id"].astype(str).str.strip().isin(track_ids)].copy()
+    df_artists_market = df_artists[df_artists["artist_id"].isin(hit_artist_ids(df_hits_market))].copy()
+
+    df_artists_market.to_parquet(PROCESSED_DIR / f"artists_{market}.parquet", index=False)
+    df_hits_market.to_parquet(PROCESSED_DIR / f"hitsongs_{market}.parquet", index=False)
+    # Arquivo único de Charts do mercado, mantido por compatibilidade com quem ainda o lê
+    market_charts(market, years).to_parquet(PROCESSED_DIR / f"charts_{market}.parquet", index=False)
+    print(f"{market.upper()}: {len(track_ids)} faixas no chart, {len(df_hits_market)} hits, "
+          f"{len(df_artists_market)} artistas -> hitsongs_{market}.parquet / artists_{market}.parquet "
+          f"/ charts_{market}.parquet")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pré-processa Charts, Hit Songs e Artistas do MGD+ por mercado e ano."
+    )
+    parser.add_argument('--markets', nargs='+', default=None,
+                        help='Mercados a processar (padrão: todos em data/raw/Charts).')
+    parser.add_argument('--years', nargs='+', type=int, default=DEFAULT_YEARS,
+                        help='Anos a processar (padrão: 2017 2018 2019).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processos para a leitura dos CSVs semanais (padrão: nº de CPUs).')
+    parser.add_argument('--force', action='store_true',
+                        help='Reprocessa todas as partições, mesmo sem alteração na origem.')
+    args = parser.parse_args(argv)
+
+    markets = args.markets or available_markets()
+    years = sorted(args.years)
+    PROCESSED_DIR.mkdir(exist_ok=True)
+    print(f"Diretório de Processamento: {PROCESSED_DIR}")
+    print(f"Mercados: {', '.join(markets)} | Anos: {', '.join(map(str, years))}")
+
+    # 1. Charts: só as partições cujos arquivos de origem mudaram
+    manifest = load_manifest()
+    stale = stale_partitions(markets, years, manifest, force=args.force)
+    skipped = sum(
+        1 for m in markets for y in years
+        if (m, y) not in stale and (partition_dir(m, y) / "part-0.parquet").exists()
+    )
+    print(f"\nPartições de Charts: {len(stale)} a processar, {skipped} inalteradas (puladas).")
+    write_chart_partitions(stale, manifest, args.workers)
+
+    # 2. Saídas por mercado: refeitas só se alguma partição ou os arquivos de Hits/Artistas mudaram
+    base_signature = files_signature([HITS_FILE, ARTISTS_FILE])
+    pending = []
+    for market in markets:
+        signature = hashlib.sha1("|".join(
+            [base_signature] + [manifest.get(f"charts/{market}/{y}", "") for y in years]
+        ).encode('utf-8')).hexdigest()
+        outputs_exist = all(
+            (PROCESSED_DIR / f"{name}_{market}.parquet").exists() for name in ("artists", "hitsongs", "charts")
+        )
+        if args.force or manifest.get(f"outputs/{market}") != signature or not outputs_exist:
+            pending.append((market, signature))
+
+    if pending:
+        df_artists = load_artists()
+        df_hits = load_hits()
+        print(f"\nArtistas carregados: {len(df_artists)} | Hit Songs carregadas (total): {len(df_hits)}")
+        for market, signature in pending:
+            write_market_outputs(market, years, df_hits, df_artists)
+            manifest[f"outputs/{market}"] = signature
+            save_manifest(manifest)
+
+    print(f"\n--- PRÉ-PROCESSAMENTO CONCLUÍDO ({len(pending)} mercados atualizados, "
+          f"{len(markets) - len(pending)} inalterados) ---")
+    print(f"Charts particionados em: {CHARTS_DATASET_DIR}")
+
 
-print("\n--- PRÉ-PROCESSAMENTO CONCLUÍDO ---")
-print("Artistas BR salvos em: artists_br.parquet")
-print("Hit Songs BR salvas em: hitsongs_br.parquet")
\ No newline at end of file
+if __name__ == "__main__":
+    main()